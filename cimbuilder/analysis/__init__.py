@@ -0,0 +1,5 @@
+from cimbuilder.analysis.topology import TopologyProcessor as TopologyProcessor
+from cimbuilder.analysis.validation import ValidationReport as ValidationReport
+from cimbuilder.analysis.validation import validate_network as validate_network
+from cimbuilder.analysis.contingency import ContingencyAnalysis as ContingencyAnalysis
+from cimbuilder.analysis.contingency import ContingencyResult as ContingencyResult
@@ -0,0 +1,179 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+import logging
+from itertools import combinations
+
+from cimgraph import GraphModel
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
+
+from cimbuilder.analysis.topology import TopologyProcessor
+
+_log = logging.getLogger(__name__)
+
+class ContingencyResult():
+    """
+    Switch outages of one substation and the loads that lose supply in each of them.
+    Case 0 is the base case without outages. lost[load] is a bitmask with bit c set
+    if the load is not connected to a source in case c.
+    """
+
+    def __init__(self, substation:object, switches:list[cim.Switch], outages:list[tuple[int, ...]],
+                 loads:list[tuple[cim.ConnectivityNode, object]], lost:list[int]):
+        self.substation = substation
+        self.switches = switches
+        self.outages = outages
+        self.loads = loads
+        self.lost = lost
+
+    def get_lost(self, case:int) -> list[tuple[cim.ConnectivityNode, object]]:
+        # Loads that are not supplied in a case
+        return [load for load, lost in zip(self.loads, self.lost) if lost >> case & 1]
+
+    def get_outage(self, case:int) -> list[cim.Switch]:
+        return [self.switches[switch_id] for switch_id in self.outages[case]]
+
+    def get_matrix(self) -> list[bytearray]:
+        # One row for each case and one column for each load, 1 if the load is not supplied
+        return [bytearray(lost >> case & 1 for lost in self.lost) for case in range(len(self.outages))]
+
+    def get_critical(self) -> list[int]:
+        # Cases in which loads that are supplied in the base case lose supply
+        base = [lost & 1 for lost in self.lost]
+        return [case for case in range(1, len(self.outages))
+                if any(lost >> case & 1 and not supplied for lost, supplied in zip(self.lost, base))]
+
+class ContingencyAnalysis():
+    """
+    Finds the feeders and branches that lose supply for every single (order=1) or double
+    (order=2) switch outage in each substation of a network. Each bit of an integer stands
+    for one case, so that connectivity of all cases of a substation is computed at once by
+    propagating bitmasks of sources along the switches. Feeders are the source buses of
+    attached feeders and branches are nodes with terminals of other equipment. Sources
+    are the nodes of bus bar sections unless other nodes are given.
+    """
+
+    def __init__(self, network:GraphModel, order:int=1, normal:bool=True,
+                 sources:list[cim.ConnectivityNode]=None):
+        if order not in (1, 2):
+            raise ValueError(f'Contingency order must be 1 or 2, not {order}')
+        self.network = network
+        self.order = order
+        self.topology = TopologyProcessor(network, normal=normal)
+        self.cim = self.topology.cim
+        self.sources = None if sources is None else {self.topology.node_ids[id(node)] for node in sources}
+        self.results = []
+        self.run()
+
+    def get_loads(self) -> dict[int, list[object]]:
+        # Equipment other than switches and bus bars at each node, plus feeders at source buses
+        topology = self.topology
+        loads = {}
+        for node_id in topology.sourcebuses:
+            loads.setdefault(node_id, []).append(topology.nodes[node_id].AdditionalEquipmentContainer)
+        for terminal in self.network.graph.get(self.cim.Terminal, {}).values():
+            conducting_equipment = terminal.ConductingEquipment
+            if terminal.ConnectivityNode is None or conducting_equipment is None:
+                continue
+            if isinstance(conducting_equipment, (self.cim.Switch, self.cim.BusbarSection)):
+                continue
+            node_id = topology.node_ids.get(id(terminal.ConnectivityNode))
+            if node_id is not None:
+                loads.setdefault(node_id, []).append(conducting_equipment)
+        return loads
+
+    def get_substations(self) -> list[list[int]]:
+        # Nodes joined by switches in any state, which are the switchyards of the substations
+        topology = self.topology
+        parent = list(range(len(topology.nodes)))
+
+        def find(node_id:int) -> int:
+            while parent[node_id] != node_id:
+                parent[node_id] = parent[parent[node_id]]
+                node_id = parent[node_id]
+            return node_id
+
+        for node1, node2 in zip(topology.branch_from, topology.branch_to):
+            root1 = find(node1)
+            root2 = find(node2)
+            if root1 != root2:
+                parent[root2] = root1
+        substations = {}
+        for node_id in range(len(topology.nodes)):
+            substations.setdefault(find(node_id), []).append(node_id)
+        return [node_ids for node_ids in substations.values() if len(node_ids) > 1]
+
+    def run(self) -> list[ContingencyResult]:
+        topology = self.topology
+        loads = self.get_loads()
+        sources = set(topology.bus_nodes) if self.sources is None else self.sources
+        branches = {}
+        for branch, node_id in enumerate(topology.branch_from):
+            branches.setdefault(node_id, []).append(branch)
+
+        self.results = []
+        for node_ids in self.get_substations():
+            substation_sources = [node_id for node_id in node_ids if node_id in sources]
+            substation_loads = [(node_id, load) for node_id in node_ids for load in loads.get(node_id, [])]
+            if not substation_sources or not substation_loads:
+                continue
+            substation_branches = [branch for node_id in node_ids for branch in branches.get(node_id, [])]
+            self.results.append(self.evaluate(node_ids, substation_sources, substation_branches, substation_loads))
+        return self.results
+
+    def evaluate(self, node_ids:list[int], sources:list[int], branches:list[int],
+                 loads:list[tuple[int, object]]) -> ContingencyResult:
+        topology = self.topology
+        switch_ids = sorted({topology.branch_switch[branch] for branch in branches} - {-1})
+        local = {switch_id: index for index, switch_id in enumerate(switch_ids)}
+        outages = [()] + list(combinations(range(len(switch_ids)), self.order))
+        if self.order == 2: # N-2 includes the N-1 cases
+            outages[1:1] = [(index,) for index in range(len(switch_ids))]
+        all_cases = (1 << len(outages)) - 1
+
+        # Bitmask of the cases in which each switch is out of service
+        out = [0]*len(switch_ids)
+        for case, outage in enumerate(outages):
+            for index in outage:
+                out[index] |= 1 << case
+
+        # Each branch carries supply in the cases where its switch is closed and in service
+        edges = []
+        for branch in branches:
+            switch_id = topology.branch_switch[branch]
+            if switch_id < 0:
+                alive = all_cases
+            elif topology.closed[switch_id]:
+                alive = all_cases & ~out[local[switch_id]]
+            else:
+                continue
+            edges.append((topology.branch_from[branch], topology.branch_to[branch], alive))
+
+        # Propagate the cases in which each node is supplied until nothing changes
+        reached = dict.fromkeys(node_ids, 0)
+        for node_id in sources:
+            reached[node_id] = all_cases
+        changed = True
+        while changed:
+            changed = False
+            for node1, node2, alive in edges:
+                reached1 = reached[node1]
+                reached2 = reached[node2]
+                if reached1 == reached2:
+                    continue
+                new1 = reached1 | (reached2 & alive)
+                new2 = reached2 | (reached1 & alive)
+                if new1 != reached1 or new2 != reached2:
+                    reached[node1] = new1
+                    reached[node2] = new2
+                    changed = True
+            edges.reverse()
+
+        substation = None
+        for node_id in sources:
+            substation = topology.nodes[node_id].ConnectivityNodeContainer
+            if substation is not None:
+                break
+        return ContingencyResult(substation, [topology.switches[switch_id] for switch_id in switch_ids], outages,
+                                 [(topology.nodes[node_id], load) for node_id, load in loads],
+                                 [all_cases & ~reached[node_id] for node_id, _ in loads])
@@ -0,0 +1,206 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+import logging
+from array import array
+
+from cimgraph import GraphModel
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
+
+import cimbuilder.utils as utils
+
+_log = logging.getLogger(__name__)
+
+class TopologyProcessor():
+    """
+    Finds the ConnectivityNodes of a network that are joined under the current switch
+    states. Nodes and branches are numbered once and stored as a sparse adjacency list,
+    and islands are kept in a union-find forest. Closing a switch merges two islands,
+    and opening one only searches the island that contained it. If normal is True,
+    normalOpen is used instead of open. If switches_only is False, other equipment with
+    two or more terminals also joins its nodes.
+    """
+
+    def __init__(self, network:GraphModel, normal:bool=False, switches_only:bool=True):
+        self.network = network
+        self.cim = utils.get_cim_profile(network.connection)
+        self.state = 'normalOpen' if normal else 'open'
+        self.switches_only = switches_only
+        self.nodes = []
+        self.node_ids = {}
+        self.switches = []
+        self.switch_ids = {}
+        self.bus_nodes = []
+        self.sourcebuses = []
+        self.build()
+
+    def node_id(self, node:cim.ConnectivityNode) -> int:
+        node_id = self.node_ids.get(id(node))
+        if node_id is None:
+            node_id = len(self.nodes)
+            self.nodes.append(node)
+            self.node_ids[id(node)] = node_id
+        return node_id
+
+    def is_open(self, switch:cim.Switch) -> bool:
+        value = getattr(switch, self.state)
+        if value is None and self.state == 'open':
+            value = switch.normalOpen
+        return bool(value)
+
+    def build(self) -> None:
+        # Number the nodes and switches and create the adjacency list of branches
+        for node in self.network.graph.get(self.cim.ConnectivityNode, {}).values():
+            self.node_id(node)
+
+        equipment_nodes = {}
+        equipment = {}
+        bus_nodes = set()
+        for terminal in self.network.graph.get(self.cim.Terminal, {}).values():
+            node = terminal.ConnectivityNode
+            conducting_equipment = terminal.ConductingEquipment
+            if node is None or conducting_equipment is None:
+                continue
+            node_id = self.node_id(node)
+            if isinstance(conducting_equipment, self.cim.BusbarSection):
+                bus_nodes.add(node_id)
+            elif isinstance(conducting_equipment, self.cim.Switch) or not self.switches_only:
+                equipment.setdefault(id(conducting_equipment), conducting_equipment)
+                equipment_nodes.setdefault(id(conducting_equipment), []).append(node_id)
+
+        # Each branch joins the first node of a piece of equipment to one of its other nodes
+        self.branch_from = array('l')
+        self.branch_to = array('l')
+        self.branch_switch = array('l')
+        switch_branches = {}
+        for key, node_ids in equipment_nodes.items():
+            conducting_equipment = equipment[key]
+            switch_id = -1
+            if isinstance(conducting_equipment, self.cim.Switch):
+                switch_id = len(self.switches)
+                self.switches.append(conducting_equipment)
+                self.switch_ids[key] = switch_id
+            for node_id in node_ids[1:]:
+                if switch_id >= 0:
+                    switch_branches.setdefault(switch_id, []).append(len(self.branch_from))
+                self.branch_from.append(node_ids[0])
+                self.branch_to.append(node_id)
+                self.branch_switch.append(switch_id)
+        self.switch_branches = [switch_branches.get(switch_id, []) for switch_id in range(len(self.switches))]
+        self.closed = bytearray(0 if self.is_open(switch) else 1 for switch in self.switches)
+
+        # Adjacency list in compressed sparse row format: branches of node n are
+        # adjacent[offsets[n]:offsets[n+1]]
+        total_nodes = len(self.nodes)
+        counts = array('l', bytes(total_nodes*array('l').itemsize))
+        for node_id in self.branch_from:
+            counts[node_id] = counts[node_id] + 1
+        for node_id in self.branch_to:
+            counts[node_id] = counts[node_id] + 1
+        self.offsets = array('l', [0])
+        for count in counts:
+            self.offsets.append(self.offsets[-1] + count)
+        self.adjacent = array('l', bytes(self.offsets[-1]*array('l').itemsize))
+        position = array('l', self.offsets[:-1])
+        for branch, (node_from, node_to) in enumerate(zip(self.branch_from, self.branch_to)):
+            self.adjacent[position[node_from]] = branch
+            position[node_from] = position[node_from] + 1
+            self.adjacent[position[node_to]] = branch
+            position[node_to] = position[node_to] + 1
+
+        self.bus_nodes = sorted(bus_nodes)
+        self.sourcebuses = [node_id for node_id, node in enumerate(self.nodes)
+                            if getattr(node, 'AdditionalEquipmentContainer', None) is not None]
+        self.refresh()
+
+    def is_closed(self, branch:int) -> bool:
+        switch_id = self.branch_switch[branch]
+        return switch_id < 0 or self.closed[switch_id] == 1
+
+    def refresh(self) -> None:
+        # Compute all islands from the switch states
+        self.parent = array('l', range(len(self.nodes)))
+        self.size = array('l', [1])*len(self.nodes)
+        for branch in range(len(self.branch_from)):
+            if self.is_closed(branch):
+                self.union(self.branch_from[branch], self.branch_to[branch])
+
+    def find(self, node_id:int) -> int:
+        parent = self.parent
+        while parent[node_id] != node_id:
+            parent[node_id] = parent[parent[node_id]]
+            node_id = parent[node_id]
+        return node_id
+
+    def union(self, node1:int, node2:int) -> None:
+        root1 = self.find(node1)
+        root2 = self.find(node2)
+        if root1 == root2:
+            return
+        if self.size[root1] < self.size[root2]:
+            root1, root2 = root2, root1
+        self.parent[root2] = root1
+        self.size[root1] = self.size[root1] + self.size[root2]
+
+    def search(self, node_id:int) -> list[int]:
+        # Nodes reached from node_id through closed branches
+        reached = {node_id}
+        stack = [node_id]
+        while stack:
+            current = stack.pop()
+            for branch in self.adjacent[self.offsets[current]:self.offsets[current+1]]:
+                if not self.is_closed(branch):
+                    continue
+                other = self.branch_to[branch] if self.branch_from[branch] == current else self.branch_from[branch]
+                if other not in reached:
+                    reached.add(other)
+                    stack.append(other)
+        return list(reached)
+
+    def set_open(self, switch:cim.Switch, open:bool=True) -> None:
+        # Change the state of one switch in the network and update the islands
+        switch_id = self.switch_ids.get(id(switch))
+        if switch_id is None:
+            raise ValueError(f'Switch {switch.name} is not in the topology')
+        setattr(switch, self.state, open)
+        closed = 0 if open else 1
+        if self.closed[switch_id] == closed:
+            return
+        self.closed[switch_id] = closed
+        for branch in self.switch_branches[switch_id]:
+            node1 = self.branch_from[branch]
+            node2 = self.branch_to[branch]
+            if closed:
+                self.union(node1, node2)
+            elif self.find(node1) == self.find(node2):
+                # Opening a branch splits its island in at most two parts
+                reached = self.search(node1)
+                if node2 in reached:
+                    continue
+                for part in (reached, self.search(node2)):
+                    root = part[0]
+                    for node_id in part:
+                        self.parent[node_id] = root
+                    self.size[root] = len(part)
+
+    def get_island(self, node:cim.ConnectivityNode) -> int:
+        return self.find(self.node_ids[id(node)])
+
+    def connected(self, node1:cim.ConnectivityNode, node2:cim.ConnectivityNode) -> bool:
+        return self.get_island(node1) == self.get_island(node2)
+
+    def islands(self) -> list[list[cim.ConnectivityNode]]:
+        islands = {}
+        for node_id, node in enumerate(self.nodes):
+            islands.setdefault(self.find(node_id), []).append(node)
+        return list(islands.values())
+
+    def check_sourcebuses(self) -> list[cim.ConnectivityNode]:
+        # Returns the feeder source buses that do not reach a bus bar section
+        bus_islands = {self.find(node_id) for node_id in self.bus_nodes}
+        unreached = []
+        for node_id in self.sourcebuses:
+            if self.find(node_id) not in bus_islands:
+                unreached.append(self.nodes[node_id])
+                _log.warning(f'Source bus {self.nodes[node_id].name} is not connected to a main bus')
+        return unreached
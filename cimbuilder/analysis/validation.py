@@ -0,0 +1,147 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+import logging
+import sys
+from dataclasses import dataclass, field
+
+from cimgraph import GraphModel
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
+
+import cimbuilder.utils as utils
+
+_log = logging.getLogger(__name__)
+
+# Attributes that give the scope in which names must be unique. Objects with the same
+# name and a different aliasName, such as the measurements of aggregate feeders, are allowed.
+NAME_SCOPES = ['EquipmentContainer', 'ConnectivityNodeContainer', 'ConductingEquipment']
+
+# Equipment that gets its voltage from other objects, such as transformer ends
+BASE_VOLTAGE_EXCEPTIONS = ['PowerTransformer']
+
+@dataclass
+class ValidationReport:
+    # Each issue is a tuple of the objects involved and the attribute that was checked
+    duplicate_mrids: list[tuple[object, object]] = field(default_factory=list)
+    duplicate_names: list[tuple[object, object]] = field(default_factory=list)
+    dangling_terminals: list[tuple[cim.Terminal, str]] = field(default_factory=list)
+    one_sided: list[tuple[object, str, object]] = field(default_factory=list)
+    missing_references: list[tuple[object, str, object]] = field(default_factory=list)
+    missing_base_voltage: list[object] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not any(self.counts().values())
+
+    def counts(self) -> dict[str, int]:
+        return {'duplicate_mrids': len(self.duplicate_mrids), 'duplicate_names': len(self.duplicate_names),
+                'dangling_terminals': len(self.dangling_terminals), 'one_sided': len(self.one_sided),
+                'missing_references': len(self.missing_references),
+                'missing_base_voltage': len(self.missing_base_voltage)}
+
+    def log(self, limit:int=20) -> None:
+        # Log up to limit issues of each kind
+        for obj1, obj2 in self.duplicate_mrids[:limit]:
+            _log.warning(f'mRID {obj1.mRID} is used by {_describe(obj1)} and {_describe(obj2)}')
+        for obj1, obj2 in self.duplicate_names[:limit]:
+            _log.warning(f'{obj1.__class__.__name__} name {obj1.name} is used by {obj1.mRID} and {obj2.mRID}')
+        for terminal, attribute in self.dangling_terminals[:limit]:
+            _log.warning(f'Terminal {terminal.name} does not have a {attribute}')
+        for obj, attribute, other in self.one_sided[:limit]:
+            _log.warning(f'{_describe(obj)} links to {_describe(other)} with {attribute}, but not the other way')
+        for obj, attribute, other in self.missing_references[:limit]:
+            _log.warning(f'{attribute} {_describe(other)} of {_describe(obj)} is not in the network')
+        for obj in self.missing_base_voltage[:limit]:
+            _log.warning(f'{_describe(obj)} does not have a BaseVoltage')
+        counts = {issue: count for issue, count in self.counts().items() if count}
+        if counts:
+            _log.warning(f'Model validation found {counts}')
+
+def validate_network(network:GraphModel|dict[type, dict[str, object]], connection:object=None) -> ValidationReport:
+    # Check a network or graph dictionary in linear time: all objects are indexed once by
+    # id, mRID, and name, and then each terminal is checked against its node and equipment
+    if isinstance(network, GraphModel):
+        graph = network.graph
+        connection = network.connection
+    else:
+        graph = network
+    report = ValidationReport()
+    if not graph:
+        return report
+    if connection is not None:
+        cim = utils.get_cim_profile(connection)
+    else: # Use the profile of the classes in the graph
+        cim = sys.modules[next(iter(graph)).__module__]
+
+    objects = {}
+    mrids = {}
+    names = {}
+    terminals = []
+    nodes = []
+    equipment = []
+    exceptions = tuple(getattr(cim, name) for name in BASE_VOLTAGE_EXCEPTIONS if hasattr(cim, name))
+    for cim_class, class_objects in graph.items():
+        is_terminal = issubclass(cim_class, cim.Terminal)
+        is_node = issubclass(cim_class, cim.ConnectivityNode)
+        is_equipment = issubclass(cim_class, cim.ConductingEquipment)
+        check_voltage = is_equipment and not issubclass(cim_class, exceptions)
+        scopes = [scope for scope in NAME_SCOPES if scope in cim_class.__dataclass_fields__]
+        # Classes such as PositionPoint do not have names
+        has_name = 'name' in cim_class.__dataclass_fields__
+        for obj in class_objects.values():
+            objects[id(obj)] = obj
+            existing = mrids.setdefault(obj.mRID, obj)
+            if existing is not obj:
+                report.duplicate_mrids.append((existing, obj))
+            if has_name and obj.name is not None:
+                scope = None
+                for attribute in scopes:
+                    scope = getattr(obj, attribute)
+                    if scope is not None:
+                        break
+                existing = names.setdefault((cim_class, id(scope), obj.name, obj.aliasName), obj)
+                if existing is not obj:
+                    report.duplicate_names.append((existing, obj))
+            if is_terminal:
+                terminals.append(obj)
+            elif is_node:
+                nodes.append(obj)
+            elif is_equipment:
+                equipment.append(obj)
+                if check_voltage and obj.BaseVoltage is None:
+                    report.missing_base_voltage.append(obj)
+
+    # Links from terminals to nodes and equipment, which must be matched from the other side
+    node_links = set()
+    equipment_links = set()
+    for terminal in terminals:
+        for attribute, links in (('ConnectivityNode', node_links), ('ConductingEquipment', equipment_links)):
+            other = getattr(terminal, attribute)
+            if other is None:
+                report.dangling_terminals.append((terminal, attribute))
+                continue
+            if id(other) not in objects:
+                report.missing_references.append((terminal, attribute, other))
+            links.add((id(terminal), id(other)))
+
+    for parents, links, attribute in ((nodes, node_links, 'ConnectivityNode'),
+                                      (equipment, equipment_links, 'ConductingEquipment')):
+        for parent in parents:
+            for terminal in parent.Terminals:
+                key = (id(terminal), id(parent))
+                if key in links:
+                    links.discard(key)
+                elif id(terminal) in objects:
+                    # Terminals of other networks, such as feeders at a source bus, are not written
+                    report.one_sided.append((parent, 'Terminals', terminal))
+        # Links that are left are only known to the terminal
+        if links:
+            for terminal in terminals:
+                other = getattr(terminal, attribute)
+                if other is not None and id(other) in objects and (id(terminal), id(other)) in links:
+                    report.one_sided.append((terminal, attribute, other))
+
+    return report
+
+def _describe(obj:object) -> str:
+    return f'{obj.__class__.__name__} {obj.name or obj.mRID}'
@@ -0,0 +1,360 @@
+from __future__ import annotations
+import argparse
+import csv
+import inspect
+import json
+import logging
+import os
+import sys
+import time
+
+from cimgraph.databases import ConnectionParameters, RDFlibConnection
+from cimgraph.models import DistributedArea
+
+from cimbuilder.analysis import ValidationReport, validate_network
+from cimbuilder.substation_builder import SubstationSpec, iter_substation_graphs, export_partitions
+from cimbuilder.substation_builder.aggregate_feeder import read_feeder_table, AGGREGATE_FEEDER_COLUMNS
+from cimbuilder.substation_builder.substation_spec import TOPOLOGIES
+import cimbuilder.utils as utils
+
+_log = logging.getLogger(__name__)
+
+# Spec file settings that can also be given on the command line
+DEFAULTS = {'cim_profile': 'cimhub_2023', 'iec61970_301': 8, 'mrid_namespace': None}
+
+SPEC_FIELDS = ('topology', 'name', 'base_voltage', 'parameters', 'branches', 'feeders', 'aggregate_feeders')
+
+# Keys of feeder and aggregate feeder entries besides the new_feeder arguments
+FEEDER_FIELDS = ('filename', 'mrid', 'replica')
+AGGREGATE_FEEDER_FIELDS = ('feeder_name', 'breaker_name', 'substation', 'node', 'base_voltage') + tuple(AGGREGATE_FEEDER_COLUMNS)
+
+class StageTimer():
+    """
+    Records the time and number of objects of each stage of a build and prints them.
+    """
+
+    def __init__(self, stream=sys.stdout):
+        self.stream = stream
+        self.stages = []
+
+    def stage(self, name:str, start:float, objects:int=None) -> None:
+        seconds = time.perf_counter() - start
+        self.stages.append((name, seconds, objects))
+        objects = '' if objects is None else f'{objects:>10} objects'
+        print(f'{name:<24}{seconds:>9.3f} s{objects}', file=self.stream, flush=True)
+
+    def total(self) -> None:
+        seconds = sum(seconds for _, seconds, _ in self.stages)
+        print(f'{"total":<24}{seconds:>9.3f} s', file=self.stream, flush=True)
+
+def read_spec_file(filename:str) -> dict:
+    # Returns the settings and substations of a YAML, JSON, or CSV spec file.
+    # A CSV file has one substation per row with columns topology, name, and base_voltage.
+    # Other columns are builder parameters such as total_sections or total_bus_ties.
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.csv':
+        substations = []
+        with open(filename, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                substation = {'parameters': {}}
+                for column, value in row.items():
+                    if value is None or value == '':
+                        continue
+                    if column in ('topology', 'name'):
+                        substation[column] = value
+                    elif column == 'base_voltage':
+                        substation[column] = float(value)
+                    else:
+                        substation['parameters'][column] = _number(value)
+                substations.append(substation)
+        return {'substations': substations}
+
+    with open(filename, encoding='utf-8') as f:
+        if extension in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError('YAML spec files need PyYAML, install it with pip install pyyaml '
+                                  'or use a JSON or CSV spec') from None
+            spec = yaml.safe_load(f)
+        elif extension == '.json':
+            spec = json.load(f)
+        else:
+            raise ValueError(f'Unknown spec file type {extension}, expected .yaml, .yml, .json, or .csv')
+    if not isinstance(spec, dict) or 'substations' not in spec:
+        raise ValueError(f'Spec file {filename} must have a substations list')
+    return spec
+
+def check_substation(substation:object) -> list[str]:
+    # Returns the problems of one substation entry of a spec file
+    if not isinstance(substation, dict):
+        return [f'expected a mapping of substation fields, got {type(substation).__name__}']
+    errors = []
+    unknown = set(substation) - set(SPEC_FIELDS)
+    if unknown:
+        errors.append(f'unknown fields {sorted(unknown)}')
+    for key in ('topology', 'name'):
+        if not isinstance(substation.get(key), str) or not substation[key]:
+            errors.append(f'{key} must be a non-empty string')
+    for key in ('parameters', 'branches', 'feeders', 'aggregate_feeders'):
+        expected = dict if key == 'parameters' else list
+        if not isinstance(substation.get(key, expected()), expected):
+            errors.append(f'{key} must be a {"mapping" if expected == dict else "list"}')
+    if errors:
+        return errors
+
+    if not _is_number(substation.get('base_voltage', 0)):
+        errors.append(f'base_voltage must be a number, got {substation["base_voltage"]!r}')
+    builder_class = TOPOLOGIES.get(substation['topology'])
+    if builder_class is None:
+        return errors + [f'unknown topology {substation["topology"]}, expected one of {sorted(TOPOLOGIES)}']
+    errors += _check_arguments(builder_class.__init__, 'parameters', substation.get('parameters', {}),
+                               fixed=('connection', 'network', 'name', 'base_voltage'))
+    for number, branch in enumerate(substation.get('branches', []), start=1):
+        errors += _check_arguments(builder_class.new_branch, f'branch {number}', branch,
+                                   fixed=('branch_equipment', 'branch_terminal'))
+    for number, feeder in enumerate(substation.get('feeders', []), start=1):
+        errors += _check_arguments(builder_class.new_feeder, f'feeder {number}', feeder,
+                                   fixed=('feeder_network', 'feeder', 'sourcebus'), extra=FEEDER_FIELDS)
+        if isinstance(feeder, dict):
+            for key in ('filename', 'mrid'):
+                if not isinstance(feeder.get(key), str):
+                    errors.append(f'feeder {number}: {key} must be a string')
+    for number, row in enumerate(substation.get('aggregate_feeders', []), start=1):
+        if not isinstance(row, dict):
+            errors.append(f'aggregate feeder {number}: expected a mapping')
+            continue
+        unknown = set(row) - set(AGGREGATE_FEEDER_FIELDS)
+        if unknown:
+            errors.append(f'aggregate feeder {number}: unknown columns {sorted(unknown)}')
+        if 'feeder_name' not in row:
+            errors.append(f'aggregate feeder {number}: feeder_name is required')
+    return errors
+
+def get_specs(spec:dict, base_path:str='.') -> list[SubstationSpec]:
+    # All substations are checked first, so that every problem of the spec file is reported at once
+    if not isinstance(spec['substations'], list):
+        raise ValueError('substations must be a list')
+    errors = []
+    for row, substation in enumerate(spec['substations'], start=1):
+        name = substation.get('name') if isinstance(substation, dict) else None
+        errors += [f'substation {row} ({name}): {error}' for error in check_substation(substation)]
+    if errors:
+        raise ValueError('Invalid spec file:\n  ' + '\n  '.join(errors))
+
+    specs = []
+    for substation in spec['substations']:
+        substation = dict(substation)
+        # Feeder files are relative to the spec file
+        feeders = []
+        for feeder in substation.get('feeders', []):
+            feeder = dict(feeder)
+            feeder['filename'] = os.path.join(base_path, feeder['filename'])
+            feeders.append(feeder)
+        substation['feeders'] = feeders
+        specs.append(SubstationSpec(**substation))
+    names = [spec.name for spec in specs]
+    if len(set(names)) != len(names):
+        raise ValueError('Substation names in a spec file must be unique')
+    return specs
+
+def add_aggregate_feeders(specs:list[SubstationSpec], filename:str) -> int:
+    # Add the rows of an aggregate feeder table to the spec of the substation named in each row
+    table = read_feeder_table(filename)
+    if 'substation' not in table:
+        raise ValueError(f'Aggregate feeder table {filename} needs a substation column')
+    by_name = {spec.name: spec for spec in specs}
+    columns = list(table.keys())
+    for row in range(len(table['substation'])):
+        values = {column: table[column][row] for column in columns}
+        name = values.pop('substation')
+        if name not in by_name:
+            raise ValueError(f'Aggregate feeder {values.get("feeder_name")} is in unknown substation {name}')
+        by_name[name].aggregate_feeders.append(values)
+    return len(table['substation'])
+
+def share_base_voltages(graph:dict[type, dict[str, object]], base_voltages:dict[float, object], cim:type) -> None:
+    # Replace BaseVoltages with the first one written for the same nominal voltage. The lists of
+    # the first BaseVoltage, such as ConductingEquipment, are not extended with the objects of
+    # later graphs, so that they are released when the graph is evicted.
+    replaced = {}
+    for mRID, base_voltage in list(graph.get(cim.BaseVoltage, {}).items()):
+        existing = base_voltages.setdefault(float(base_voltage.nominalVoltage), base_voltage)
+        if existing is not base_voltage:
+            replaced[id(base_voltage)] = existing
+            del graph[cim.BaseVoltage][mRID]
+    if replaced:
+        for objects in graph.values():
+            for obj in objects.values():
+                if id(getattr(obj, 'BaseVoltage', None)) in replaced:
+                    obj.BaseVoltage = replaced[id(obj.BaseVoltage)]
+
+def build(spec_file:str, output:str, processes:int=1, stream:bool=False, aggregate_feeders:str=None,
+          cim_profile:str=None, iec61970_301:int=None, mrid_namespace:str=None, timer:StageTimer=None,
+          validate:bool=False, partition:bool=False) -> int:
+    # Builds all substations of a spec file and writes the model to output.
+    # If validate is True, a ValueError is raised if the model has defects. If partition
+    # is True, output is a directory with one file per substation and a manifest.
+    # Returns the number of objects written.
+    if timer is None:
+        timer = StageTimer()
+
+    start = time.perf_counter()
+    spec = read_spec_file(spec_file)
+    settings = {key: spec.get(key, value) for key, value in DEFAULTS.items()}
+    for key, value in (('cim_profile', cim_profile), ('iec61970_301', iec61970_301),
+                       ('mrid_namespace', mrid_namespace)):
+        if value is not None:
+            settings[key] = value
+    specs = get_specs(spec, os.path.dirname(os.path.abspath(spec_file)))
+    if aggregate_feeders is not None:
+        add_aggregate_feeders(specs, aggregate_feeders)
+    timer.stage('read spec', start, len(specs))
+    if partition and validate:
+        raise ValueError('Validation is not supported for partitioned output')
+
+    start = time.perf_counter()
+    params = ConnectionParameters(filename=None, cim_profile=settings['cim_profile'],
+                                  iec61970_301=int(settings['iec61970_301']))
+    connection = RDFlibConnection(params)
+    cim = utils.get_cim_profile(connection)
+    timer.stage('connect', start)
+
+    if partition:
+        # Each worker writes its own substations, so only the manifest entries are collected
+        start = time.perf_counter()
+        manifest = export_partitions(specs, connection, output, processes=processes,
+                                     mrid_namespace=settings['mrid_namespace'])
+        counter = sum(entry['objects'] for entry in manifest['partitions'])
+        timer.stage('build and write', start, counter)
+        timer.total()
+        return counter
+
+    graphs = iter_substation_graphs(specs, connection, processes=processes, mrid_namespace=settings['mrid_namespace'])
+    if stream:
+        # Each substation is written as soon as it is built and then released
+        start = time.perf_counter()
+        base_voltages = {}
+        report = ValidationReport()
+        with utils.StreamingXMLWriter(output, connection) as writer:
+            for graph in graphs:
+                if validate: # Each substation is checked before its BaseVoltages are shared
+                    substation_report = validate_network(graph, connection)
+                    for issue, issues in vars(substation_report).items():
+                        getattr(report, issue).extend(issues)
+                share_base_voltages(graph, base_voltages, cim)
+                writer.write_network(graph, evict=True)
+            counter = len(writer.written)
+        timer.stage('build and write', start, counter)
+    else:
+        start = time.perf_counter()
+        network = DistributedArea(connection=connection, container=None, distributed=False)
+        merger = utils.GraphMerger(network)
+        for graph in graphs:
+            merger.merge(graph)
+        timer.stage('build', start, sum(len(objects) for objects in network.graph.values()))
+
+        if validate:
+            start = time.perf_counter()
+            report = validate_network(network)
+            timer.stage('validate', start, sum(report.counts().values()))
+
+        start = time.perf_counter()
+        with utils.StreamingXMLWriter(output, connection) as writer:
+            counter = writer.write_network(network)
+        timer.stage('write', start, counter)
+    timer.total()
+    if validate:
+        report.log()
+        if not report.ok:
+            raise ValueError(f'Model validation failed for {output}')
+    return counter
+
+def main(argv:list[str]=None) -> int:
+    parser = argparse.ArgumentParser(prog='cimbuilder', description='Build CIM substation models from a spec file')
+    parser.add_argument('spec', help='YAML, JSON, or CSV file listing the substations to build')
+    parser.add_argument('-o', '--output', required=True, help='CIM XML file to write, or directory with --partition')
+    parser.add_argument('-j', '--processes', type=int, default=1,
+                        help='number of worker processes (default 1, 0 for all CPUs)')
+    parser.add_argument('--stream', action='store_true',
+                        help='write each substation as soon as it is built instead of holding the whole model')
+    parser.add_argument('--partition', action='store_true',
+                        help='write each substation and its feeders to its own file with a manifest.json '
+                             'of the references between files')
+    parser.add_argument('--aggregate-feeders', help='CSV table of aggregate feeders with a substation column')
+    parser.add_argument('--cim-profile', help=f'CIM profile (default {DEFAULTS["cim_profile"]})')
+    parser.add_argument('--iec61970-301', type=int, help=f'IEC 61970-301 version (default {DEFAULTS["iec61970_301"]})')
+    parser.add_argument('--mrid-namespace', help='build with name-based mRIDs under this namespace')
+    parser.add_argument('--validate', action='store_true',
+                        help='check the model for duplicate names and mRIDs, one-sided links, and missing BaseVoltages '
+                             'and exit with an error if any are found')
+    parser.add_argument('--profile', help='record the time of each function and write it as JSON (.json) '
+                                          'or folded stacks for flame graphs (other extensions). '
+                                          'Only supported with one process (-j 1)')
+    parser.add_argument('-v', '--verbose', action='count', default=0, help='show info (-v) or debug (-vv) logging')
+    args = parser.parse_args(argv)
+
+    levels = [logging.WARNING, logging.INFO, logging.DEBUG]
+    logging.basicConfig(level=levels[min(args.verbose, 2)], format='%(levelname)s %(name)s: %(message)s')
+    processes = args.processes if args.processes > 0 else None
+    if args.profile and processes != 1:
+        # Worker processes are not profiled, so the profile would only show the main process
+        _log.error('--profile only supports one process, use -j 1')
+        return 1
+    profiler = utils.Profiler() if args.profile else None
+    try:
+        if profiler is not None:
+            profiler.enable()
+        build(args.spec, args.output, processes=processes, stream=args.stream,
+              aggregate_feeders=args.aggregate_feeders, cim_profile=args.cim_profile,
+              iec61970_301=args.iec61970_301, mrid_namespace=args.mrid_namespace, validate=args.validate,
+              partition=args.partition)
+    except (OSError, ValueError, ImportError) as error:
+        _log.error(error)
+        return 1
+    finally:
+        if profiler is not None:
+            profiler.disable()
+    if profiler is not None:
+        if args.profile.lower().endswith('.json'):
+            profiler.write_json(args.profile)
+        else:
+            profiler.write_folded(args.profile)
+        profiler.report()
+    return 0
+
+def _check_arguments(function:callable, label:str, arguments:object, fixed:tuple[str]=(),
+                     extra:tuple[str]=()) -> list[str]:
+    # Compare the keyword arguments of an entry with the signature of the builder method
+    if not isinstance(arguments, dict):
+        return [f'{label}: expected a mapping of arguments, got {type(arguments).__name__}']
+    parameters = {name: parameter for name, parameter in inspect.signature(function).parameters.items()
+                  if name != 'self' and name not in fixed}
+    errors = []
+    unknown = set(arguments) - set(parameters) - set(extra)
+    if unknown:
+        errors.append(f'{label}: unknown arguments {sorted(unknown)}, expected {sorted(parameters)}')
+    for name, parameter in parameters.items():
+        if name not in arguments:
+            if parameter.default is inspect.Parameter.empty:
+                errors.append(f'{label}: {name} is required')
+        elif parameter.annotation == 'int' and not _is_integer(arguments[name]):
+            errors.append(f'{label}: {name} must be an integer, got {arguments[name]!r}')
+    return errors
+
+def _is_number(value:object) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _is_integer(value:object) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _number(value:str) -> int|float|str:
+    for number_type in (int, float):
+        try:
+            return number_type(value)
+        except ValueError:
+            pass
+    return value
+
+if __name__ == '__main__':
+    sys.exit(main())
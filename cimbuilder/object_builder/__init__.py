@@ -1,6 +1,7 @@
 # from cimbuilder.object_builder.new_base_voltage import new_base_voltage as new_base_voltage
 from cimbuilder.object_builder.new_breaker import new_breaker as new_breaker
 from cimbuilder.object_builder.new_disconnector import new_disconnector as new_disconnector
+from cimbuilder.object_builder.new_switching_devices import new_switching_devices as new_switching_devices
 from cimbuilder.object_builder.new_bus_bar_section import new_bus_bar_section as new_bus_bar_section
 
 from cimbuilder.object_builder.new_one_terminal_obj import new_one_terminal_object as new_one_terminal_object
@@ -8,4 +9,7 @@ from cimbuilder.object_builder.new_two_terminal_obj import new_two_terminal_obje
 
 from cimbuilder.object_builder.new_analog import new_analog as new_analog
 from cimbuilder.object_builder.new_analog import create_all_analog as create_all_analog
-from cimbuilder.object_builder.new_discrete import new_discrete as new_discrete
\ No newline at end of file
+from cimbuilder.object_builder.new_discrete import new_discrete as new_discrete
+from cimbuilder.object_builder.measurement_profile import MeasurementRule as MeasurementRule
+from cimbuilder.object_builder.measurement_profile import MeasurementProfile as MeasurementProfile
+from cimbuilder.object_builder.measurement_profile import new_measurements as new_measurements
\ No newline at end of file
@@ -0,0 +1,113 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+import logging
+from dataclasses import dataclass, field
+
+from cimgraph import GraphModel
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
+
+import cimbuilder.utils as utils
+
+_log = logging.getLogger(__name__)
+
+@dataclass()
+class MeasurementRule:
+    class_type:type|str
+    measurement_class:type|str = field(default='Analog')
+    measurementType:str = field(default='VA')
+    per_terminal:bool = field(default=False)
+
+    def resolve(self, cim:type) -> tuple[type, type]:
+        # Classes are looked up by name in the CIM profile of the network
+        names = [cim_class if cim_class.__class__ == str else cim_class.__name__
+                 for cim_class in (self.class_type, self.measurement_class)]
+        class_type, measurement_class = [getattr(cim, name) for name in names]
+        # Measurements are attached to the terminals of the equipment
+        if not issubclass(class_type, cim.ConductingEquipment):
+            raise ValueError(f'Measurement rules need a ConductingEquipment class, not {names[0]}')
+        return class_type, measurement_class
+
+class MeasurementProfile():
+    """
+    Set of rules such as "every Breaker gets a Discrete Pos and an Analog VA for each
+    terminal" that are applied to a whole network at once. Measurements that already
+    exist for the same equipment, terminal, and measurementType are not created again.
+    """
+
+    def __init__(self, rules:list[MeasurementRule]=None):
+        self.rules = list(rules) if rules is not None else []
+
+    def add_rule(self, class_type:type|str, measurement_class:type|str='Analog', measurementType:str='VA',
+                 per_terminal:bool=False) -> MeasurementProfile:
+        # Rules apply to class_type and its subclasses. Classes can be given by name.
+        # Returns the profile, so calls can be chained.
+        self.rules.append(MeasurementRule(class_type, measurement_class, measurementType, per_terminal))
+        return self
+
+    def get_rules(self, cim_class:type, resolved:list[tuple]) -> list[tuple[MeasurementRule, type]]:
+        return [(rule, measurement_class) for rule, class_type, measurement_class in resolved
+                if issubclass(cim_class, class_type)]
+
+    def apply(self, network:GraphModel, equipment:list[object]=None) -> list[cim.Measurement]:
+        # Create the measurements of all equipment in the network, or of the given equipment only.
+        # Names follow new_analog, new_discrete, and create_all_analog.
+        cim = utils.get_cim_profile(network.connection) # Import CIM profile
+        resolved = [(rule, *rule.resolve(cim)) for rule in self.rules]
+        if equipment is None:
+            equipment = [obj for cim_class in list(network.graph.keys()) if self.get_rules(cim_class, resolved)
+                         for obj in network.graph[cim_class].values()]
+        measurement_index = utils.get_measurement_index(network)
+        measurement_index.refresh()
+        existing = measurement_index.measurements
+
+        # Rules are matched once per class instead of once per object
+        class_rules = {}
+        pending = []
+        # Keys of this batch, added to the index only once the measurement is created
+        reserved = set()
+        for obj in equipment:
+            rules = class_rules.get(obj.__class__)
+            if rules is None:
+                rules = self.get_rules(obj.__class__, resolved)
+                class_rules[obj.__class__] = rules
+            for rule, measurement_class in rules:
+                if not obj.Terminals:
+                    _log.warning(f'{obj.__class__.__name__} {obj.name} has no terminals for {rule.measurementType}')
+                    continue
+                prefix = f'{obj.__class__.__name__}_{obj.name}_{rule.measurementType}'
+                if rule.per_terminal:
+                    terminals = [(f'{prefix}_{counter}', terminal) for counter, terminal in enumerate(obj.Terminals, start=1)]
+                else:
+                    terminals = [(prefix, obj.Terminals[0])]
+                for name, terminal in terminals:
+                    key = (obj.mRID, terminal.mRID, rule.measurementType)
+                    if key in existing or key in reserved:
+                        continue
+                    reserved.add(key)
+                    pending.append((measurement_class, name, obj, terminal, rule.measurementType, key))
+
+        new_measurements = {}
+        created = []
+        mrids = utils.new_mrids([name for _, name, _, _, _, _ in pending])
+        for (class_type, name, obj, terminal, measurementType, key), mRID in zip(pending, mrids):
+            meas = class_type(name = name, mRID = mRID)
+            meas.Terminal = terminal
+            meas.PowerSystemResource = obj
+            meas.Location = obj.Location
+            meas.measurementType = measurementType
+            obj.Measurements.append(meas)
+            terminal.Measurements.append(meas)
+            existing[key] = meas
+            new_measurements.setdefault(class_type, []).append(meas)
+            created.append(meas)
+
+        # Insert all new measurements into the graph by class
+        for class_type, objects in new_measurements.items():
+            for meas in objects:
+                network.add_to_graph(meas)
+        measurement_index.refresh()
+        return created
+
+def new_measurements(network:GraphModel, profile:MeasurementProfile, equipment:list[object]=None) -> list[cim.Measurement]:
+    return profile.apply(network, equipment)
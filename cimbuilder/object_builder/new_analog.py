@@ -1,23 +1,26 @@
 from __future__ import annotations
+from typing import TYPE_CHECKING
 import importlib
 import logging
 
 from cimgraph import GraphModel
-import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typying import
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
 
 import cimbuilder.utils as utils
 
 _log = logging.getLogger(__name__)
 
 def new_analog(network:GraphModel, equipment:object, measurementType:str, terminal:object = None) -> object:
+    cim = utils.get_cim_profile(network.connection) # Import CIM profile
 
     # Use first terminal by default
     if terminal is None:
         terminal = equipment.Terminals[0]
 
     # Create a new analog for specified terminal
-    meas = cim.Analog(mRID = utils.new_mrid())
-    meas.name = f'{equipment.__class__.__name__}_{equipment.name}_{measurementType}'
+    name = f'{equipment.__class__.__name__}_{equipment.name}_{measurementType}'
+    meas = cim.Analog(name = name, mRID = utils.new_mrid(name))
     meas.Terminal = terminal
     meas.PowerSystemResource = equipment
     meas.Location = equipment.Location
@@ -29,12 +32,13 @@ def new_analog(network:GraphModel, equipment:object, measurementType:str, termin
     return meas
 
 def create_all_analog(network:GraphModel, equipment:object, measurementType:str) -> object:
+    cim = utils.get_cim_profile(network.connection) # Import CIM profile
     counter = 1
     meas_list = []
     for terminal in equipment.Terminals:
         # Create a new analog for each terminal
-        meas = cim.Analog(mRID = utils.new_mrid())
-        meas.name = f'{equipment.__class__.__name__}_{equipment.name}_{measurementType}_{counter}'
+        name = f'{equipment.__class__.__name__}_{equipment.name}_{measurementType}_{counter}'
+        meas = cim.Analog(name = name, mRID = utils.new_mrid(name))
         meas.Terminal = terminal
         meas.PowerSystemResource = equipment
         meas.Location = equipment.Location
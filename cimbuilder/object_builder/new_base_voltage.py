@@ -1,5 +1,8 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
 from cimgraph import GraphModel
-import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
 
 import cimbuilder.utils as utils
 
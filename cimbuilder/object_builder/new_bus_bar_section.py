@@ -1,24 +1,32 @@
 from __future__ import annotations
+from typing import TYPE_CHECKING
 import importlib
 import logging
 
 from cimgraph import GraphModel
-import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typying import
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
 
 import cimbuilder.utils as utils
 
 _log = logging.getLogger(__name__)
 
-def new_bus_bar_section(network:GraphModel, node:cim.ConnectivityNode) -> cim.BusbarSection:
-    busbar = cim.BusbarSection(mRID=utils.new_mrid())
+def new_bus_bar_section(network:GraphModel, node:cim.ConnectivityNode,
+                        base_voltage:cim.BaseVoltage=None) -> cim.BusbarSection:
+    cim = utils.get_cim_profile(network.connection) # Import CIM profile
+    busbar = cim.BusbarSection(mRID=utils.new_mrid(node.name))
     busbar.name = node.name
     busbar.EquipmentContainer = node.ConnectivityNodeContainer
+    if base_voltage is not None:
+        busbar.BaseVoltage = utils.get_base_voltage(network, base_voltage)
     
-    terminal = cim.Terminal(mRID = utils.new_mrid())
+    terminal = cim.Terminal(mRID = utils.new_mrid(node.name + 'busbar_t1'))
     terminal.name = node.name + 'busbar_t1'
     terminal.ConnectivityNode = node
     terminal.ConductingEquipment = busbar
     terminal.sequenceNumber = 1
+    busbar.Terminals.append(terminal)
+    node.Terminals.append(terminal)
 
     network.add_to_graph(busbar)
     network.add_to_graph(terminal)
@@ -1,18 +1,21 @@
 from __future__ import annotations
+from typing import TYPE_CHECKING
 import logging
 
 from cimgraph import GraphModel
-import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typying import
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
 
 import cimbuilder.utils as utils
  
 def new_disconnector(network:GraphModel, container:cim.EquipmentContainer, name:str, 
                 node1:str|cim.ConnectivityNode, node2:str|cim.ConnectivityNode,
                 open:bool=False, normalOpen:bool=False, retained:bool=False) -> cim.Disconnector:
+    cim = utils.get_cim_profile(network.connection) # Import CIM profile
 
-    disconnector = cim.Disconnector(name = name, mRID = utils.new_mrid())
-    t1 = cim.Terminal(name=f"{name}_t1", mRID = utils.new_mrid(), sequenceNumber=1)
-    t2 = cim.Terminal(name=f"{name}_t2", mRID = utils.new_mrid(), sequenceNumber=2)
+    disconnector = cim.Disconnector(name = name, mRID = utils.new_mrid(name))
+    t1 = cim.Terminal(name=f"{name}_t1", mRID = utils.new_mrid(f"{name}_t1"), sequenceNumber=1)
+    t2 = cim.Terminal(name=f"{name}_t2", mRID = utils.new_mrid(f"{name}_t2"), sequenceNumber=2)
 
     utils.terminal_to_node(network, t1, node1)
     utils.terminal_to_node(network, t2, node2)
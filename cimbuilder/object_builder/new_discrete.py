@@ -1,20 +1,23 @@
 from __future__ import annotations
+from typing import TYPE_CHECKING
 import importlib
 import logging
 
 from cimgraph import GraphModel
-import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typying import
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
 
 import cimbuilder.utils as utils
 
 _log = logging.getLogger(__name__)
 
 def new_discrete(network:GraphModel, equipment:object, measurementType:str) -> object:
+    cim = utils.get_cim_profile(network.connection) # Import CIM profile
     
     terminal = equipment.Terminals[0]
     # Create a new discrete for each terminal
-    meas = cim.Discrete( mRID = utils.new_mrid())
-    meas.name = f'{equipment.__class__.__name__}_{equipment.name}_{measurementType}'
+    name = f'{equipment.__class__.__name__}_{equipment.name}_{measurementType}'
+    meas = cim.Discrete(name = name, mRID = utils.new_mrid(name))
     meas.Terminal = terminal
     meas.PowerSystemResource = equipment
     meas.Location = equipment.Location
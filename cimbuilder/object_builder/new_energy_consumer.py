@@ -1,22 +1,26 @@
 from __future__ import annotations
+from typing import TYPE_CHECKING
 import importlib
 import logging
 
 from cimgraph import GraphModel
 from cimgraph.databases import ConnectionInterface
-from cimgraph.models.graph_model import new_mrid #TODO: replace with utils
-import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typying import
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
 
 from cimbuilder.utils.utils import terminal_to_node
+from cimbuilder.utils.mrid import new_mrid
+from cimbuilder.utils.cim_profile import get_cim_profile
 
 _log = logging.getLogger(__name__)
 
 def new_energy_consumer(network:GraphModel, container:cim.EquipmentContainer, name:str, 
                 node:str|cim.ConnectivityNode, p:float = 0, q:float = 0) -> None:
+    cim = get_cim_profile(network.connection) # Import CIM profile
 
-    load = cim.EnergyConsumer(name = name, mRID = new_mrid())
+    load = cim.EnergyConsumer(name = name, mRID = new_mrid(name))
 
-    t1 = cim.Terminal(name=f"{name}_t1", mRID = new_mrid(), sequenceNumber=1)
+    t1 = cim.Terminal(name=f"{name}_t1", mRID = new_mrid(f"{name}_t1"), sequenceNumber=1)
     t1.ConductingEquipment = load
     terminal_to_node(network, t1, node)
 
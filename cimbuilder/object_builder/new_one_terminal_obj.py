@@ -1,9 +1,11 @@
 from __future__ import annotations
+from typing import TYPE_CHECKING
 import importlib
 import logging
 
 from cimgraph import GraphModel
-import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typying import
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
 
 import cimbuilder.utils as utils
 
@@ -11,10 +13,11 @@ _log = logging.getLogger(__name__)
 
 def new_one_terminal_object(network:GraphModel, container:cim.EquipmentContainer, class_type:type,
                              name:str, node:str|cim.ConnectivityNode) -> object:
+    cim = utils.get_cim_profile(network.connection) # Import CIM profile
 
-    new_object = class_type(name = name, mRID = utils.new_mrid())
+    new_object = class_type(name = name, mRID = utils.new_mrid(name))
 
-    t1 = cim.Terminal(name=f"{name}_t1", mRID = utils.new_mrid(), sequenceNumber=1)
+    t1 = cim.Terminal(name=f"{name}_t1", mRID = utils.new_mrid(f"{name}_t1"), sequenceNumber=1)
     t1.ConductingEquipment = new_object
     utils.terminal_to_node(network, t1, node)
 
@@ -0,0 +1,71 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+import logging
+
+from cimgraph import GraphModel
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
+
+import cimbuilder.utils as utils
+
+_log = logging.getLogger(__name__)
+
+def new_switching_devices(network:GraphModel, container:cim.EquipmentContainer, devices:list[dict]) -> list[cim.Switch]:
+    # Each device is a dict with keys name, node1, node2 and optional keys
+    # class_type (default Breaker), open, normalOpen, and base_voltage
+    cim = utils.get_cim_profile(network.connection) # Import CIM profile
+
+    node_index = utils.get_node_index(network)
+    nodes = {}
+    base_voltages = {}
+    new_objects = {}
+    new_terminals = []
+    switches = []
+
+    for device in devices:
+        name = device['name']
+        class_type = device.get('class_type', cim.Breaker)
+
+        switch = class_type(name = name, mRID = utils.new_mrid(name))
+        t1 = cim.Terminal(name=f"{name}_t1", mRID = utils.new_mrid(f"{name}_t1"), sequenceNumber=1, ConductingEquipment=switch)
+        t2 = cim.Terminal(name=f"{name}_t2", mRID = utils.new_mrid(f"{name}_t2"), sequenceNumber=2, ConductingEquipment=switch)
+
+        switch.EquipmentContainer = container
+        switch.open = device.get('open', False)
+        switch.normalOpen = device.get('normalOpen', False)
+        switch.Terminals = [t1, t2]
+
+        # Resolve each BaseVoltage only once per batch
+        base_voltage = device.get('base_voltage')
+        if base_voltage.__class__ == float or base_voltage.__class__ == int:
+            if base_voltage not in base_voltages:
+                base_voltages[base_voltage] = utils.get_base_voltage(network, base_voltage)
+            base_voltage = base_voltages[base_voltage]
+        if base_voltage is not None:
+            switch.BaseVoltage = base_voltage
+
+        # Resolve string node names only once per batch
+        for terminal, node in ((t1, device['node1']), (t2, device['node2'])):
+            if node.__class__ == str:
+                if node not in nodes:
+                    nodes[node] = node_index.get(node)
+                node = nodes[node]
+                if node is None:
+                    _log.error(f'Terminal {terminal.name} was not connected to a ConnectivityNode')
+                    continue
+            terminal.ConnectivityNode = node
+            node.Terminals.append(terminal)
+
+        new_objects.setdefault(class_type, []).append(switch)
+        new_terminals.append(t1)
+        new_terminals.append(t2)
+        switches.append(switch)
+
+    # Insert all new objects into the graph with one update per class. Like add_to_graph,
+    # objects with an mRID that is already in the graph are not inserted.
+    new_objects[cim.Terminal] = new_terminals
+    for class_type, objects in new_objects.items():
+        class_objects = network.graph.setdefault(class_type, {})
+        class_objects.update({obj.mRID: obj for obj in objects if obj.mRID not in class_objects})
+
+    return switches
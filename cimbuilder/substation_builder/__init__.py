@@ -3,4 +3,13 @@ from cimbuilder.substation_builder.ring_bus import RingBusSubstation
 from cimbuilder.substation_builder.double_bus_single_breaker import DoubleBusSingleBreakerSubstation
 from cimbuilder.substation_builder.single_bus import SingleBusSubstation
 from cimbuilder.substation_builder.sectionalized_bus import SectionalizedBusSubstation
-from cimbuilder.substation_builder.breaker_and_a_half import BreakerAndHalfSubstation
\ No newline at end of file
+from cimbuilder.substation_builder.breaker_and_a_half import BreakerAndHalfSubstation
+from cimbuilder.substation_builder.substation_spec import SubstationSpec
+from cimbuilder.substation_builder.parallel_build import build_substations, iter_substation_graphs, map_specs
+from cimbuilder.substation_builder.async_feeders import attach_feeders, new_feeders
+from cimbuilder.substation_builder.bulk_branches import new_branches
+from cimbuilder.substation_builder.feeder_replicator import FeederReplicator, get_feeder_replicator
+from cimbuilder.substation_builder.partitioned_export import export_partitions, write_partitions
+from cimbuilder.substation_builder.template import SubstationTemplate, get_substation_template, new_substation, new_substations
+from cimbuilder.substation_builder.incremental import IncrementalBuild
+from cimbuilder.substation_builder.staging import StagingModel
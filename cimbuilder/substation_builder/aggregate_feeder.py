@@ -1,124 +1,268 @@
 from __future__ import annotations
+from typing import TYPE_CHECKING
+import contextlib
+import csv
 import logging
 
 from cimgraph.models import GraphModel
-import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typying import
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
 
-import cimbuilder.object_builder as builder
 import cimbuilder.utils as utils
 
 _log = logging.getLogger(__name__)
 
+# Numeric columns accepted by new_aggregate_feeders
+AGGREGATE_FEEDER_COLUMNS = ['total_load_kw', 'total_load_kvar', 'total_btm_pv_kw', 'total_ftm_pv_kw',
+                            'total_btm_wind_kw', 'total_ftm_wind_kw']
 
-def new_aggregate_feeder(network:GraphModel, feeder_name:str, breaker_name:str, substation:cim.Substation, 
+
+def new_aggregate_feeder(network:GraphModel, feeder_name:str, breaker_name:str, substation:cim.Substation,
                          node:cim.ConnectivityNode|str, base_voltage:cim.BaseVoltage|float,
                          total_load_kw:float=0, total_load_kvar:float=0, total_btm_pv_kw:float=0, total_ftm_pv_kw:float=0,
-                         total_btm_wind_kw:float=0, total_ftm_wind_kw:float=0) -> None:
-    
-    # get base voltage
-    if base_voltage.__class__ == float or base_voltage.__class__ == int:
-        # If numeric value given, search graph for a matching BaseVoltage object
-        found = False
-        if cim.BaseVoltage in network.graph:
-            for bv in network.graph[cim.BaseVoltage].values(): 
-                if bv.nominalVoltage == base_voltage or bv.nominalVoltage == base_voltage*1000 :
-                    found = True
-                    base_voltage_obj = bv
-        if not found: # If not found, create a new BaseVoltage object
-            _log.warning(f'Could not find a BaseVoltage with nominalVoltage {base_voltage}. Creating new object')
-            base_voltage_obj = cim.BaseVoltage(name = f'BaseV_{base_voltage}', mRID = utils.new_mrid(), nominalVoltage = base_voltage)
-            network.add_to_graph(base_voltage_obj)
-    else:
-        base_voltage_obj = base_voltage
-
-    
+                         total_btm_wind_kw:float=0, total_ftm_wind_kw:float=0,
+                         writer:utils.StreamingXMLWriter=None, changeset:utils.Changeset=None) -> cim.Feeder:
+    # Same as new_aggregate_feeders for one feeder. The feeder is also returned if it was written to writer.
+    feeders = _new_aggregate_feeders(network, {'feeder_name': [feeder_name], 'breaker_name': [breaker_name],
+                                               'total_load_kw': [total_load_kw], 'total_load_kvar': [total_load_kvar],
+                                               'total_btm_pv_kw': [total_btm_pv_kw], 'total_ftm_pv_kw': [total_ftm_pv_kw],
+                                               'total_btm_wind_kw': [total_btm_wind_kw], 'total_ftm_wind_kw': [total_ftm_wind_kw]},
+                                     substation=substation, node=node, base_voltage=base_voltage, writer=writer,
+                                     changeset=changeset, keep_feeders=True)
+    return feeders[0]
+
+
+def new_aggregate_feeders(network:GraphModel, feeders:dict[str, list]|str, substation:cim.Substation=None,
+                          node:cim.ConnectivityNode|str=None, base_voltage:cim.BaseVoltage|float=None,
+                          writer:utils.StreamingXMLWriter=None, changeset:utils.Changeset=None) -> list[cim.Feeder]:
+    # Builds a fleet of aggregate feeders from columnar input, which can be a dict of lists,
+    # a pandas DataFrame, or the path to a CSV file. Required column is feeder_name.
+    # Optional columns are breaker_name, substation, node, base_voltage, and AGGREGATE_FEEDER_COLUMNS.
+    # The substation, node, and base_voltage arguments are used for rows without those columns
+    # and for empty or NaN cells. Node names that are not found raise a ValueError.
+    # If a StreamingXMLWriter is given, each feeder is written as soon as it is built
+    # and is not added to the network graph or returned. The substation node does not
+    # list the breaker terminals that were written, so the feeders can be released.
+    # If a Changeset is given, all new objects are also added to it.
+    return _new_aggregate_feeders(network, feeders, substation, node, base_voltage, writer, changeset,
+                                  keep_feeders=writer is None)
+
+
+def _new_aggregate_feeders(network:GraphModel, feeders:dict[str, list]|str, substation:cim.Substation,
+                           node:cim.ConnectivityNode|str, base_voltage:cim.BaseVoltage|float,
+                           writer:utils.StreamingXMLWriter, changeset:utils.Changeset,
+                           keep_feeders:bool) -> list[cim.Feeder]:
+    cim = utils.get_cim_profile(network.connection) # Import CIM profile
+
+    if feeders.__class__ == str:
+        feeders = read_feeder_table(feeders)
+
+    feeder_names = list(feeders['feeder_name'])
+    total_feeders = len(feeder_names)
+    columns = {}
+    for column in ['breaker_name', 'substation', 'node', 'base_voltage'] + AGGREGATE_FEEDER_COLUMNS:
+        if column in feeders:
+            columns[column] = list(feeders[column])
+            if len(columns[column]) != total_feeders:
+                raise ValueError(f'Column {column} has {len(columns[column])} rows, expected {total_feeders}')
+        else:
+            columns[column] = None
+
+    substations = {}
+    nodes = {}
+    base_voltages = {}
+    new_objects = {}
+    new_feeders = []
+
+    # Resolve all node names before any feeder is connected to the network
+    node_names = [node] if columns['node'] is None else columns['node'] + [node]
+    for node_name in node_names:
+        if node_name.__class__ == str and node_name not in nodes and not _is_missing(node_name):
+            nodes[node_name] = utils.get_node_index(network).get(node_name)
+            if nodes[node_name] is None:
+                raise ValueError(f'Could not find ConnectivityNode {node_name}')
+
+    # Objects added to the graph are collected by the changeset, including new BaseVoltages
+    tracker = changeset.track(network) if changeset is not None else contextlib.nullcontext()
+    with tracker:
+        for row in range(total_feeders):
+            feeder_name = feeder_names[row]
+            values = {}
+            for column in AGGREGATE_FEEDER_COLUMNS:
+                values[column] = float(_get_value(columns[column], row, 0.0))
+
+            breaker_name = _get_value(columns['breaker_name'], row, f'{feeder_name}_breaker')
+
+            # Resolve substation, node, and BaseVoltage once for each distinct value
+            feeder_substation = _get_value(columns['substation'], row, substation)
+            if feeder_substation.__class__ == str:
+                if feeder_substation not in substations:
+                    substations[feeder_substation] = _get_substation(network, feeder_substation)
+                feeder_substation = substations[feeder_substation]
+
+            feeder_node = _get_value(columns['node'], row, node)
+            if feeder_node.__class__ == str:
+                feeder_node = nodes[feeder_node]
+            if feeder_node is None:
+                _log.error(f'Breaker {breaker_name} of feeder {feeder_name} was not connected to a ConnectivityNode')
+
+            feeder_voltage = _get_value(columns['base_voltage'], row, base_voltage)
+            if feeder_voltage is not None and feeder_voltage.__class__ != cim.BaseVoltage:
+                feeder_voltage = float(feeder_voltage)
+                if feeder_voltage not in base_voltages:
+                    base_voltages[feeder_voltage] = utils.get_base_voltage(network, feeder_voltage)
+                feeder_voltage = base_voltages[feeder_voltage]
+
+            feeder = _new_aggregate_feeder(cim, new_objects, feeder_name, breaker_name, feeder_substation,
+                                           feeder_node, feeder_voltage, link_node=writer is None, **values)
+
+            if writer is not None:
+                for objects in new_objects.values():
+                    writer.write_objects(objects)
+                    if changeset is not None:
+                        changeset.add_objects(objects)
+                new_objects = {}
+            if keep_feeders:
+                new_feeders.append(feeder)
+
+        # Insert all new objects into the graph by class
+        for objects in new_objects.values():
+            for obj in objects:
+                network.add_to_graph(obj)
+
+    return new_feeders
+
+
+def read_feeder_table(filename:str) -> dict[str, list]:
+    # Read a CSV file of aggregate feeders into columns
+    columns = {}
+    with open(filename, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            for column, value in row.items():
+                columns.setdefault(column, []).append(value)
+    return columns
+
+
+def _is_missing(value:object) -> bool:
+    # Empty CSV cells and pandas NaN are missing values
+    return value is None or value == '' or (isinstance(value, float) and value != value)
+
+
+def _get_value(column:list, row:int, default:object) -> object:
+    if column is None or _is_missing(column[row]):
+        return default
+    return column[row]
+
+
+def _get_substation(network:GraphModel, name:str) -> cim.Substation:
+    cim = utils.get_cim_profile(network.connection) # Import CIM profile
+    for substation in network.graph.get(cim.Substation, {}).values():
+        if substation.name == name or substation.mRID == name:
+            return substation
+    _log.error(f'Could not find Substation {name}')
+    return None
+
+
+def _new_aggregate_feeder(cim:type, new_objects:dict[type, list], feeder_name:str, breaker_name:str,
+                          substation:cim.Substation, node:cim.ConnectivityNode, base_voltage:cim.BaseVoltage,
+                          total_load_kw:float=0, total_load_kvar:float=0, total_btm_pv_kw:float=0, total_ftm_pv_kw:float=0,
+                          total_btm_wind_kw:float=0, total_ftm_wind_kw:float=0, link_node:bool=True) -> cim.Feeder:
+    # If link_node is False, the breaker terminal is connected to node without being
+    # added to node.Terminals
+
     # create feeder container
-    feeder_mrid = utils.new_mrid()
-    feeder = cim.Feeder(mRID = feeder_mrid, name=feeder_name)
+    feeder = cim.Feeder(mRID = utils.new_mrid(feeder_name), name=feeder_name)
     feeder.NormalEnergizingSubstation = substation
-    network.add_to_graph(feeder)
+    _add(new_objects, feeder)
 
     # create aggregate Node
-    feeder_node = cim.ConnectivityNode(name=f'{feeder_name}_1', mRID=utils.new_mrid())
+    feeder_node = cim.ConnectivityNode(name=f'{feeder_name}_1', mRID=utils.new_mrid(f'{feeder_name}_1'))
     feeder_node.ConnectivityNodeContainer = feeder
-    network.add_to_graph(feeder_node)
+    _add(new_objects, feeder_node)
 
     # create breaker
-    breaker = builder.new_two_terminal_object(network, container=substation, class_type=cim.Breaker, 
-                                              name=breaker_name, node1 = node, node2 = feeder_node)
+    breaker = _new_equipment(cim, new_objects, cim.Breaker, substation, breaker_name, [None, feeder_node])
+    if node is not None:
+        breaker.Terminals[0].ConnectivityNode = node
+        if link_node:
+            node.Terminals.append(breaker.Terminals[0])
     breaker.AdditionalEquipmentContainer = feeder
-    breaker.BaseVoltage = base_voltage_obj
-    builder.new_discrete(network, equipment=breaker, measurementType='Pos')
-    # builder.new_analog(network, equipment=breaker, measurementType='PNV')
-    meas = builder.new_analog(network, equipment=breaker, measurementType='VA', terminal=breaker.Terminals[1])
-    meas.aliasName = 'NetLoad(MW)'
-
-    meas = builder.new_analog(network, equipment=breaker, measurementType='VA', terminal=breaker.Terminals[1])
-    meas.aliasName = 'ExcessGeneration(MW)'
-
-    meas = builder.new_analog(network, equipment=breaker, measurementType='VA', terminal=breaker.Terminals[1])
-    meas.aliasName = 'TotalGeneration(MW)'
+    breaker.BaseVoltage = base_voltage
+    _new_measurement(new_objects, cim.Discrete, breaker, 'Pos')
+    _new_measurement(new_objects, cim.Analog, breaker, 'VA', breaker.Terminals[1], 'NetLoad(MW)')
+    _new_measurement(new_objects, cim.Analog, breaker, 'VA', breaker.Terminals[1], 'ExcessGeneration(MW)')
+    _new_measurement(new_objects, cim.Analog, breaker, 'VA', breaker.Terminals[1], 'TotalGeneration(MW)')
 
     # create energy consumer
-    load = builder.new_one_terminal_object(network, container=feeder, class_type=cim.EnergyConsumer,
-                                           name=f'{feeder_name}_aggr_load', node=feeder_node)                          
+    load = _new_equipment(cim, new_objects, cim.EnergyConsumer, feeder, f'{feeder_name}_aggr_load', [feeder_node])
     load.p = total_load_kw*1000
     load.q = total_load_kvar*1000
-    load.BaseVoltage = base_voltage_obj
-    # builder.new_analog(network, equipment=load, measurementType='PNV')
-    meas = builder.new_analog(network, equipment=load, measurementType='VA')
-    meas.aliasName = 'GrossLoad(MW)'
-
-    # create BTM PV objects
-    
-    btm_inverter = builder.new_one_terminal_object(network, container=feeder, class_type=cim.PowerElectronicsConnection,
-                                               name=f'{feeder_name}_aggr_btm_pv', node = feeder_node)
-    btm_inverter.p = total_btm_pv_kw*1000 + total_btm_wind_kw*1000
-    btm_inverter.q = 0
-    btm_inverter.BaseVoltage = base_voltage_obj
-    pv_unit = cim.PhotovoltaicUnit(name=f'{feeder_name}_aggr_btm_pv', mRID = utils.new_mrid())
-    pv_unit.minP = 0.0
-    pv_unit.maxP = total_btm_pv_kw*1000
-    pv_unit.PowerElectronicsConnection = btm_inverter
-    btm_inverter.PowerElectronicsUnit.append(pv_unit)
-    network.add_to_graph(pv_unit)
-    
-    if total_btm_wind_kw:
-        wind_unit = cim.PowerElectronicsWindUnit(name=f'{feeder_name}_aggr_btm_wind', mRID = utils.new_mrid())
-        wind_unit.minP = 0.0
-        wind_unit.maxP = total_btm_wind_kw*1000
-        wind_unit.PowerElectronicsConnection = btm_inverter
-        btm_inverter.PowerElectronicsUnit.append(wind_unit)
-        network.add_to_graph(wind_unit)
-
-    # builder.new_analog(network, equipment=inverter, measurementType='PNV')
-    meas = builder.new_analog(network, equipment=btm_inverter, measurementType='VA')
-    meas.aliasName = 'BTMGeneration(MW)'
-
-    # create FTM PV objects
-    ftm_inverter = builder.new_one_terminal_object(network, container=feeder, class_type=cim.PowerElectronicsConnection,
-                                               name=f'{feeder_name}_aggr_ftm_pv', node = feeder_node)
-    ftm_inverter.p = total_ftm_pv_kw*1000 + total_ftm_wind_kw*1000
-    ftm_inverter.q = 0
-    ftm_inverter.BaseVoltage = base_voltage_obj
-    pv_unit = cim.PhotovoltaicUnit(name=f'{feeder_name}_aggr_ftm_pv', mRID = utils.new_mrid())
-    pv_unit.minP = 0.0
-    pv_unit.maxP = ftm_inverter.p
-    pv_unit.PowerElectronicsConnection = btm_inverter
-    network.add_to_graph(pv_unit)
-    btm_inverter.PowerElectronicsUnit.append(pv_unit)
-    if total_ftm_wind_kw:
-        wind_unit = cim.PowerElectronicsWindUnit(name=f'{feeder_name}_aggr_ftm_wind', mRID = utils.new_mrid())
-        wind_unit.minP = 0.0
-        wind_unit.maxP = total_ftm_wind_kw*1000
-        wind_unit.PowerElectronicsConnection = ftm_inverter
-        ftm_inverter.PowerElectronicsUnit.append(wind_unit)
-        network.add_to_graph(wind_unit)
-
-    # builder.new_analog(network, equipment=inverter, measurementType='PNV')
-    meas = builder.new_analog(network, equipment=btm_inverter, measurementType='VA')
-    meas.aliasName = 'FTMGeneration(MW)'
+    load.BaseVoltage = base_voltage
+    _new_measurement(new_objects, cim.Analog, load, 'VA', alias_name='GrossLoad(MW)')
+
+    # create BTM and FTM PV objects
+    for location, total_pv_kw, total_wind_kw in (('btm', total_btm_pv_kw, total_btm_wind_kw),
+                                                 ('ftm', total_ftm_pv_kw, total_ftm_wind_kw)):
+        inverter = _new_equipment(cim, new_objects, cim.PowerElectronicsConnection, feeder,
+                                  f'{feeder_name}_aggr_{location}_pv', [feeder_node])
+        inverter.p = total_pv_kw*1000 + total_wind_kw*1000
+        inverter.q = 0
+        inverter.BaseVoltage = base_voltage
+
+        pv_unit = cim.PhotovoltaicUnit(name=f'{feeder_name}_aggr_{location}_pv', mRID = utils.new_mrid(f'{feeder_name}_aggr_{location}_pv'))
+        pv_unit.minP = 0.0
+        pv_unit.maxP = total_pv_kw*1000
+        pv_unit.PowerElectronicsConnection = inverter
+        inverter.PowerElectronicsUnit.append(pv_unit)
+        _add(new_objects, pv_unit)
+
+        if total_wind_kw:
+            wind_unit = cim.PowerElectronicsWindUnit(name=f'{feeder_name}_aggr_{location}_wind', mRID = utils.new_mrid(f'{feeder_name}_aggr_{location}_wind'))
+            wind_unit.minP = 0.0
+            wind_unit.maxP = total_wind_kw*1000
+            wind_unit.PowerElectronicsConnection = inverter
+            inverter.PowerElectronicsUnit.append(wind_unit)
+            _add(new_objects, wind_unit)
+
+        _new_measurement(new_objects, cim.Analog, inverter, 'VA', alias_name=f'{location.upper()}Generation(MW)')
+
+    return feeder
+
+
+def _add(new_objects:dict[type, list], obj:object) -> None:
+    new_objects.setdefault(obj.__class__, []).append(obj)
 
 
+def _new_equipment(cim:type, new_objects:dict[type, list], class_type:type, container:cim.EquipmentContainer,
+                   name:str, nodes:list[cim.ConnectivityNode]) -> object:
+    # Same structure as new_one_terminal_object and new_two_terminal_object
+    equipment = class_type(name = name, mRID = utils.new_mrid(name))
+    equipment.EquipmentContainer = container
+    _add(new_objects, equipment)
+    for sequence_number, node in enumerate(nodes, start=1):
+        terminal = cim.Terminal(name=f"{name}_t{sequence_number}", mRID = utils.new_mrid(f"{name}_t{sequence_number}"),
+                                sequenceNumber=sequence_number, ConductingEquipment=equipment)
+        equipment.Terminals.append(terminal)
+        if node is not None:
+            terminal.ConnectivityNode = node
+            node.Terminals.append(terminal)
+        _add(new_objects, terminal)
+    return equipment
 
 
+def _new_measurement(new_objects:dict[type, list], class_type:type, equipment:object, measurementType:str,
+                     terminal:cim.Terminal=None, alias_name:str=None) -> object:
+    # Same structure as new_analog and new_discrete
+    if terminal is None:
+        terminal = equipment.Terminals[0]
+    name = f'{equipment.__class__.__name__}_{equipment.name}_{measurementType}'
+    meas = class_type(name = name, mRID = utils.new_mrid(name))
+    meas.aliasName = alias_name
+    meas.Terminal = terminal
+    meas.PowerSystemResource = equipment
+    meas.Location = equipment.Location
+    meas.measurementType = measurementType
+    equipment.Measurements.append(meas)
+    terminal.Measurements.append(meas)
+    _add(new_objects, meas)
+    return meas
@@ -0,0 +1,45 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+import asyncio
+import logging
+from concurrent.futures import Executor, ThreadPoolExecutor
+
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
+
+import cimbuilder.utils as utils
+
+_log = logging.getLogger(__name__)
+
+async def attach_feeders(builder:object, feeders:list[dict], concurrency:int=8,
+                         executor:Executor=None) -> list[cim.ConnectivityNode]:
+    # Attach distribution feeders to a substation builder. Each item of feeders has the
+    # keyword arguments of builder.new_feeder. The source buses of up to concurrency feeders
+    # are queried at the same time in worker threads, while new_feeder is called in order
+    # in the calling thread as soon as the source bus of each feeder is known.
+    # Returns the source bus of each feeder.
+    if executor is None:
+        with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+            return await attach_feeders(builder, feeders, concurrency, executor)
+
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    tasks = [asyncio.ensure_future(utils.get_sourcebus_async(feeder['feeder_network'], feeder['feeder'],
+                                                             feeder.get('sourcebus'), executor, semaphore))
+             for feeder in feeders]
+    sourcebuses = []
+    try:
+        for feeder, task in zip(feeders, tasks):
+            sourcebus = await task
+            if sourcebus is None:
+                _log.error(f'Feeder {feeder["feeder"].name} was not attached to {builder.substation.name}')
+            else:
+                builder.new_feeder(**dict(feeder, sourcebus=sourcebus))
+            sourcebuses.append(sourcebus)
+    finally:
+        for task in tasks:
+            task.cancel()
+    return sourcebuses
+
+def new_feeders(builder:object, feeders:list[dict], concurrency:int=8) -> list[cim.ConnectivityNode]:
+    # Blocking version of attach_feeders for scripts without an event loop
+    return asyncio.run(attach_feeders(builder, feeders, concurrency))
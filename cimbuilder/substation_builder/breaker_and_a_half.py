@@ -1,11 +1,15 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
 from dataclasses import dataclass, field
 
 from cimgraph.models import GraphModel, DistributedArea
 from cimgraph.databases import ConnectionInterface
-import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
 
 import cimbuilder.object_builder as object_builder
 import cimbuilder.utils as utils
+from cimbuilder.substation_builder.bulk_branches import new_branches
 
 import logging
 _log = logging.getLogger(__name__)
@@ -22,7 +26,7 @@ class BreakerAndHalfSubstation:
         self.cim = utils.get_cim_profile(self.connection)  # Import CIM profile
 
         # Create new substation class
-        self.substation = self.cim.Substation(mRID=utils.new_mrid(), name=self.name)
+        self.substation = self.cim.Substation(mRID=utils.new_mrid(self.name), name=self.name)
 
         # If no network defined, create substation as a DistributedArea
         if not self.network:
@@ -32,16 +36,16 @@ class BreakerAndHalfSubstation:
         self.base_voltage = utils.get_base_voltage(self.network, self.base_voltage)
 
         # first main bus
-        self.main_bus_1 = self.cim.ConnectivityNode(name=f'{self.name}_main_bus_1', mRID=utils.new_mrid())
+        self.main_bus_1 = self.cim.ConnectivityNode(name=f'{self.name}_main_bus_1', mRID=utils.new_mrid(f'{self.name}_main_bus_1'))
         self.main_bus_1.ConnectivityNodeContainer = self.substation
         self.network.add_to_graph(self.main_bus_1)
-        object_builder.new_bus_bar_section(self.network, self.main_bus_1)
+        object_builder.new_bus_bar_section(self.network, self.main_bus_1, self.base_voltage)
 
         # second main bus
-        self.main_bus_2 = self.cim.ConnectivityNode(name=f'{self.name}_main_bus_2', mRID=utils.new_mrid())
+        self.main_bus_2 = self.cim.ConnectivityNode(name=f'{self.name}_main_bus_2', mRID=utils.new_mrid(f'{self.name}_main_bus_2'))
         self.main_bus_2.ConnectivityNodeContainer = self.substation
         self.network.add_to_graph(self.main_bus_2)
-        object_builder.new_bus_bar_section(self.network, self.main_bus_2)
+        object_builder.new_bus_bar_section(self.network, self.main_bus_2, self.base_voltage)
 
         # Create bus ties
         for tie in range(self.total_bus_ties):
@@ -58,58 +62,50 @@ class BreakerAndHalfSubstation:
         junctions = []
 
         for i in range(number_of_junctions):
-            junctions.append(cim.ConnectivityNode(name=f'{self.substation.name}_{tie_number}_bt_j{i + 1}',
-                                                mRID=utils.new_mrid(), ConnectivityNodeContainer=self.substation))
-
-        tie_number = 10*tie_number
+            junctions.append(self.cim.ConnectivityNode(name=f'{self.substation.name}_{tie_number}_bt_j{i + 1}',
+                                                     mRID=utils.new_mrid(f'{self.substation.name}_{tie_number}_bt_j{i + 1}'),
+                                                     ConnectivityNodeContainer=self.substation))
 
         # There are three bus tie arrangements
         # Each bus tie arrangement consists of 3 bus-tie breakers
-        # and two air gap switches on each side of each bus-tie breaker
+        # and two air gap switches on each side of each bus-tie breaker.
+        # Devices are named like the junctions so that names are unique for any tie number.
+        prefix = f'{self.name}_{tie_number}_bt'
 
         # first bus-tie arrangement
-        bus_tie_1 = object_builder.new_breaker(self.network, self.substation, name=f'{self.name}_bt_{tie_number}',
-                                               node1=junctions[0], node2=junctions[1])
-        airgap1 = object_builder.new_disconnector(self.network, self.substation,
-                                                  name=f'{self.name}_bt_{10+tie_number + 1}', node1=self.main_bus_1,
-                                                  node2=junctions[0])
-        airgap2 = object_builder.new_disconnector(self.network, self.substation,
-                                                  name=f'{self.name}_bt_{10+tie_number + 2}', node1=junctions[1],
-                                                  node2=junctions[2])
+        devices = [dict(class_type=self.cim.Breaker, name=f'{prefix}_b1',
+                        node1=junctions[0], node2=junctions[1]),
+                   dict(class_type=self.cim.Disconnector, name=f'{prefix}_d1',
+                        node1=self.main_bus_1, node2=junctions[0]),
+                   dict(class_type=self.cim.Disconnector, name=f'{prefix}_d2',
+                        node1=junctions[1], node2=junctions[2])]
         # second bus-tie arrangement
-        bus_tie_2 = object_builder.new_breaker(self.network, self.substation, name=f'{self.name}_bt_{2*tie_number}',
-                                               node1=junctions[3], node2=junctions[4])
-        airgap3 = object_builder.new_disconnector(self.network, self.substation,
-                                                  name=f'{self.name}_bt_{20+tie_number + 1}', node1=junctions[2],
-                                                  node2=junctions[3])
-        airgap4 = object_builder.new_disconnector(self.network, self.substation,
-                                                  name=f'{self.name}_bt_{20+tie_number + 2}', node1=junctions[4],
-                                                  node2=junctions[5])
+        devices += [dict(class_type=self.cim.Breaker, name=f'{prefix}_b2',
+                         node1=junctions[3], node2=junctions[4]),
+                    dict(class_type=self.cim.Disconnector, name=f'{prefix}_d3',
+                         node1=junctions[2], node2=junctions[3]),
+                    dict(class_type=self.cim.Disconnector, name=f'{prefix}_d4',
+                         node1=junctions[4], node2=junctions[5])]
         # third bus-tie arrangement
-        bus_tie_3 = object_builder.new_breaker(self.network, self.substation, name=f'{self.name}_bt_{3*tie_number}',
-                                               node1=junctions[6], node2=junctions[7])
-        airgap5 = object_builder.new_disconnector(self.network, self.substation,
-                                                  name=f'{self.name}_bt_{30+tie_number + 1}', node1=junctions[5],
-                                                  node2=junctions[6])
-        airgap6 = object_builder.new_disconnector(self.network, self.substation,
-                                                  name=f'{self.name}_bt_{30+tie_number + 2}', node1=junctions[7],
-                                                  node2=self.main_bus_2)
-
-        bus_tie_1.BaseVoltage = self.base_voltage
-        bus_tie_2.BaseVoltage = self.base_voltage
-        bus_tie_3.BaseVoltage = self.base_voltage
+        devices += [dict(class_type=self.cim.Breaker, name=f'{prefix}_b3',
+                         node1=junctions[6], node2=junctions[7]),
+                    dict(class_type=self.cim.Disconnector, name=f'{prefix}_d5',
+                         node1=junctions[5], node2=junctions[6]),
+                    dict(class_type=self.cim.Disconnector, name=f'{prefix}_d6',
+                         node1=junctions[7], node2=self.main_bus_2)]
 
-        airgap1.BaseVoltage = self.base_voltage
-        airgap2.BaseVoltage = self.base_voltage
-        airgap3.BaseVoltage = self.base_voltage
-        airgap4.BaseVoltage = self.base_voltage
-        airgap5.BaseVoltage = self.base_voltage
-        airgap6.BaseVoltage = self.base_voltage
+        for device in devices:
+            device['base_voltage'] = self.base_voltage
+        object_builder.new_switching_devices(self.network, self.substation, devices)
 
         for junction in junctions:
             self.network.add_to_graph(junction)
 
     def new_branch(self, branch_number:int, tie_number:int, branch_equipment:cim.ConductingEquipment, branch_terminal:cim.Terminal|int) -> None:
+        new_branches([(branch_terminal, self, dict(branch_number=branch_number, tie_number=tie_number))])
+
+    def get_branch_bay(self, branch_number:int, tie_number:int) -> tuple[list[cim.ConnectivityNode], list[dict], cim.ConnectivityNode]:
+        # Junctions and switching devices of a branch and the node of the branch terminal.
         # Odd numbered-branches will connect to junction 3 on the
         # specified tie number while even numbers on junction 6
 
@@ -120,17 +116,14 @@ class BreakerAndHalfSubstation:
             jcn_name = f'{self.substation.name}_{tie_number}_bt_j{3}'
             jcn_num = 1
 
-        junction1 = cim.ConnectivityNode(name=f'{self.substation.name}_{branch_number}_j{jcn_num}',
-                                         mRID=utils.new_mrid(),
-                                         ConnectivityNodeContainer=self.substation)
-        airgap1 = object_builder.new_disconnector(self.network, self.substation,
-                                                  name=f'{self.substation.name}_{10 * branch_number}', node1=jcn_name,
-                                                  node2=junction1)
-        airgap1.BaseVoltage = self.base_voltage
+        junction1 = self.cim.ConnectivityNode(name=f'{self.substation.name}_{branch_number}_j{jcn_num}',
+                                              mRID=utils.new_mrid(f'{self.substation.name}_{branch_number}_j{jcn_num}'),
+                                              ConnectivityNodeContainer=self.substation)
+        devices = [dict(class_type=self.cim.Disconnector,
+                        name=f'{self.substation.name}_{10 * branch_number}', node1=jcn_name,
+                        node2=junction1)]
 
-        branch_terminal.ConnectivityNode = junction1
-
-        self.network.add_to_graph(junction1)
+        return [junction1], devices, junction1
 
     def new_feeder(self, branch_number: int, tie_number: int, feeder_network: GraphModel, feeder: cim.Feeder,
                    sourcebus: cim.ConnectivityNode = None) -> None:
@@ -148,20 +141,8 @@ class BreakerAndHalfSubstation:
             jcn_name = f'{self.substation.name}_{tie_number}_bt_j{3}'
             jcn_num = 1
 
-        feeder_network.get_all_edges(cim.Feeder)
-
         # If sourcebus of feeder not specified, look for something named sourcebus
-        if not sourcebus:
-            found = False
-            feeder_network.get_all_edges(cim.EnergySource)
-            feeder_network.get_all_edges(cim.Terminal)
-            feeder_network.get_all_edges(cim.ConnectivityNode)
-            for source in feeder_network.graph[cim.EnergySource].values():
-                if source.Terminals[0].ConnectivityNode.name == 'sourcebus':
-                    sourcebus = source.Terminals[0].ConnectivityNode
-                    found = True
-            if not found:
-                _log.error(f'Could not find sourcebus for {feeder.name}')
+        sourcebus = utils.get_sourcebus(feeder_network, feeder, sourcebus)
 
         airgap1 = object_builder.new_disconnector(self.network, self.substation,
                                                   name=f'{self.substation.name}_{10 * branch_number}',
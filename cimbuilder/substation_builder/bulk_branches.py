@@ -0,0 +1,45 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+import logging
+
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
+
+import cimbuilder.object_builder as object_builder
+
+_log = logging.getLogger(__name__)
+
+def new_branches(branches:list[tuple[cim.Terminal|int, object, int|tuple|dict]]) -> int:
+    # Connect many branch terminals to substations at once. Each branch is a tuple of the
+    # branch terminal, the substation builder, and the position arguments of new_branch,
+    # such as series_number, (branch_number, tie_number), or a dict of keyword arguments.
+    # The switching devices of all bays of a substation are created in one batch.
+    # Returns the number of bays created.
+
+    bays = {}
+    for branch_terminal, builder, position in branches:
+        if position.__class__ == dict:
+            bay = builder.get_branch_bay(**position)
+        elif position.__class__ == tuple or position.__class__ == list:
+            bay = builder.get_branch_bay(*position)
+        else:
+            bay = builder.get_branch_bay(position)
+        bays.setdefault(id(builder), (builder, []))[1].append((branch_terminal, bay))
+
+    for builder, substation_bays in bays.values():
+        devices = []
+        for _, (junctions, bay_devices, node) in substation_bays:
+            for device in bay_devices:
+                device['base_voltage'] = builder.base_voltage
+            devices += bay_devices
+        object_builder.new_switching_devices(builder.network, builder.substation, devices)
+
+        # Insert all junctions into the graph
+        for branch_terminal, (junctions, _, node) in substation_bays:
+            if type(branch_terminal) == builder.cim.Terminal:
+                branch_terminal.ConnectivityNode = node
+                node.Terminals.append(branch_terminal)
+            for junction in junctions:
+                builder.network.add_to_graph(junction)
+
+    return len(branches)
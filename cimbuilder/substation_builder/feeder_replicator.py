@@ -0,0 +1,119 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+from cimgraph.models import GraphModel, FeederModel, DistributedArea
+from cimgraph.databases import ConnectionParameters, RDFlibConnection
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
+
+import cimbuilder.utils as utils
+
+import logging
+_log = logging.getLogger(__name__)
+
+# Catalog and reference data that all copies of a feeder link to instead of copying,
+# such as the wire and transformer datasheets of an asset model
+SHARED_CLASSES = ['AssetInfo', 'TransformerTest', 'WirePosition', 'PerLengthImpedance', 'PhaseImpedanceData',
+                  'LoadResponseCharacteristic', 'OperationalLimitType', 'BaseVoltage', 'CoordinateSystem',
+                  'GeographicalRegion', 'SubGeographicalRegion']
+
+# Loaded feeders keyed by filename, feeder mRID, and CIM profile
+_replicators = {}
+
+class FeederReplicator():
+    """
+    Distribution feeder loaded once and copied in memory. Each copy has new names and
+    mRIDs and links to the same catalog objects as the original, so one feeder model
+    can be attached under many substations without parsing the file again.
+    """
+
+    def __init__(self, feeder_network:GraphModel, feeder:cim.Feeder, sourcebus:cim.ConnectivityNode=None,
+                 shared_classes:list[str]=SHARED_CLASSES):
+        self.network = feeder_network
+        self.connection = feeder_network.connection
+        self.cim = utils.get_cim_profile(self.connection)
+        expand_network(feeder_network)
+        # The graph may hold its own object for the feeder container
+        feeder = feeder_network.graph.get(self.cim.Feeder, {}).get(feeder.mRID, feeder)
+        self.feeder = feeder
+
+        # Every object is expanded, so the source bus is found without new queries
+        cache = utils.get_sourcebus_cache(feeder_network)
+        cache.expanded.update(obj.mRID for class_objects in feeder_network.graph.values()
+                              for obj in class_objects.values())
+        if sourcebus is None:
+            sourcebus = cache.get(feeder)
+            if sourcebus is None:
+                raise ValueError(f'Could not find the source bus of feeder {feeder.name}')
+        self.sourcebus = sourcebus
+
+        shared_types = tuple(getattr(self.cim, name) for name in shared_classes if hasattr(self.cim, name))
+        objects = []
+        self.shared = []
+        for cim_class, class_objects in feeder_network.graph.items():
+            if issubclass(cim_class, shared_types):
+                self.shared.extend(class_objects.values())
+            else:
+                objects.extend(class_objects.values())
+        self.objects = utils.ObjectTemplate(objects)
+        positions = {id(obj): position for position, obj in enumerate(objects)}
+        self.feeder_index = positions[id(feeder)]
+        self.sourcebus_index = positions[id(sourcebus)]
+
+    def replicate(self, name:str, rename:callable=None) -> tuple[GraphModel, cim.Feeder, cim.ConnectivityNode]:
+        # Returns the network, feeder, and source bus of a new copy. Object names are
+        # prefixed with name unless a rename function is given.
+        if rename is None:
+            rename = lambda text: f'{name}_{text}'
+        # Copies are appended to the lists of the shared objects that hold the originals,
+        # such as BaseVoltage.ConductingEquipment
+        copies = self.objects.clone(rename=rename, rename_fields=['name'])
+        feeder = copies[self.feeder_index]
+        sourcebus = copies[self.sourcebus_index]
+
+        network = DistributedArea(connection=self.connection, container=feeder, distributed=False)
+        for obj in self.shared:
+            network.add_to_graph(obj)
+        for new_obj in copies:
+            network.add_to_graph(new_obj)
+
+        # The copy is complete, so get_sourcebus in new_feeder does not query the file
+        cache = utils.get_sourcebus_cache(network)
+        cache.expanded.update(new_obj.mRID for new_obj in copies)
+        cache.sourcebuses[sourcebus.name] = sourcebus
+        return network, feeder, sourcebus
+
+    def attach(self, builder:object, name:str, rename:callable=None, **kwargs) -> GraphModel:
+        # Attach a new copy to a substation builder. kwargs are the position arguments of
+        # builder.new_feeder, such as series_number. Returns the network of the copy.
+        network, feeder, sourcebus = self.replicate(name, rename)
+        builder.new_feeder(feeder_network=network, feeder=feeder, sourcebus=sourcebus, **kwargs)
+        return network
+
+def expand_network(network:GraphModel) -> int:
+    # Get the edges of every class in the network until no new classes are found.
+    # Returns the number of objects.
+    expanded = set()
+    while True:
+        cim_classes = [cim_class for cim_class in network.graph if cim_class not in expanded]
+        if not cim_classes:
+            break
+        for cim_class in cim_classes:
+            network.get_all_edges(cim_class)
+            expanded.add(cim_class)
+    return sum(len(class_objects) for class_objects in network.graph.values())
+
+def get_feeder_replicator(filename:str, mrid:str, cim_profile:str='cimhub_2023', iec61970_301:int=8,
+                          shared_classes:list[str]=SHARED_CLASSES) -> FeederReplicator:
+    # Reads the feeder with the given mRID from an XML file the first time it is requested
+    key = (filename, mrid, cim_profile, iec61970_301, tuple(shared_classes))
+    replicator = _replicators.get(key)
+    if replicator is None:
+        params = ConnectionParameters(filename=filename, cim_profile=cim_profile, iec61970_301=iec61970_301)
+        connection = RDFlibConnection(params)
+        feeder = utils.get_cim_profile(connection).Feeder(mRID=mrid)
+        feeder_network = FeederModel(connection=connection, container=feeder, distributed=False)
+        replicator = FeederReplicator(feeder_network, feeder, shared_classes=shared_classes)
+        _log.info(f'Loaded feeder {feeder.name} from {filename} for replication')
+        _replicators[key] = replicator
+    return replicator
@@ -0,0 +1,147 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+import dataclasses
+import hashlib
+import json
+import os
+import uuid
+
+from cimgraph.databases import ConnectionInterface
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
+
+from cimbuilder.substation_builder.substation_spec import SubstationSpec
+import cimbuilder.utils as utils
+
+import logging
+_log = logging.getLogger(__name__)
+
+# Increase to invalidate all cached fragments when the builders change
+FRAGMENT_VERSION = 1
+
+class IncrementalBuild():
+    """
+    Rebuilds only the substations whose spec changed since the last run. Each substation
+    is stored as an XML fragment in cache_dir, and manifest.json records a hash of the
+    spec and of the feeder files it uses. Substations are built with name-based mRIDs,
+    so unchanged substations produce byte-identical fragments. BaseVoltages get mRIDs
+    based on their nominal voltage and are written once in the assembled model.
+    """
+
+    def __init__(self, cache_dir:str, connection:ConnectionInterface, mrid_namespace:uuid.UUID|str='cimbuilder'):
+        self.cache_dir = cache_dir
+        self.connection = connection
+        self.cim = utils.get_cim_profile(connection)
+        if mrid_namespace.__class__ == str:
+            mrid_namespace = uuid.uuid5(utils.mrid.CIMBUILDER_NAMESPACE, mrid_namespace)
+        self.mrid_namespace = mrid_namespace
+        self.manifest_file = os.path.join(cache_dir, 'manifest.json')
+        self.file_digests = {}
+        self.serializer = utils.StreamingXMLWriter(None, connection)
+        self.manifest = self.load_manifest()
+
+    def load_manifest(self) -> dict:
+        empty = {'version': FRAGMENT_VERSION, 'namespace': str(self.mrid_namespace), 'fragments': {}}
+        if not os.path.exists(self.manifest_file):
+            return empty
+        with open(self.manifest_file, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') != FRAGMENT_VERSION or manifest.get('namespace') != str(self.mrid_namespace):
+            _log.info('Build manifest is from another version or namespace, rebuilding all substations')
+            return empty
+        return manifest
+
+    def save_manifest(self) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.manifest_file, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+
+    def file_digest(self, filename:str) -> str:
+        digest = self.file_digests.get(filename)
+        if digest is None:
+            with open(filename, 'rb') as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+            self.file_digests[filename] = digest
+        return digest
+
+    def spec_hash(self, spec:SubstationSpec) -> str:
+        inputs = dataclasses.asdict(spec)
+        inputs['topology'] = spec.get_builder_class().__name__
+        inputs['feeder_files'] = [self.file_digest(feeder['filename']) for feeder in spec.feeders]
+        inputs['cim_profile'] = self.connection.connection_params.cim_profile
+        inputs['iec61970_301'] = int(self.connection.iec61970_301)
+        text = json.dumps(inputs, sort_keys=True, default=str)
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def fragment_file(self, name:str) -> str:
+        return os.path.join(self.cache_dir, 'fragments', hashlib.sha1(name.encode('utf-8')).hexdigest() + '.xml')
+
+    def build(self, specs:list[SubstationSpec], output:str=None) -> dict[str, list[str]]:
+        # Builds the substations that changed and writes the model to output if given.
+        # Returns the names of built, reused, and removed substations.
+        names = [spec.name for spec in specs]
+        if len(set(names)) != len(names):
+            raise ValueError('Substation names in an incremental build must be unique')
+
+        fragments = self.manifest['fragments']
+        summary = {'built': [], 'reused': [], 'removed': []}
+        for spec in specs:
+            spec_hash = self.spec_hash(spec)
+            entry = fragments.get(spec.name)
+            if entry is not None and entry['hash'] == spec_hash and os.path.exists(self.fragment_file(spec.name)):
+                summary['reused'].append(spec.name)
+                continue
+            fragments[spec.name] = self.build_fragment(spec, spec_hash)
+            summary['built'].append(spec.name)
+
+        for name in list(fragments.keys()):
+            if name not in names:
+                del fragments[name]
+                if os.path.exists(self.fragment_file(name)):
+                    os.remove(self.fragment_file(name))
+                summary['removed'].append(name)
+
+        self.save_manifest()
+        _log.info(f"Built {len(summary['built'])} substations, reused {len(summary['reused'])}, "
+                  f"removed {len(summary['removed'])}")
+        if output is not None:
+            self.assemble(output, names)
+        return summary
+
+    def build_fragment(self, spec:SubstationSpec, spec_hash:str) -> dict:
+        builder = spec.build(self.connection, mrid_namespace=self.mrid_namespace)
+        graph = builder.network.graph
+
+        base_voltages = {}
+        for base_voltage in graph.get(self.cim.BaseVoltage, {}).values():
+            base_voltage.mRID = str(uuid.uuid5(self.mrid_namespace, f'BaseV_{float(base_voltage.nominalVoltage)}'))
+            base_voltages[base_voltage.mRID] = self.serializer.serialize(base_voltage)
+
+        text = []
+        total_objects = 0
+        for cim_class, objects in graph.items():
+            if cim_class == self.cim.BaseVoltage:
+                continue
+            for obj in objects.values():
+                text.append(self.serializer.serialize(obj))
+                total_objects = total_objects + 1
+
+        os.makedirs(os.path.dirname(self.fragment_file(spec.name)), exist_ok=True)
+        with open(self.fragment_file(spec.name), 'w', encoding='utf-8') as f:
+            f.write(''.join(text))
+        return {'hash': spec_hash, 'objects': total_objects, 'base_voltages': base_voltages}
+
+    def assemble(self, filename:str, names:list[str]=None) -> None:
+        # Write the model from the cached fragments, in the order of names
+        if names is None:
+            names = list(self.manifest['fragments'].keys())
+        base_voltages = {}
+        for name in names:
+            base_voltages.update(self.manifest['fragments'][name]['base_voltages'])
+
+        with utils.StreamingXMLWriter(filename, self.connection) as writer:
+            for mRID in sorted(base_voltages):
+                writer.write_fragment(base_voltages[mRID])
+            for name in names:
+                with open(self.fragment_file(name), encoding='utf-8') as f:
+                    writer.write_fragment(f.read())
@@ -0,0 +1,81 @@
+from __future__ import annotations
+import multiprocessing
+import uuid
+
+from cimgraph.models import GraphModel, DistributedArea
+from cimgraph.databases import ConnectionInterface
+
+from cimbuilder.substation_builder.substation_spec import SubstationSpec
+import cimbuilder.utils as utils
+
+import logging
+_log = logging.getLogger(__name__)
+
+# Connection and mRID namespace of the current worker process
+_worker = {}
+
+def build_substations(specs:list[SubstationSpec], connection:ConnectionInterface, network:GraphModel=None,
+                      processes:int=None, mrid_namespace:uuid.UUID|str=None, chunksize:int=None) -> GraphModel:
+    # Builds each substation spec in a process pool and merges the graphs into one network.
+    # If mrid_namespace is given, each substation uses a NameMRIDGenerator seeded with its
+    # name, so the merged model does not depend on which worker built which substation.
+
+    if network is None:
+        network = DistributedArea(connection=connection, container=None, distributed=False)
+    merger = utils.GraphMerger(network)
+    for graph in iter_substation_graphs(specs, connection, processes, mrid_namespace, chunksize):
+        merger.merge(graph)
+
+    if merger.name_collisions:
+        _log.warning(f'Found {len(merger.name_collisions)} name collisions while merging substations')
+
+    return network
+
+def iter_substation_graphs(specs:list[SubstationSpec], connection:ConnectionInterface, processes:int=None,
+                           mrid_namespace:uuid.UUID|str=None, chunksize:int=None):
+    # Yields the graph dictionary of each substation in the order of specs, so that
+    # graphs can be written out as they are built instead of merged
+    return map_specs(_build_spec, specs, connection, processes, mrid_namespace, chunksize)
+
+def map_specs(function:callable, specs:list[SubstationSpec], connection:ConnectionInterface, processes:int=None,
+              mrid_namespace:uuid.UUID|str=None, chunksize:int=None):
+    # Yields function(spec, connection, mrid_namespace) for each spec in order, called in a
+    # process pool. function must be defined at module level so that workers can import it.
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = min(processes, len(specs))
+
+    if processes <= 1:
+        # Build in this process with the current mRID generator unless a namespace is given
+        _worker['connection'] = connection
+        _worker['mrid_namespace'] = mrid_namespace
+        try:
+            for spec in specs:
+                yield function(spec, connection, mrid_namespace)
+        finally:
+            _worker.clear()
+    else:
+        if chunksize is None:
+            chunksize = max(1, len(specs) // (4 * processes))
+        # Workers are spawned because the Oxigraph store used by RDFlibConnection
+        # deadlocks in forked processes
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(processes, initializer=_init_worker,
+                          initargs=(connection.__class__, connection.connection_params, mrid_namespace)) as pool:
+            for result in pool.imap(_call_worker, [(function, spec) for spec in specs], chunksize):
+                yield result
+
+def _init_worker(connection_class:type, connection_params:object, mrid_namespace:uuid.UUID|str) -> None:
+    _worker['connection'] = connection_class(connection_params)
+    _worker['mrid_namespace'] = mrid_namespace
+    if mrid_namespace is None:
+        utils.set_mrid_generator(utils.MRIDGenerator())
+
+def _call_worker(task:tuple[callable, SubstationSpec]) -> object:
+    function, spec = task
+    return function(spec, _worker['connection'], _worker['mrid_namespace'])
+
+def _build_spec(spec:SubstationSpec, connection:ConnectionInterface,
+                mrid_namespace:uuid.UUID|str) -> dict[type, dict[str, object]]:
+    builder = spec.build(connection, mrid_namespace=mrid_namespace)
+    return builder.network.graph
@@ -0,0 +1,165 @@
+from __future__ import annotations
+import enum
+import functools
+import json
+import logging
+import os
+import re
+import uuid
+
+from cimgraph.models import GraphModel, FeederModel
+from cimgraph.databases import ConnectionInterface
+
+from cimbuilder.substation_builder.substation_spec import SubstationSpec
+from cimbuilder.substation_builder.parallel_build import map_specs
+from cimbuilder.substation_builder.feeder_replicator import expand_network
+from cimbuilder.utils.xml_writer import get_serializer
+import cimbuilder.utils as utils
+
+_log = logging.getLogger(__name__)
+
+MANIFEST_FORMAT = 'cimbuilder-partitions'
+MANIFEST_VERSION = 1
+
+def get_partition_filename(name:str) -> str:
+    # File name of a partition, with characters that are not safe in file names replaced
+    return re.sub(r'[^\w.-]', '_', name) + '.xml'
+
+def write_partition(filename:str, name:str, graphs:list[GraphModel|dict[type, dict[str, object]]],
+                    connection:ConnectionInterface) -> dict:
+    # Write the objects of one or more networks, such as a substation and its feeders, to one
+    # file. Returns the manifest entry of the partition, with the references to objects that
+    # are not in the file. The mRIDs of all objects are kept under _mrids until the
+    # references are resolved by write_manifest.
+    cim = utils.get_cim_profile(connection)
+    graphs = [graph if graph.__class__ == dict else graph.graph for graph in graphs]
+    with utils.StreamingXMLWriter(filename, connection) as writer:
+        for graph in graphs:
+            writer.write_network(graph)
+    written = writer.written
+
+    entry = {'name': name, 'file': os.path.basename(filename), 'objects': len(written),
+             'substations': [], 'feeders': [], 'boundary_nodes': [], 'references': []}
+    seen = set()
+    listed = set()
+    for graph in graphs:
+        for cim_class, class_objects in graph.items():
+            serializer = [(attribute, many_to_many) for _, attribute, many_to_many, association
+                          in get_serializer(cim_class, cim) if association]
+            is_node = issubclass(cim_class, cim.ConnectivityNode)
+            for obj in class_objects.values():
+                if obj.mRID in seen:
+                    continue
+                seen.add(obj.mRID)
+                # Associations in the file that point to other files
+                for attribute, many_to_many in serializer:
+                    other = getattr(obj, attribute)
+                    if many_to_many:
+                        other = other[0] if other else None
+                    if other is None or type(type(other)) is enum.EnumMeta or other.mRID in written:
+                        continue
+                    entry['references'].append({'object': obj.mRID, 'class': cim_class.__name__,
+                                                'attribute': attribute, 'target': other.mRID,
+                                                'target_class': other.__class__.__name__})
+                # Nodes with terminals in other files
+                if is_node and any(terminal.mRID not in written for terminal in obj.Terminals):
+                    entry['boundary_nodes'].append(obj.mRID)
+        for substation in graph.get(cim.Substation, {}).values():
+            if substation.mRID not in listed:
+                listed.add(substation.mRID)
+                entry['substations'].append({'mRID': substation.mRID, 'name': substation.name})
+        for feeder in graph.get(cim.Feeder, {}).values():
+            if feeder.mRID not in listed:
+                listed.add(feeder.mRID)
+                substation = feeder.NormalEnergizingSubstation
+                entry['feeders'].append({'mRID': feeder.mRID, 'name': feeder.name,
+                                         'NormalEnergizingSubstation': substation.mRID if substation else None})
+    entry['_mrids'] = list(written)
+    return entry
+
+def write_manifest(entries:list[dict], directory:str, connection:ConnectionInterface,
+                   manifest:str='manifest.json') -> dict:
+    # Find the partition of the target of each reference, add the nodes that other partitions
+    # link to as boundary nodes, and write the manifest. References to objects that are not
+    # in any partition have a target_partition of None.
+    partitions = {}
+    for entry in entries:
+        for mRID in entry.pop('_mrids'):
+            partitions.setdefault(mRID, entry['name'])
+    by_name = {entry['name']: entry for entry in entries}
+    for entry in entries:
+        for reference in entry['references']:
+            target_partition = partitions.get(reference['target'])
+            reference['target_partition'] = target_partition
+            if target_partition is not None and reference['target_class'] == 'ConnectivityNode':
+                boundary_nodes = by_name[target_partition]['boundary_nodes']
+                if reference['target'] not in boundary_nodes:
+                    boundary_nodes.append(reference['target'])
+
+    data = {'format': MANIFEST_FORMAT, 'version': MANIFEST_VERSION,
+            'cim_profile': connection.connection_params.cim_profile,
+            'iec61970_301': int(connection.connection_params.iec61970_301),
+            'partitions': entries}
+    with open(os.path.join(directory, manifest), 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1)
+    return data
+
+def write_partitions(partitions:dict[str, list[GraphModel|dict[type, dict[str, object]]]], directory:str,
+                     connection:ConnectionInterface, manifest:str='manifest.json') -> dict:
+    # Write networks that are already built, such as {builder.name: [builder.network, feeder_network]},
+    # to one file per partition name in this process. Returns the manifest.
+    os.makedirs(directory, exist_ok=True)
+    filenames = _get_filenames(list(partitions))
+    entries = [write_partition(os.path.join(directory, filename), name, graphs, connection)
+               for (name, graphs), filename in zip(partitions.items(), filenames)]
+    return write_manifest(entries, directory, connection, manifest)
+
+def export_partitions(specs:list[SubstationSpec], connection:ConnectionInterface, directory:str,
+                      processes:int=None, mrid_namespace:uuid.UUID|str=None, chunksize:int=None,
+                      manifest:str='manifest.json') -> dict:
+    # Build each substation spec in a process pool and write it with its feeders to its own
+    # file in the worker, so that only the manifest entries are sent back. Returns the manifest.
+    os.makedirs(directory, exist_ok=True)
+    _get_filenames([spec.name for spec in specs])
+    export = functools.partial(_export_spec, os.path.abspath(directory))
+    entries = []
+    for entry in map_specs(export, specs, connection, processes, mrid_namespace, chunksize):
+        entries.append(entry)
+    return write_manifest(entries, directory, connection, manifest)
+
+def _get_filenames(names:list[str]) -> list[str]:
+    # File names of the partitions, which must be unique even on case-insensitive file systems
+    filenames = [get_partition_filename(name) for name in names]
+    used = {}
+    for name, filename in zip(names, filenames):
+        existing = used.setdefault(filename.lower(), name)
+        if existing != name:
+            raise ValueError(f'Partitions {existing} and {name} would both be written to {filename}')
+    return filenames
+
+def _export_spec(directory:str, spec:SubstationSpec, connection:ConnectionInterface,
+                 mrid_namespace:uuid.UUID|str) -> dict:
+    feeder_networks = []
+    builder = spec.build(connection, mrid_namespace=mrid_namespace, feeder_networks=feeder_networks)
+    for feeder_network in feeder_networks:
+        # Feeders read from files only hold the objects of the feeder container until expanded
+        if isinstance(feeder_network, FeederModel):
+            expand_network(feeder_network)
+            _fill_feeders(builder.network, feeder_network)
+    filename = os.path.join(directory, get_partition_filename(spec.name))
+    return write_partition(filename, spec.name, [builder.network] + feeder_networks, connection)
+
+def _fill_feeders(network:GraphModel, feeder_network:GraphModel) -> None:
+    # The feeder attached by new_feeder only has an mRID, while expanding the feeder network
+    # reads a second object with the same mRID from the file. Copy the attributes that are
+    # not set, so that the attached feeder is written with them.
+    cim = utils.get_cim_profile(network.connection)
+    feeders = feeder_network.graph.get(cim.Feeder, {})
+    for mRID, feeder in list(feeders.items()):
+        attached = network.graph.get(cim.Feeder, {}).get(mRID)
+        if attached is None or attached is feeder:
+            continue
+        for attribute, value in vars(feeder).items():
+            if getattr(attached, attribute, None) in (None, []):
+                setattr(attached, attribute, value)
+        feeders[mRID] = attached
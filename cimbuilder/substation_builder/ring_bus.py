@@ -1,11 +1,15 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
 from dataclasses import dataclass, field
 
 from cimgraph.models import GraphModel, DistributedArea
 from cimgraph.databases import ConnectionInterface
-import cimgraph.data_profile.cimhub_2023 as cim  # TODO: cleaner typing import
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim  # TODO: cleaner typing import
 
 import cimbuilder.object_builder as object_builder
 import cimbuilder.utils as utils
+from cimbuilder.substation_builder.bulk_branches import new_branches
 
 import logging
 
@@ -25,7 +29,7 @@ class RingBusSubstation():
         self.cim = utils.get_cim_profile(self.connection)  # Import CIM profile
 
         # Create new substation class
-        self.substation = self.cim.Substation(mRID=utils.new_mrid(), name=self.name)
+        self.substation = self.cim.Substation(mRID=utils.new_mrid(self.name), name=self.name)
 
         # If no network defined, create substation as a DistributedArea
         if not self.network:
@@ -36,10 +40,10 @@ class RingBusSubstation():
 
         # Create bus sections
         for section in range(self.total_sections):
-            bus = self.cim.ConnectivityNode(name=f'{self.name}_bus_{section + 1}', mRID=utils.new_mrid())
+            bus = self.cim.ConnectivityNode(name=f'{self.name}_bus_{section + 1}', mRID=utils.new_mrid(f'{self.name}_bus_{section + 1}'))
             bus.ConnectivityNodeContainer = self.substation
             self.network.add_to_graph(bus)
-            object_builder.new_bus_bar_section(self.network, bus)
+            object_builder.new_bus_bar_section(self.network, bus, self.base_voltage)
 
         for section in range(self.total_sections):
             from_bus = f'{self.name}_bus_{section + 1}'
@@ -54,10 +58,10 @@ class RingBusSubstation():
 
     def new_bus_tie(self, from_bus, to_bus, series_number):
 
-        junction1 = cim.ConnectivityNode(name=f'{self.substation.name}_{series_number}_j1', mRID=utils.new_mrid(),
-                                         ConnectivityNodeContainer=self.substation)
-        junction2 = cim.ConnectivityNode(name=f'{self.substation.name}_{series_number}_j2', mRID=utils.new_mrid(),
-                                         ConnectivityNodeContainer=self.substation)
+        junction1 = self.cim.ConnectivityNode(name=f'{self.substation.name}_{series_number}_j1', mRID=utils.new_mrid(f'{self.substation.name}_{series_number}_j1'),
+                                              ConnectivityNodeContainer=self.substation)
+        junction2 = self.cim.ConnectivityNode(name=f'{self.substation.name}_{series_number}_j2', mRID=utils.new_mrid(f'{self.substation.name}_{series_number}_j2'),
+                                              ConnectivityNodeContainer=self.substation)
 
         bus_tie = object_builder.new_breaker(self.network, self.substation, name=f'{self.name}_{series_number}',
                                              node1=junction1, node2=junction2)
@@ -77,42 +81,32 @@ class RingBusSubstation():
 
     def new_branch(self, bus_number, branch_equipment: cim.ConductingEquipment,
                             branch_terminal: cim.Terminal | int) -> None:
+        new_branches([(branch_terminal, self, bus_number)])
 
-        bus_name = f'{self.name}_bus_{bus_number}'
+    def get_branch_bay(self, bus_number: int) -> tuple[list[cim.ConnectivityNode], list[dict], cim.ConnectivityNode]:
+        # Junctions and switching devices of a branch and the node of the branch terminal
 
-        junction1 = cim.ConnectivityNode(name=f'{self.substation.name}_{bus_number}_j1', mRID=utils.new_mrid(),
-                                         ConnectivityNodeContainer=self.substation)
-        airgap1 = object_builder.new_disconnector(self.network, self.substation,
-                                                  name=f'{self.substation.name}_d{bus_number}', node1=bus_name,
-                                                  node2=junction1)
-        airgap1.BaseVoltage = self.base_voltage
+        bus_name = f'{self.name}_bus_{bus_number}'
 
-        branch_terminal.ConnectivityNode = junction1
+        junction1 = self.cim.ConnectivityNode(name=f'{self.substation.name}_{bus_number}_j1', mRID=utils.new_mrid(f'{self.substation.name}_{bus_number}_j1'),
+                                              ConnectivityNodeContainer=self.substation)
+        # Branch and feeder devices are named after their role so that both can share a bus
+        devices = [dict(class_type=self.cim.Disconnector,
+                        name=f'{self.substation.name}_{bus_number}_branch_d1', node1=bus_name,
+                        node2=junction1)]
 
-        self.network.add_to_graph(junction1)
+        return [junction1], devices, junction1
 
     def new_feeder(self, bus_number: int, feeder_network: GraphModel, feeder: cim.Feeder,
                             sourcebus: cim.ConnectivityNode = None) -> None:
 
-        feeder_network.get_all_edges(cim.Feeder)
-
         # If sourcebus of feeder not specified, look for something named sourcebus
-        if not sourcebus:
-            found = False
-            feeder_network.get_all_edges(cim.EnergySource)
-            feeder_network.get_all_edges(cim.Terminal)
-            feeder_network.get_all_edges(cim.ConnectivityNode)
-            for source in feeder_network.graph[cim.EnergySource].values():
-                if source.Terminals[0].ConnectivityNode.name == 'sourcebus':
-                    sourcebus = source.Terminals[0].ConnectivityNode
-                    found = True
-            if not found:
-                _log.error(f'Could not find sourcebus for {feeder.name}')
+        sourcebus = utils.get_sourcebus(feeder_network, feeder, sourcebus)
 
         bus_name = f'{self.name}_bus_{bus_number}'
 
         airgap1 = object_builder.new_disconnector(self.network, self.substation,
-                                                  name=f'{self.substation.name}_d{bus_number}', node1=bus_name,
+                                                  name=f'{self.substation.name}_{bus_number}_feeder_d1', node1=bus_name,
                                                   node2=sourcebus)
         airgap1.BaseVoltage = self.base_voltage
 
@@ -1,11 +1,15 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
 from dataclasses import dataclass, field
 
 from cimgraph.models import GraphModel, DistributedArea
 from cimgraph.databases import ConnectionInterface
-import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
 
 import cimbuilder.object_builder as object_builder
 import cimbuilder.utils as utils
+from cimbuilder.substation_builder.bulk_branches import new_branches
 
 import logging
 _log = logging.getLogger(__name__)
@@ -23,7 +27,7 @@ class SectionalizedBusSubstation:
         self.cim = utils.get_cim_profile(self.connection)  # Import CIM profile
 
         # Create new substation class
-        self.substation = self.cim.Substation(mRID=utils.new_mrid(), name=self.name)
+        self.substation = self.cim.Substation(mRID=utils.new_mrid(self.name), name=self.name)
        
         # If no network defined, create substation as a DistributedArea
         if not self.network:
@@ -34,10 +38,10 @@ class SectionalizedBusSubstation:
 
         # Create bus sections
         for section in range(self.total_sections):
-            bus = self.cim.ConnectivityNode(name=f'{self.name}_bus_{section + 1}', mRID=utils.new_mrid())
+            bus = self.cim.ConnectivityNode(name=f'{self.name}_bus_{section + 1}', mRID=utils.new_mrid(f'{self.name}_bus_{section + 1}'))
             bus.ConnectivityNodeContainer = self.substation
             self.network.add_to_graph(bus)
-            object_builder.new_bus_bar_section(self.network, bus)
+            object_builder.new_bus_bar_section(self.network, bus, self.base_voltage)
 
         for section in range(self.total_sections - 1):
             from_bus = f'{self.name}_bus_{section + 1}'
@@ -48,8 +52,8 @@ class SectionalizedBusSubstation:
         return self.network
 
     def new_bus_tie(self, from_bus, to_bus, series_number):
-        junction1 = cim.ConnectivityNode(name=f'{self.substation.name}_{series_number}_bt_j1', mRID=utils.new_mrid(), ConnectivityNodeContainer=self.substation)
-        junction2 = cim.ConnectivityNode(name=f'{self.substation.name}_{series_number}_bt_j2', mRID=utils.new_mrid(), ConnectivityNodeContainer=self.substation)
+        junction1 = self.cim.ConnectivityNode(name=f'{self.substation.name}_{series_number}_bt_j1', mRID=utils.new_mrid(f'{self.substation.name}_{series_number}_bt_j1'), ConnectivityNodeContainer=self.substation)
+        junction2 = self.cim.ConnectivityNode(name=f'{self.substation.name}_{series_number}_bt_j2', mRID=utils.new_mrid(f'{self.substation.name}_{series_number}_bt_j2'), ConnectivityNodeContainer=self.substation)
 
         bus_tie = object_builder.new_breaker(self.network, self.substation, name=f'{self.name}_bt_{series_number}', node1=junction1, node2=junction2)
         airgap1 = object_builder.new_disconnector(self.network, self.substation, name=f'{self.name}_bt_{series_number + 1}', node1=from_bus, node2=junction1)
@@ -63,58 +67,45 @@ class SectionalizedBusSubstation:
         self.network.add_to_graph(junction2)
 
     def new_branch(self, section_number:int, branch_equipment:cim.ConductingEquipment, branch_terminal:cim.Terminal|int) -> None:
-        section_name = f'{self.name}_bus_{section_number}'
+        new_branches([(branch_terminal, self, section_number)])
 
-        junction1 = cim.ConnectivityNode(name=f'{self.substation.name}_{section_number}_j1', mRID=utils.new_mrid(),
-                                         ConnectivityNodeContainer=self.substation)
-        junction2 = cim.ConnectivityNode(name=f'{self.substation.name}_{section_number}_j2', mRID=utils.new_mrid(),
-                                         ConnectivityNodeContainer=self.substation)
-        junction3 = cim.ConnectivityNode(name=f'{self.substation.name}_{section_number}_j3', mRID=utils.new_mrid(),
-                                         ConnectivityNodeContainer=self.substation)
+    def get_branch_bay(self, section_number:int) -> tuple[list[cim.ConnectivityNode], list[dict], cim.ConnectivityNode]:
+        # Junctions and switching devices of a branch and the node of the branch terminal
+        section_name = f'{self.name}_bus_{section_number}'
+        # Branch and feeder bays are named after their role so that both can share a section
+        prefix = f'{self.substation.name}_{section_number}_branch'
 
-        breaker = object_builder.new_breaker(self.network, self.substation, name=f'{self.substation.name}_{10*section_number}', node1=junction1, node2=junction2)
-        airgap1 = object_builder.new_disconnector(self.network, self.substation, name=f'{self.substation.name}_{10*section_number+1}', node1=section_name, node2=junction1)
-        airgap2 = object_builder.new_disconnector(self.network, self.substation, name=f'{self.substation.name}_{10*section_number+2}', node1=junction2, node2=junction3)
+        junction1 = self.cim.ConnectivityNode(name=f'{prefix}_j1', mRID=utils.new_mrid(f'{prefix}_j1'),
+                                              ConnectivityNodeContainer=self.substation)
+        junction2 = self.cim.ConnectivityNode(name=f'{prefix}_j2', mRID=utils.new_mrid(f'{prefix}_j2'),
+                                              ConnectivityNodeContainer=self.substation)
+        junction3 = self.cim.ConnectivityNode(name=f'{prefix}_j3', mRID=utils.new_mrid(f'{prefix}_j3'),
+                                              ConnectivityNodeContainer=self.substation)
 
-        breaker.BaseVoltage = self.base_voltage
-        airgap1.BaseVoltage = self.base_voltage
-        airgap2.BaseVoltage = self.base_voltage
+        devices = [dict(class_type=self.cim.Breaker, name=f'{prefix}_b1', node1=junction1, node2=junction2),
+                   dict(class_type=self.cim.Disconnector, name=f'{prefix}_d1', node1=section_name, node2=junction1),
+                   dict(class_type=self.cim.Disconnector, name=f'{prefix}_d2', node1=junction2, node2=junction3)]
 
-        if type(branch_terminal) == cim.Terminal:
-            branch_terminal.ConnectivityNode = junction3
-
-        self.network.add_to_graph(junction1)
-        self.network.add_to_graph(junction2)
-        self.network.add_to_graph(junction3)
+        return [junction1, junction2, junction3], devices, junction3
 
     def new_feeder(self, section_number: int, feeder_network: GraphModel, feeder: cim.Feeder,
                    sourcebus: cim.ConnectivityNode = None) -> None:
 
-        feeder_network.get_all_edges(cim.Feeder)
         section_name = f'{self.name}_bus_{section_number}'
         # If sourcebus of feeder not specified, look for something named sourcebus
-        if not sourcebus:
-            found = False
-            feeder_network.get_all_edges(cim.EnergySource)
-            feeder_network.get_all_edges(cim.Terminal)
-            feeder_network.get_all_edges(cim.ConnectivityNode)
-            for source in feeder_network.graph[cim.EnergySource].values():
-                if source.Terminals[0].ConnectivityNode.name == 'sourcebus':
-                    sourcebus = source.Terminals[0].ConnectivityNode
-                    found = True
-            if not found:
-                _log.error(f'Could not find sourcebus for {feeder.name}')
-
-        junction1 = cim.ConnectivityNode(name=f'{self.substation.name}_{section_number}_j1', mRID=utils.new_mrid(),
-                                         ConnectivityNodeContainer=self.substation)
-        junction2 = cim.ConnectivityNode(name=f'{self.substation.name}_{section_number}_j2', mRID=utils.new_mrid(),
-                                         ConnectivityNodeContainer=self.substation)
+        sourcebus = utils.get_sourcebus(feeder_network, feeder, sourcebus)
+
+        prefix = f'{self.substation.name}_{section_number}_feeder'
+        junction1 = self.cim.ConnectivityNode(name=f'{prefix}_j1', mRID=utils.new_mrid(f'{prefix}_j1'),
+                                              ConnectivityNodeContainer=self.substation)
+        junction2 = self.cim.ConnectivityNode(name=f'{prefix}_j2', mRID=utils.new_mrid(f'{prefix}_j2'),
+                                              ConnectivityNodeContainer=self.substation)
         #junction3 = cim.ConnectivityNode(name=f'{self.substation.name}_{section_number}_j3', mRID=utils.new_mrid(),
         #                                 ConnectivityNodeContainer=self.substation)
 
-        breaker = object_builder.new_breaker(self.network, self.substation, name=f'{self.substation.name}_{10*section_number}', node1=junction1, node2=junction2)
-        airgap1 = object_builder.new_disconnector(self.network, self.substation, name=f'{self.substation.name}_{10*section_number+1}', node1=section_name, node2=junction1)
-        airgap2 = object_builder.new_disconnector(self.network, self.substation, name=f'{self.substation.name}_{10*section_number+2}', node1=junction2, node2=sourcebus)
+        breaker = object_builder.new_breaker(self.network, self.substation, name=f'{prefix}_b1', node1=junction1, node2=junction2)
+        airgap1 = object_builder.new_disconnector(self.network, self.substation, name=f'{prefix}_d1', node1=section_name, node2=junction1)
+        airgap2 = object_builder.new_disconnector(self.network, self.substation, name=f'{prefix}_d2', node1=junction2, node2=sourcebus)
 
         breaker.BaseVoltage = self.base_voltage
         airgap1.BaseVoltage = self.base_voltage
@@ -1,11 +1,15 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
 from dataclasses import dataclass, field
 
 from cimgraph.models import GraphModel, DistributedArea
 from cimgraph.databases import ConnectionInterface
-import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
 
 import cimbuilder.object_builder as object_builder
 import cimbuilder.utils as utils
+from cimbuilder.substation_builder.bulk_branches import new_branches
 
 import logging
 _log = logging.getLogger(__name__)
@@ -23,7 +27,7 @@ class SingleBusSubstation():
         self.cim = utils.get_cim_profile(self.connection) # Import CIM profile
 
         # Create new substation class
-        self.substation = self.cim.Substation(mRID = utils.new_mrid(), name=self.name)
+        self.substation = self.cim.Substation(mRID = utils.new_mrid(self.name), name=self.name)
         
         # If no network defined, create substation as a DistributedArea
         if not self.network:
@@ -34,52 +38,40 @@ class SingleBusSubstation():
         self.base_voltage = utils.get_base_voltage(self.network, self.base_voltage)
         
         # main bus
-        self.main_bus = self.cim.ConnectivityNode(name=f'{self.name}_main_bus', mRID=utils.new_mrid())
+        self.main_bus = self.cim.ConnectivityNode(name=f'{self.name}_main_bus', mRID=utils.new_mrid(f'{self.name}_main_bus'))
         self.main_bus.ConnectivityNodeContainer = self.substation
         self.network.add_to_graph(self.main_bus)
-        object_builder.new_bus_bar_section(self.network, self.main_bus)
+        object_builder.new_bus_bar_section(self.network, self.main_bus, self.base_voltage)
        
         return self.network
     
     def new_branch(self, series_number:int, branch_equipment:cim.ConductingEquipment, branch_terminal:cim.Terminal|int) -> None:
+        new_branches([(branch_terminal, self, series_number)])
 
-        junction1 = cim.ConnectivityNode(name=f'{self.substation.name}_{series_number}_j1', mRID = utils.new_mrid(), ConnectivityNodeContainer=self.substation)
-        
-        breaker = object_builder.new_breaker(self.network, self.substation, name = f"{self.substation.name}_{series_number}", node1 = self.main_bus, node2 = junction1)
-        
-        breaker.BaseVoltage = self.base_voltage
+    def get_branch_bay(self, series_number:int) -> tuple[list[cim.ConnectivityNode], list[dict], cim.ConnectivityNode]:
+        # Junctions and switching devices of a branch and the node of the branch terminal
 
-        if type(branch_terminal) == cim.Terminal:
-                branch_terminal.ConnectivityNode = junction1
-    
-        
-        self.network.add_to_graph(junction1)
+        junction1 = self.cim.ConnectivityNode(name=f'{self.substation.name}_{series_number}_j1', mRID = utils.new_mrid(f'{self.substation.name}_{series_number}_j1'), ConnectivityNodeContainer=self.substation)
+
+        devices = [dict(class_type=self.cim.Breaker, name = f'{self.substation.name}_{series_number}_b1', node1 = self.main_bus, node2 = junction1)]
+
+        return [junction1], devices, junction1
 
     def new_feeder(self, series_number:int, feeder_network:GraphModel, feeder:cim.Feeder, 
                                 sourcebus:cim.ConnectivityNode=None) -> None:
             
-        feeder_network.get_all_edges(cim.Feeder)
-
         # If sourcebus of feeder not specified, look for something named sourcebus
-        if not sourcebus: 
-            found = False
-            feeder_network.get_all_edges(cim.EnergySource)
-            feeder_network.get_all_edges(cim.Terminal)
-            feeder_network.get_all_edges(cim.ConnectivityNode)
-            for source in feeder_network.graph[cim.EnergySource].values():
-                if source.Terminals[0].ConnectivityNode.name == 'sourcebus':
-                    sourcebus = source.Terminals[0].ConnectivityNode
-                    found = True
-            if not found:
-                _log.error(f'Could not find sourcebus for {feeder.name}')
+        sourcebus = utils.get_sourcebus(feeder_network, feeder, sourcebus)
 
-        junction1 = cim.ConnectivityNode(name=f'{self.substation.name}_{series_number}_j1', mRID = utils.new_mrid(), ConnectivityNodeContainer=self.substation)
-        junction2 = cim.ConnectivityNode(name=f'{self.substation.name}_{series_number}_j2', mRID = utils.new_mrid(), ConnectivityNodeContainer=self.substation)
+        junction1 = self.cim.ConnectivityNode(name=f'{self.substation.name}_{series_number}_j1', mRID = utils.new_mrid(f'{self.substation.name}_{series_number}_j1'), ConnectivityNodeContainer=self.substation)
+        junction2 = self.cim.ConnectivityNode(name=f'{self.substation.name}_{series_number}_j2', mRID = utils.new_mrid(f'{self.substation.name}_{series_number}_j2'), ConnectivityNodeContainer=self.substation)
         # junction3 = cim.ConnectivityNode(name=f'{substation.name}_{series_number}_j3', mRID = new_mrid(), ConnectivityNodeContainer=substation)
 
-        breaker = object_builder.new_breaker(self.network, self.substation, name = f'{self.substation.name}_{series_number}', node1 = junction1, node2 = junction2)
-        airgap1 = object_builder.new_disconnector(self.network, self.substation, name = f'{self.substation.name}_{series_number+1}', node1 = self.main_bus, node2 = junction1)
-        airgap2 = object_builder.new_disconnector(self.network, self.substation, name = f'{self.substation.name}_{series_number+2}', node1 = junction2, node2 = sourcebus)
+        # Devices are named by series number and role so that adjacent bays have unique names
+        prefix = f'{self.substation.name}_{series_number}'
+        breaker = object_builder.new_breaker(self.network, self.substation, name = f'{prefix}_b1', node1 = junction1, node2 = junction2)
+        airgap1 = object_builder.new_disconnector(self.network, self.substation, name = f'{prefix}_d1', node1 = self.main_bus, node2 = junction1)
+        airgap2 = object_builder.new_disconnector(self.network, self.substation, name = f'{prefix}_d2', node1 = junction2, node2 = sourcebus)
         
         breaker.BaseVoltage = self.base_voltage
         airgap1.BaseVoltage = self.base_voltage
@@ -0,0 +1,423 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+from array import array
+
+from cimgraph.models import GraphModel, DistributedArea
+from cimgraph.databases import ConnectionInterface
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
+
+from cimbuilder.substation_builder.template import TEMPLATE_NAME, get_substation_template
+import cimbuilder.utils as utils
+
+import logging
+_log = logging.getLogger(__name__)
+
+# Attributes of each staged table. Objects with other attributes cannot be staged.
+_NODE_ATTRIBUTES = {'mRID', 'name', 'ConnectivityNodeContainer', 'Terminals'}
+_TERMINAL_ATTRIBUTES = {'mRID', 'name', 'ConductingEquipment', 'ConnectivityNode', 'sequenceNumber'}
+_EQUIPMENT_ATTRIBUTES = {'mRID', 'name', 'EquipmentContainer', 'BaseVoltage', 'Terminals', 'open', 'normalOpen'}
+
+# Optional booleans are stored as -1 (None), 0, or 1
+_FLAGS = {None: -1, False: 0, True: 1}
+_VALUES = {-1: None, 0: False, 1: True}
+
+class StagingModel():
+    """
+    Compact substation topology for very large builds. Substations, nodes, equipment,
+    and terminals are stored in columns of integers indexed by row, with 16-byte mRIDs
+    and names that refer to shared template strings. CIM objects are only created by
+    materialize, get_builder, or write_xml. Rows of each substation are contiguous, so
+    a single substation can be materialized without scanning the whole model.
+    """
+
+    def __init__(self, connection:ConnectionInterface, network:GraphModel=None):
+        self.connection = connection
+        self.cim = utils.get_cim_profile(connection)
+        # Network that materialized objects are added to. BaseVoltages are created here when staged.
+        if network is None:
+            network = DistributedArea(connection=connection, container=None, distributed=False)
+        self.network = network
+        self.strings = []
+        self.string_ids = {}
+        self.classes = []
+        self.class_ids = {}
+        self.base_voltages = []
+        self.base_voltage_ids = {}
+        self.templates = []
+        self.plans = {}
+        self.node_names = {}
+        # First row of each substation name
+        self.substation_rows = {}
+
+        # Substations
+        self.substation_name = []
+        self.substation_mrid = bytearray()
+        self.substation_template = array('l')
+        self.substation_base_voltage = array('l')
+        self.substation_node = array('l')
+        self.substation_equipment = array('l')
+        self.substation_terminal = array('l')
+        # ConnectivityNodes
+        self.node_name = array('l')
+        self.node_mrid = bytearray()
+        self.node_substation = array('l')
+        # ConductingEquipment
+        self.equipment_class = array('l')
+        self.equipment_name = array('l')
+        self.equipment_mrid = bytearray()
+        self.equipment_substation = array('l')
+        self.equipment_base_voltage = array('l')
+        self.equipment_open = array('b')
+        self.equipment_normal_open = array('b')
+        # Terminals
+        self.terminal_name = array('l')
+        self.terminal_mrid = bytearray()
+        self.terminal_equipment = array('l')
+        self.terminal_node = array('l')
+        self.terminal_sequence = array('l')
+
+    def __len__(self) -> int:
+        return (len(self.substation_name) + len(self.node_name) + len(self.equipment_name)
+                + len(self.terminal_name) + len(self.base_voltages))
+
+    def string_id(self, text:str, shared:bool=False) -> int:
+        # Shared strings, such as template names, are stored only once
+        if shared:
+            string_id = self.string_ids.get(text)
+            if string_id is not None:
+                return string_id
+            self.string_ids[text] = len(self.strings)
+        self.strings.append(text)
+        return len(self.strings) - 1
+
+    def class_id(self, cim_class:type) -> int:
+        class_id = self.class_ids.get(cim_class)
+        if class_id is None:
+            class_id = len(self.classes)
+            self.classes.append(cim_class)
+            self.class_ids[cim_class] = class_id
+        return class_id
+
+    def base_voltage_id(self, base_voltage:int|float|cim.BaseVoltage) -> int:
+        if base_voltage is None:
+            return -1
+        base_voltage = utils.get_base_voltage(self.network, base_voltage)
+        base_voltage_id = self.base_voltage_ids.get(id(base_voltage))
+        if base_voltage_id is None:
+            base_voltage_id = len(self.base_voltages)
+            self.base_voltages.append(base_voltage)
+            self.base_voltage_ids[id(base_voltage)] = base_voltage_id
+        return base_voltage_id
+
+    def pack_mrids(self, mrids:list[str]) -> bytes:
+        data = bytes.fromhex(''.join(mrids).replace('-', ''))
+        if len(data) != 16*len(mrids):
+            raise ValueError('Staged mRIDs must be UUIDs')
+        return data
+
+    def get_mrid(self, column:bytearray, row:int) -> str:
+        text = column[16*row:16*row+16].hex()
+        return f'{text[:8]}-{text[8:12]}-{text[12:16]}-{text[16:20]}-{text[20:]}'
+
+    def get_name(self, column:array, row:int, substation:int) -> str:
+        text = self.strings[column[row]]
+        if TEMPLATE_NAME in text:
+            text = text.replace(TEMPLATE_NAME, self.substation_name[substation])
+        return text
+
+    def get_substation(self, name:str) -> int:
+        substation = self.substation_rows.get(name)
+        if substation is None:
+            raise ValueError(f'Substation {name} is not staged')
+        return substation
+
+    def get_rows(self, substation:int) -> tuple[range, range, range]:
+        # Node, equipment, and terminal rows of a substation
+        if substation + 1 < len(self.substation_name):
+            ends = (self.substation_node[substation+1], self.substation_equipment[substation+1],
+                    self.substation_terminal[substation+1])
+        else:
+            ends = (len(self.node_name), len(self.equipment_name), len(self.terminal_name))
+        return (range(self.substation_node[substation], ends[0]),
+                range(self.substation_equipment[substation], ends[1]),
+                range(self.substation_terminal[substation], ends[2]))
+
+    def get_node(self, substation:int|str, name:str) -> int:
+        # Row of a staged node by name, searching only the rows of one substation
+        if substation.__class__ == str:
+            substation = self.get_substation(substation)
+        for row in self.get_rows(substation)[0]:
+            if self.get_name(self.node_name, row, substation) == name:
+                return row
+        return None
+
+    def new_substation(self, name:str, base_voltage:int|cim.BaseVoltage=115000) -> int:
+        # Starts a new substation. Nodes and equipment staged next are added to it.
+        self.substation_rows.setdefault(name, len(self.substation_name))
+        self.substation_name.append(name)
+        self.substation_mrid.extend(self.pack_mrids([utils.new_mrid(name)]))
+        self.substation_template.append(-1)
+        self.substation_base_voltage.append(self.base_voltage_id(base_voltage))
+        self.substation_node.append(len(self.node_name))
+        self.substation_equipment.append(len(self.equipment_name))
+        self.substation_terminal.append(len(self.terminal_name))
+        return len(self.substation_name) - 1
+
+    def new_node(self, name:str) -> int:
+        if not self.substation_name:
+            raise ValueError('Stage a substation before adding nodes')
+        self.node_name.append(self.string_id(name))
+        self.node_mrid.extend(self.pack_mrids([utils.new_mrid(name)]))
+        self.node_substation.append(len(self.substation_name) - 1)
+        row = len(self.node_name) - 1
+        self.node_names[name] = row
+        return row
+
+    def new_equipment(self, class_type:type, name:str, nodes:list[int|str], base_voltage:int|cim.BaseVoltage=None,
+                      open:bool=None, normalOpen:bool=None) -> int:
+        # Stages a piece of ConductingEquipment with one terminal for each node. Nodes are
+        # staged node rows or names of nodes staged with new_node.
+        if not self.substation_name:
+            raise ValueError('Stage a substation before adding equipment')
+        terminal_names = [f'{name}_t{sequence}' for sequence in range(1, len(nodes) + 1)]
+        mrids = self.pack_mrids(utils.new_mrids([name] + terminal_names))
+        row = len(self.equipment_name)
+        self.equipment_class.append(self.class_id(class_type))
+        self.equipment_name.append(self.string_id(name))
+        self.equipment_mrid.extend(mrids[:16])
+        self.equipment_substation.append(len(self.substation_name) - 1)
+        self.equipment_base_voltage.append(self.base_voltage_id(base_voltage))
+        self.equipment_open.append(_FLAGS[open])
+        self.equipment_normal_open.append(_FLAGS[normalOpen])
+        for sequence, (terminal_name, node) in enumerate(zip(terminal_names, nodes), start=1):
+            if node.__class__ == str:
+                node_name = node
+                node = self.node_names.get(node_name)
+                if node is None:
+                    _log.error(f'Terminal {terminal_name} was not connected to a ConnectivityNode')
+                    node = -1
+            self.terminal_name.append(self.string_id(terminal_name))
+            self.terminal_equipment.append(row)
+            self.terminal_node.append(node)
+            self.terminal_sequence.append(sequence)
+        self.terminal_mrid.extend(mrids[16:])
+        return row
+
+    def new_switching_devices(self, devices:list[dict]) -> list[int]:
+        # Same device dicts as object_builder.new_switching_devices, added to the current substation
+        rows = []
+        for device in devices:
+            rows.append(self.new_equipment(device.get('class_type', self.cim.Breaker), device['name'],
+                                           [device['node1'], device['node2']], device.get('base_voltage'),
+                                           device.get('open', False), device.get('normalOpen', False)))
+        return rows
+
+    def get_plan(self, template:object) -> dict:
+        # Column values of a substation template, with rows relative to the first row of the substation
+        plan = self.plans.get(id(template))
+        if plan is not None:
+            return plan
+        objects = template.objects.objects
+        substation = objects[template.substation_index]
+        position = {id(obj): index for index, obj in enumerate(objects)}
+        nodes = [obj for obj in objects if obj.__class__ == self.cim.ConnectivityNode]
+        terminals = [obj for obj in objects if obj.__class__ == self.cim.Terminal]
+        equipment = [obj for obj in objects if obj is not substation and obj.__class__ != self.cim.ConnectivityNode
+                     and obj.__class__ != self.cim.Terminal]
+        node_rows = {id(obj): row for row, obj in enumerate(nodes)}
+        equipment_rows = {id(obj): row for row, obj in enumerate(equipment)}
+
+        for obj in objects:
+            if obj is substation:
+                allowed = {'mRID', 'name'}
+            elif obj.__class__ == self.cim.ConnectivityNode:
+                allowed = _NODE_ATTRIBUTES
+            elif obj.__class__ == self.cim.Terminal:
+                allowed = _TERMINAL_ATTRIBUTES
+            elif isinstance(obj, self.cim.ConductingEquipment):
+                allowed = _EQUIPMENT_ATTRIBUTES
+            else:
+                raise ValueError(f'{obj.__class__.__name__} objects cannot be staged')
+            for attribute, value in obj.__dict__.items():
+                if value is not None and value != [] and attribute not in allowed:
+                    raise ValueError(f'{obj.__class__.__name__}.{attribute} cannot be staged')
+
+        plan = {
+            'template': len(self.templates),
+            'positions': [position[id(obj)] for obj in nodes + equipment + terminals],
+            'mrid_positions': [template.substation_index] + [position[id(obj)] for obj in nodes + equipment + terminals],
+            'names': [self.string_id(obj.name, shared=True) for obj in objects],
+            'node_name': array('l', [self.string_id(obj.name, shared=True) for obj in nodes]),
+            'equipment_class': array('l', [self.class_id(obj.__class__) for obj in equipment]),
+            'equipment_name': array('l', [self.string_id(obj.name, shared=True) for obj in equipment]),
+            'equipment_base_voltage': [obj.BaseVoltage is template.base_voltage for obj in equipment],
+            'equipment_open': array('b', [_FLAGS[getattr(obj, 'open', None)] for obj in equipment]),
+            'equipment_normal_open': array('b', [_FLAGS[getattr(obj, 'normalOpen', None)] for obj in equipment]),
+            'terminal_name': array('l', [self.string_id(obj.name, shared=True) for obj in terminals]),
+            'terminal_equipment': [equipment_rows[id(obj.ConductingEquipment)] for obj in terminals],
+            'terminal_node': [node_rows.get(id(obj.ConnectivityNode), -1) if obj.ConnectivityNode is not None else -1
+                              for obj in terminals],
+            'terminal_sequence': array('l', [obj.sequenceNumber if obj.sequenceNumber is not None else -1
+                                             for obj in terminals]),
+            'sizes': (len(nodes), len(equipment), len(terminals)),
+        }
+        self.templates.append(template)
+        self.plans[id(template)] = plan
+        return plan
+
+    def stage_substation(self, builder_class:type, name:str, base_voltage:int|cim.BaseVoltage=115000,
+                         **parameters) -> int:
+        # Same topology as builder_class(name=name, base_voltage=base_voltage, **parameters),
+        # stored as rows of the cached substation template
+        template = get_substation_template(builder_class, self.connection, **parameters)
+        plan = self.get_plan(template)
+        # mRIDs are generated for the names in template order, as in SubstationTemplate.instantiate
+        names = [self.strings[string_id].replace(TEMPLATE_NAME, name) for string_id in plan['names']]
+        mrids = self.pack_mrids(utils.new_mrids(names))
+
+        substation = len(self.substation_name)
+        node_start = len(self.node_name)
+        equipment_start = len(self.equipment_name)
+        total_nodes, total_equipment, total_terminals = plan['sizes']
+        base_voltage_id = self.base_voltage_id(base_voltage)
+
+        positions = plan['mrid_positions']
+        self.substation_rows.setdefault(name, substation)
+        self.substation_name.append(name)
+        self.substation_mrid.extend(mrids[16*positions[0]:16*positions[0]+16])
+        self.substation_template.append(plan['template'])
+        self.substation_base_voltage.append(base_voltage_id)
+        self.substation_node.append(node_start)
+        self.substation_equipment.append(equipment_start)
+        self.substation_terminal.append(len(self.terminal_name))
+
+        ordered = b''.join([mrids[16*position:16*position+16] for position in positions[1:]])
+        self.node_name.extend(plan['node_name'])
+        self.node_mrid.extend(ordered[:16*total_nodes])
+        self.node_substation.extend(array('l', [substation])*total_nodes)
+
+        self.equipment_class.extend(plan['equipment_class'])
+        self.equipment_name.extend(plan['equipment_name'])
+        self.equipment_mrid.extend(ordered[16*total_nodes:16*(total_nodes+total_equipment)])
+        self.equipment_substation.extend(array('l', [substation])*total_equipment)
+        self.equipment_base_voltage.extend(array('l', [base_voltage_id if flag else -1
+                                                       for flag in plan['equipment_base_voltage']]))
+        self.equipment_open.extend(plan['equipment_open'])
+        self.equipment_normal_open.extend(plan['equipment_normal_open'])
+
+        self.terminal_name.extend(plan['terminal_name'])
+        self.terminal_mrid.extend(ordered[16*(total_nodes+total_equipment):])
+        self.terminal_equipment.extend(array('l', [row + equipment_start for row in plan['terminal_equipment']]))
+        self.terminal_node.extend(array('l', [row + node_start if row >= 0 else -1 for row in plan['terminal_node']]))
+        self.terminal_sequence.extend(plan['terminal_sequence'])
+        return substation
+
+    def stage_substations(self, builder_class:type, names:list[str], base_voltage:int|cim.BaseVoltage=115000,
+                          **parameters) -> list[int]:
+        return [self.stage_substation(builder_class, name, base_voltage, **parameters) for name in names]
+
+    def create_objects(self, substation:int, nodes:dict[int, cim.ConnectivityNode]=None) -> list[object]:
+        # CIM objects of one substation. Nodes already created for other substations are
+        # reused from nodes, which maps node rows to objects.
+        if nodes is None:
+            nodes = {}
+        node_rows, equipment_rows, terminal_rows = self.get_rows(substation)
+        container = self.cim.Substation(name=self.substation_name[substation],
+                                        mRID=self.get_mrid(self.substation_mrid, substation))
+        new_objects = [container]
+        for row in node_rows:
+            node = self.cim.ConnectivityNode(name=self.get_name(self.node_name, row, substation),
+                                             mRID=self.get_mrid(self.node_mrid, row))
+            node.ConnectivityNodeContainer = container
+            nodes[row] = node
+            new_objects.append(node)
+
+        equipment = {}
+        for row in equipment_rows:
+            class_type = self.classes[self.equipment_class[row]]
+            new_obj = class_type(name=self.get_name(self.equipment_name, row, substation),
+                                 mRID=self.get_mrid(self.equipment_mrid, row))
+            new_obj.EquipmentContainer = container
+            if self.equipment_base_voltage[row] >= 0:
+                new_obj.BaseVoltage = self.base_voltages[self.equipment_base_voltage[row]]
+            if self.equipment_open[row] >= 0:
+                new_obj.open = _VALUES[self.equipment_open[row]]
+            if self.equipment_normal_open[row] >= 0:
+                new_obj.normalOpen = _VALUES[self.equipment_normal_open[row]]
+            equipment[row] = new_obj
+            new_objects.append(new_obj)
+
+        for row in terminal_rows:
+            terminal = self.cim.Terminal(name=self.get_name(self.terminal_name, row, substation),
+                                         mRID=self.get_mrid(self.terminal_mrid, row))
+            if self.terminal_sequence[row] >= 0:
+                terminal.sequenceNumber = self.terminal_sequence[row]
+            conducting_equipment = equipment[self.terminal_equipment[row]]
+            terminal.ConductingEquipment = conducting_equipment
+            conducting_equipment.Terminals.append(terminal)
+            node_row = self.terminal_node[row]
+            if node_row >= 0:
+                node = nodes.get(node_row)
+                if node is None:
+                    node = self.create_node(node_row)
+                    nodes[node_row] = node
+                terminal.ConnectivityNode = node
+                node.Terminals.append(terminal)
+            new_objects.append(terminal)
+        return new_objects
+
+    def create_node(self, row:int) -> cim.ConnectivityNode:
+        # Node of another substation that was not materialized, found in the network if it exists
+        mRID = self.get_mrid(self.node_mrid, row)
+        node = self.network.graph.get(self.cim.ConnectivityNode, {}).get(mRID)
+        if node is None:
+            substation = self.node_substation[row]
+            node = self.cim.ConnectivityNode(name=self.get_name(self.node_name, row, substation), mRID=mRID)
+        return node
+
+    def materialize(self, substations:list[int|str]=None) -> GraphModel:
+        # Create the CIM objects of the given substations, or of all of them, in the network
+        if substations is None:
+            substations = range(len(self.substation_name))
+        nodes = {}
+        for substation in substations:
+            if substation.__class__ == str:
+                substation = self.get_substation(substation)
+            for new_obj in self.create_objects(substation, nodes):
+                self.network.add_to_graph(new_obj)
+        return self.network
+
+    def get_builder(self, substation:int|str) -> object:
+        # Materializes a substation staged from a template and returns its builder object,
+        # which supports new_branch and new_feeder
+        if substation.__class__ == str:
+            substation = self.get_substation(substation)
+        if self.substation_template[substation] < 0:
+            raise ValueError(f'Substation {self.substation_name[substation]} was not staged from a template')
+        template = self.templates[self.substation_template[substation]]
+        plan = self.get_plan(template)
+        new_objects = self.create_objects(substation)
+        for new_obj in new_objects:
+            self.network.add_to_graph(new_obj)
+        # Objects of the network graph are used if the substation was already materialized
+        new_objects = [self.network.graph[new_obj.__class__][new_obj.mRID] for new_obj in new_objects]
+        copies = [None]*len(template.objects.objects)
+        copies[template.substation_index] = new_objects[0]
+        for position, new_obj in zip(plan['positions'], new_objects[1:]):
+            copies[position] = new_obj
+        base_voltage = self.base_voltages[self.substation_base_voltage[substation]]
+        return template.restore_builder(copies, self.substation_name[substation], self.network,
+                                        base_voltage, self.connection)
+
+    def write_xml(self, filename:str|utils.StreamingXMLWriter) -> int:
+        # Write all staged objects, creating the CIM objects of one substation at a time.
+        # Returns the number of objects written.
+        if filename.__class__ == str:
+            with utils.StreamingXMLWriter(filename, self.connection) as writer:
+                return self.write_xml(writer)
+        writer = filename
+        counter = writer.write_objects(self.base_voltages)
+        for substation in range(len(self.substation_name)):
+            counter = counter + writer.write_objects(self.create_objects(substation))
+        return counter
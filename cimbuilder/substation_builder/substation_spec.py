@@ -0,0 +1,117 @@
+from __future__ import annotations
+import uuid
+from dataclasses import dataclass, field
+
+from cimgraph.models import GraphModel, FeederModel
+from cimgraph.databases import ConnectionInterface, ConnectionParameters, RDFlibConnection
+
+from cimbuilder.substation_builder.main_and_transfer import MainAndTransferSubstation
+from cimbuilder.substation_builder.ring_bus import RingBusSubstation
+from cimbuilder.substation_builder.double_bus_single_breaker import DoubleBusSingleBreakerSubstation
+from cimbuilder.substation_builder.single_bus import SingleBusSubstation
+from cimbuilder.substation_builder.sectionalized_bus import SectionalizedBusSubstation
+from cimbuilder.substation_builder.breaker_and_a_half import BreakerAndHalfSubstation
+from cimbuilder.substation_builder.aggregate_feeder import new_aggregate_feeders
+from cimbuilder.substation_builder.feeder_replicator import get_feeder_replicator
+import cimbuilder.utils as utils
+
+import logging
+_log = logging.getLogger(__name__)
+
+TOPOLOGIES = {
+    'SingleBusSubstation': SingleBusSubstation,
+    'SectionalizedBusSubstation': SectionalizedBusSubstation,
+    'RingBusSubstation': RingBusSubstation,
+    'MainAndTransferSubstation': MainAndTransferSubstation,
+    'DoubleBusSingleBreakerSubstation': DoubleBusSingleBreakerSubstation,
+    'BreakerAndHalfSubstation': BreakerAndHalfSubstation
+}
+
+@dataclass
+class SubstationSpec():
+    """
+    Plain-data description of a substation build that can be sent to worker processes.
+    Args:
+        topology: substation builder class or class name, such as 'RingBusSubstation'
+        name: name of the new substation
+        base_voltage: nominal voltage of the substation
+        parameters: extra builder arguments, such as total_sections or total_bus_ties
+        branches: keyword arguments for each new_branch call (branch objects are optional)
+        feeders: keyword arguments for each new_feeder call, plus the filename and
+            feeder mRID of the XML model to attach. If a feeder has a replica name, a copy
+            with names prefixed by it is attached and the file is only read once.
+        aggregate_feeders: rows of new_aggregate_feeders columns. The substation and its
+            base_voltage are used unless the row specifies them. Rows should specify the node.
+    """
+    topology: str|type
+    name: str
+    base_voltage: float = field(default=115000)
+    parameters: dict = field(default_factory=dict)
+    branches: list[dict] = field(default_factory=list)
+    feeders: list[dict] = field(default_factory=list)
+    aggregate_feeders: list[dict] = field(default_factory=list)
+
+    def get_builder_class(self) -> type:
+        if self.topology.__class__ == str:
+            if self.topology not in TOPOLOGIES:
+                raise ValueError(f'Unknown substation topology {self.topology}')
+            return TOPOLOGIES[self.topology]
+        return self.topology
+
+    def build(self, connection:ConnectionInterface, network:GraphModel=None,
+              mrid_namespace:uuid.UUID|str=None, feeder_networks:list[GraphModel]=None) -> object:
+        # If mrid_namespace is given, the substation is built with name-based mRIDs seeded
+        # with its name, so the same spec always produces the same mRIDs. Otherwise the
+        # current mRID generator is used within its own scope, see utils.mrid_scope. The
+        # network of each attached feeder is appended to feeder_networks if it is given.
+        if mrid_namespace is not None:
+            if mrid_namespace.__class__ == str:
+                mrid_namespace = uuid.uuid5(utils.mrid.CIMBUILDER_NAMESPACE, mrid_namespace)
+            generator = utils.NameMRIDGenerator(uuid.uuid5(mrid_namespace, self.name))
+            with utils.mrid_generator(generator):
+                return self._build(connection, network, feeder_networks)
+        with utils.mrid_scope():
+            return self._build(connection, network, feeder_networks)
+
+    def _build(self, connection:ConnectionInterface, network:GraphModel,
+               feeder_networks:list[GraphModel]) -> object:
+        builder_class = self.get_builder_class()
+        builder = builder_class(connection=connection, network=network, name=self.name,
+                                base_voltage=self.base_voltage, **self.parameters)
+
+        for branch in self.branches:
+            branch = dict(branch)
+            branch.setdefault('branch_equipment', None)
+            branch.setdefault('branch_terminal', None)
+            builder.new_branch(**branch)
+
+        for feeder_spec in self.feeders:
+            feeder_spec = dict(feeder_spec)
+            filename = feeder_spec.pop('filename')
+            replica = feeder_spec.pop('replica', None)
+            if replica is not None:
+                replicator = get_feeder_replicator(filename, feeder_spec.pop('mrid'),
+                                                   connection.connection_params.cim_profile,
+                                                   connection.connection_params.iec61970_301)
+                feeder_network = replicator.attach(builder, replica, **feeder_spec)
+                if feeder_networks is not None:
+                    feeder_networks.append(feeder_network)
+                continue
+            feeder = builder.cim.Feeder(mRID = feeder_spec.pop('mrid'))
+            params = ConnectionParameters(filename=filename, cim_profile=connection.connection_params.cim_profile,
+                                          iec61970_301=connection.connection_params.iec61970_301)
+            feeder_network = FeederModel(connection=RDFlibConnection(params), container=feeder, distributed=False)
+            builder.new_feeder(feeder_network=feeder_network, feeder=feeder, **feeder_spec)
+            if feeder_networks is not None:
+                feeder_networks.append(feeder_network)
+
+        if self.aggregate_feeders:
+            columns = {}
+            defaults = {'base_voltage': self.base_voltage}
+            for row, aggregate_feeder in enumerate(self.aggregate_feeders):
+                for column, value in aggregate_feeder.items():
+                    columns.setdefault(column, [defaults.get(column)]*len(self.aggregate_feeders))[row] = value
+            new_aggregate_feeders(builder.network, columns, substation=builder.substation,
+                                  base_voltage=self.base_voltage)
+
+        return builder
@@ -0,0 +1,100 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+from collections import OrderedDict
+
+from cimgraph.models import GraphModel, DistributedArea
+from cimgraph.databases import ConnectionInterface
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
+
+import cimbuilder.utils as utils
+
+import logging
+_log = logging.getLogger(__name__)
+
+# Placeholder substation name used in template object names
+TEMPLATE_NAME = '__cimbuilder_template__'
+
+# Compiled templates keyed by builder class, CIM profile, and builder parameters,
+# with the least recently used template dropped first
+_templates = OrderedDict()
+MAX_TEMPLATES = 32
+
+class SubstationTemplate():
+    """
+    Substation topology built once with placeholder names. New substations are
+    created by cloning the template objects with new names and mRIDs instead
+    of running the builder again.
+    """
+
+    def __init__(self, builder_class:type, connection:ConnectionInterface, **parameters):
+        self.builder_class = builder_class
+        self.parameters = parameters
+        # Template mRIDs are discarded, so they should not advance a deterministic generator
+        with utils.mrid_generator(utils.MRIDGenerator()):
+            self.builder = builder_class(connection=connection, name=TEMPLATE_NAME, **parameters)
+        self.base_voltage = self.builder.base_voltage
+        objects = []
+        for cim_class, class_objects in self.builder.network.graph.items():
+            if cim_class != self.builder.cim.BaseVoltage:
+                objects.extend(class_objects.values())
+        self.objects = utils.ObjectTemplate(objects)
+        self.substation_index = objects.index(self.builder.substation)
+
+    def instantiate(self, name:str, network:GraphModel=None, base_voltage:int|cim.BaseVoltage=115000,
+                    connection:ConnectionInterface=None) -> object:
+        # Returns a builder object for the new substation, as if builder_class had been called
+        if connection is None:
+            connection = self.builder.connection
+
+        new_network = not network
+        if new_network:
+            network = DistributedArea(connection=connection, container=None, distributed=False)
+        # Copies link to the BaseVoltage of the new substation instead of the template
+        base_voltage = utils.get_base_voltage(network, base_voltage)
+        copies = self.objects.clone(rename=lambda text: text.replace(TEMPLATE_NAME, name),
+                                    shared={id(self.base_voltage): base_voltage})
+        if new_network:
+            network.container = copies[self.substation_index]
+
+        for new_obj in copies:
+            network.add_to_graph(new_obj)
+        return self.restore_builder(copies, name, network, base_voltage, connection)
+
+    def restore_builder(self, copies:list[object], name:str, network:GraphModel, base_voltage:cim.BaseVoltage,
+                        connection:ConnectionInterface) -> object:
+        # Restore the builder attributes, such as bus nodes, for new_branch and new_feeder calls
+        builder = self.builder_class.__new__(self.builder_class)
+        attributes = utils.remap_attributes(self.builder.__dict__, self.objects.mapping(copies))
+        attributes.update(connection=connection, network=network, name=name, base_voltage=base_voltage)
+        builder.__dict__.update(attributes)
+        return builder
+
+def get_substation_template(builder_class:type, connection:ConnectionInterface, **parameters) -> SubstationTemplate:
+    key = (builder_class, connection.connection_params.cim_profile, tuple(sorted(parameters.items())))
+    template = _templates.get(key)
+    if template is None:
+        template = SubstationTemplate(builder_class, connection, **parameters)
+        _templates[key] = template
+        if len(_templates) > MAX_TEMPLATES:
+            _templates.popitem(last=False)
+    else:
+        _templates.move_to_end(key)
+    return template
+
+def new_substation(builder_class:type, connection:ConnectionInterface, name:str, network:GraphModel=None,
+                   base_voltage:int|cim.BaseVoltage=115000, **parameters) -> object:
+    # Same as builder_class(connection=connection, network=network, name=name, base_voltage=base_voltage, **parameters),
+    # using a cached template of the topology
+    template = get_substation_template(builder_class, connection, **parameters)
+    return template.instantiate(name, network=network, base_voltage=base_voltage, connection=connection)
+
+def new_substations(builder_class:type, connection:ConnectionInterface, names:list[str], network:GraphModel=None,
+                    base_voltage:int|cim.BaseVoltage=115000, **parameters) -> list[object]:
+    # Creates one substation for each name from the same template
+    template = get_substation_template(builder_class, connection, **parameters)
+    builders = []
+    for name in names:
+        builders.append(template.instantiate(name, network=network, base_voltage=base_voltage,
+                                             connection=connection))
+    return builders
@@ -1,4 +1,36 @@
-from cimbuilder.utils.utils import new_mrid as new_mrid
+from cimbuilder.utils.mrid import new_mrid as new_mrid
+from cimbuilder.utils.mrid import new_mrids as new_mrids
+from cimbuilder.utils.mrid import get_mrid_generator as get_mrid_generator
+from cimbuilder.utils.mrid import set_mrid_generator as set_mrid_generator
+from cimbuilder.utils.mrid import mrid_generator as mrid_generator
+from cimbuilder.utils.mrid import mrid_scope as mrid_scope
+from cimbuilder.utils.mrid import record_mrids as record_mrids
+from cimbuilder.utils.mrid import MRIDGenerator as MRIDGenerator
+from cimbuilder.utils.mrid import NameMRIDGenerator as NameMRIDGenerator
+from cimbuilder.utils.mrid import CounterMRIDGenerator as CounterMRIDGenerator
 from cimbuilder.utils.utils import terminal_to_node as terminal_to_node
-from cimbuilder.utils.utils import get_cim_profile as get_cim_profile
-from cimbuilder.utils.utils import get_base_voltage as get_base_voltage
\ No newline at end of file
+from cimbuilder.utils.cim_profile import get_cim_profile as get_cim_profile
+from cimbuilder.utils.utils import get_base_voltage as get_base_voltage
+from cimbuilder.utils.node_index import NodeIndex as NodeIndex
+from cimbuilder.utils.node_index import get_node_index as get_node_index
+from cimbuilder.utils.measurement_index import MeasurementIndex as MeasurementIndex
+from cimbuilder.utils.measurement_index import get_measurement_index as get_measurement_index
+from cimbuilder.utils.base_voltage_registry import BaseVoltageRegistry as BaseVoltageRegistry
+from cimbuilder.utils.base_voltage_registry import get_base_voltage_registry as get_base_voltage_registry
+from cimbuilder.utils.xml_writer import StreamingXMLWriter as StreamingXMLWriter
+from cimbuilder.utils.merge import GraphMerger as GraphMerger
+from cimbuilder.utils.merge import merge_graphs as merge_graphs
+from cimbuilder.utils.merge import replace_base_voltages as replace_base_voltages
+from cimbuilder.utils.sourcebus import SourceBusCache as SourceBusCache
+from cimbuilder.utils.sourcebus import get_sourcebus_cache as get_sourcebus_cache
+from cimbuilder.utils.sourcebus import get_sourcebus as get_sourcebus
+from cimbuilder.utils.clone import clone_objects as clone_objects
+from cimbuilder.utils.clone import remap_attributes as remap_attributes
+from cimbuilder.utils.clone import ObjectTemplate as ObjectTemplate
+from cimbuilder.utils.changeset import Changeset as Changeset
+from cimbuilder.utils.prefetch import get_sourcebus_async as get_sourcebus_async
+from cimbuilder.utils.prefetch import get_base_voltage_async as get_base_voltage_async
+from cimbuilder.utils.profiling import Profiler as Profiler
+from cimbuilder.utils.snapshot import save_snapshot as save_snapshot
+from cimbuilder.utils.snapshot import load_snapshot as load_snapshot
+from cimbuilder.utils.snapshot import load_builder as load_builder
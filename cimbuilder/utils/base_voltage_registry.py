@@ -0,0 +1,111 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+import logging
+from itertools import islice
+
+from cimgraph import GraphModel
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
+
+from cimbuilder.utils.cim_profile import get_cim_profile
+
+_log = logging.getLogger(__name__)
+
+class BaseVoltageRegistry():
+    """
+    BaseVoltage lookup table for a network keyed by nominal voltage in volts.
+    Attributes are only fetched from the database for BaseVoltage objects
+    that do not have a nominalVoltage yet.
+    """
+
+    # Nominal voltages below this value are taken to be in kV
+    KV_LIMIT = 1000
+
+    def __init__(self, network:GraphModel):
+        self.network = network
+        self.cim = get_cim_profile(network.connection)
+        self.base_voltages = None
+        self.voltages = {}
+        self.exact = {}
+        self.ids = set()
+        self.last = None
+
+    def rebuild(self) -> None:
+        self.base_voltages = self.network.graph.get(self.cim.BaseVoltage)
+        self.voltages = {}
+        self.exact = {}
+        self.ids = set()
+        if self.base_voltages:
+            self.index(list(self.base_voltages.values()))
+        self.last = next(reversed(self.base_voltages)) if self.base_voltages else None
+
+    def refresh(self) -> None:
+        base_voltages = self.network.graph.get(self.cim.BaseVoltage)
+        if base_voltages is not self.base_voltages: # The dictionary was created or replaced
+            self.rebuild()
+            return
+        if not base_voltages:
+            if self.ids: # All BaseVoltages were removed
+                self.rebuild()
+            return
+        if next(reversed(base_voltages)) == self.last and len(base_voltages) == len(self.ids):
+            return
+        # Appended BaseVoltages are at the end and are preceded by one that is already indexed
+        new_voltages = len(base_voltages) - len(self.ids)
+        if new_voltages > 0:
+            tail = list(islice(reversed(base_voltages.values()), new_voltages + 1))
+            if (all(id(bv) not in self.ids for bv in tail[:new_voltages])
+                    and (len(tail) == new_voltages or id(tail[new_voltages]) in self.ids)):
+                self.index(list(reversed(tail[:new_voltages])))
+                self.last = next(reversed(base_voltages))
+                return
+        # BaseVoltages were removed or replaced
+        self.rebuild()
+
+    def index(self, base_voltages:list[cim.BaseVoltage]) -> None:
+        # Query database only if some objects were loaded without attributes
+        if any(bv.nominalVoltage is None for bv in base_voltages):
+            self.network.get_all_attributes(self.cim.BaseVoltage)
+        for bv in base_voltages:
+            self.ids.add(id(bv))
+            self.add(bv)
+
+    def add(self, base_voltage:cim.BaseVoltage) -> None:
+        if base_voltage.nominalVoltage is None:
+            _log.warning(f'BaseVoltage {base_voltage.mRID} does not have a nominalVoltage')
+            return
+        self.exact.setdefault(float(base_voltage.nominalVoltage), base_voltage)
+        self.voltages.setdefault(self.to_volts(base_voltage.nominalVoltage), base_voltage)
+
+    def get(self, nominal_voltage:float) -> cim.BaseVoltage:
+        self.refresh()
+        base_voltage = self.find(nominal_voltage)
+        if base_voltage is not None and self.base_voltages.get(base_voltage.mRID) is not base_voltage:
+            # Replaced under the same mRID, which leaves the order of the graph unchanged
+            self.rebuild()
+            base_voltage = self.find(nominal_voltage)
+        return base_voltage
+
+    def find(self, nominal_voltage:float) -> cim.BaseVoltage:
+        # Numeric values may be given in either V or kV, in the network and in the lookup.
+        # An exact match is preferred if the network has both, such as 230 V and 230 kV.
+        base_voltage = self.exact.get(float(nominal_voltage))
+        if base_voltage is None:
+            base_voltage = self.voltages.get(self.to_volts(nominal_voltage))
+        if base_voltage is None: # Low voltages stored in V, such as 480 for a lookup of 0.48
+            base_voltage = self.exact.get(float(nominal_voltage)*1000)
+        return base_voltage
+
+    @classmethod
+    def to_volts(cls, nominal_voltage:float) -> float:
+        nominal_voltage = float(nominal_voltage)
+        if nominal_voltage < cls.KV_LIMIT:
+            nominal_voltage = nominal_voltage*1000
+        return nominal_voltage
+
+def get_base_voltage_registry(network:GraphModel) -> BaseVoltageRegistry:
+    registry = getattr(network, '_base_voltage_registry', None)
+    if registry is None:
+        registry = BaseVoltageRegistry(network)
+        network._base_voltage_registry = registry
+    return registry
@@ -0,0 +1,147 @@
+from __future__ import annotations
+import enum
+import logging
+from contextlib import contextmanager
+from itertools import islice
+
+from cimgraph import GraphModel
+from cimgraph.databases import ConnectionInterface
+from cimgraph.models.graph_model import json_dump
+
+from cimbuilder.utils.mrid import record_mrids
+from cimbuilder.utils.xml_writer import get_serializer
+
+_log = logging.getLogger(__name__)
+
+class Changeset():
+    """
+    Collects new CIM objects and writes them to a triple store in batched SPARQL
+    INSERT DATA updates of at most chunk_size triples. If an update fails, the
+    chunks that were already inserted are removed again with DELETE DATA.
+    Updates are sent with connection.execute unless another update function is
+    given, such as rdflib.Graph().update for a local in-process store.
+    """
+
+    def __init__(self, connection:ConnectionInterface, chunk_size:int=10000, update:callable=None):
+        self.connection = connection
+        self.cim = connection.cim
+        self.namespace = connection.namespace
+        self.chunk_size = int(chunk_size)
+        self.update = update if update is not None else connection.execute
+        self.objects = {}
+
+        if int(connection.iec61970_301) > 7:
+            self.rdf_resource = 'urn:uuid:'
+        else:
+            url = getattr(connection.connection_params, 'url', None) or ''
+            self.rdf_resource = f'{url}#'
+        self.prefix = (f'PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>\n'
+                       f'PREFIX cim: <{self.namespace}>\n')
+
+    def __len__(self) -> int:
+        return len(self.objects)
+
+    def add(self, obj:object) -> None:
+        self.objects.setdefault(obj.mRID, obj)
+
+    def add_objects(self, objects:list[object]) -> None:
+        for obj in objects:
+            self.objects.setdefault(obj.mRID, obj)
+
+    def add_network(self, network:GraphModel|dict[type, dict[str, object]]) -> None:
+        graph = network if network.__class__ == dict else network.graph
+        for objects in graph.values():
+            self.add_objects(objects.values())
+
+    def begin(self, network:GraphModel) -> dict[type, int]:
+        # Returns the size of the network graph so that objects added later can be collected
+        return {cim_class: len(objects) for cim_class, objects in network.graph.items()}
+
+    def collect(self, network:GraphModel, snapshot:dict[type, int], created:set[str]=None) -> int:
+        # Add the objects that were added to the network graph since the snapshot.
+        # If created is given, only objects with one of these mRIDs are added.
+        counter = 0
+        for cim_class, objects in network.graph.items():
+            new_objects = len(objects) - snapshot.get(cim_class, 0)
+            if new_objects < 0:
+                _log.warning(f'{cim_class.__name__} objects were removed from the network, collecting all of them')
+                new_objects = len(objects)
+            if new_objects > 0:
+                new_objects = reversed(list(islice(reversed(objects.values()), new_objects)))
+                if created is not None:
+                    new_objects = [obj for obj in new_objects if obj.mRID in created]
+                else:
+                    new_objects = list(new_objects)
+                self.add_objects(new_objects)
+                counter = counter + len(new_objects)
+        return counter
+
+    @contextmanager
+    def track(self, network:GraphModel):
+        # Collect the objects created inside the with block and added to the network, for example
+        # by a substation builder. Objects that were only added to the graph, such as the source
+        # bus of an attached feeder, are not collected because their mRIDs were not created here.
+        snapshot = self.begin(network)
+        with record_mrids() as created:
+            yield self
+        self.collect(network, snapshot, created)
+
+    def triples(self, obj:object) -> list[str]:
+        cim_class = obj.__class__
+        subject = f'<{self.rdf_resource}{obj.mRID}>'
+        triples = [f'{subject} a cim:{cim_class.__name__} .']
+        for tag, attribute, many_to_many, association in get_serializer(cim_class, self.cim):
+            value = getattr(obj, attribute)
+            if many_to_many: # Only the first item is written, as in the XML writer
+                value = value[0] if value else None
+            if value is None:
+                continue
+            if association:
+                if type(type(value)) is enum.EnumMeta:
+                    triples.append(f'{subject} cim:{tag} <{self.namespace}{value}> .')
+                else:
+                    triples.append(f'{subject} cim:{tag} <{self.rdf_resource}{value.mRID}> .')
+            else:
+                literal = json_dump(value, self.cim)
+                if literal:
+                    literal = str(literal).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+                    triples.append(f'{subject} cim:{tag} "{literal}" .')
+        return triples
+
+    def chunks(self) -> list[list[str]]:
+        chunks = []
+        chunk = []
+        for obj in self.objects.values():
+            triples = self.triples(obj)
+            # Triples of one object are not split across updates
+            if chunk and len(chunk) + len(triples) > self.chunk_size:
+                chunks.append(chunk)
+                chunk = []
+            chunk.extend(triples)
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def flush(self) -> int:
+        # Insert all collected objects. Returns the number of triples inserted.
+        inserted = []
+        try:
+            for chunk in self.chunks():
+                self.update(self.prefix + 'INSERT DATA {\n' + '\n'.join(chunk) + '\n}')
+                inserted.append(chunk)
+        except Exception:
+            _log.error(f'Changeset update failed after {len(inserted)} chunks, rolling back')
+            self.rollback(inserted)
+            raise
+
+        counter = sum(len(chunk) for chunk in inserted)
+        _log.info(f'Inserted {len(self.objects)} objects as {counter} triples in {len(inserted)} updates')
+        self.objects = {}
+        return counter
+
+    def rollback(self, chunks:list[list[str]]) -> None:
+        for chunk in reversed(chunks):
+            try:
+                self.update(self.prefix + 'DELETE DATA {\n' + '\n'.join(chunk) + '\n}')
+            except Exception as error:
+                _log.error(f'Rollback of changeset chunk failed: {error}')
@@ -0,0 +1,18 @@
+from __future__ import annotations
+import importlib
+import logging
+
+from cimgraph.databases import ConnectionInterface
+
+_log = logging.getLogger(__name__)
+
+# CIM profile modules by profile name. Profiles are only imported when first used.
+_cim_profiles = {}
+
+def get_cim_profile(connection:ConnectionInterface) -> type:
+    cim_profile = connection.connection_params.cim_profile
+    cim = _cim_profiles.get(cim_profile)
+    if cim is None:
+        cim = importlib.import_module(f'cimgraph.data_profile.{cim_profile}')
+        _cim_profiles[cim_profile] = cim
+    return cim
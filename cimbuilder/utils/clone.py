@@ -0,0 +1,149 @@
+from __future__ import annotations
+import dataclasses
+import logging
+import typing
+
+from cimbuilder.utils.mrid import new_mrids
+
+_log = logging.getLogger(__name__)
+
+# Field names of each CIM class, grouped by how they are copied
+_class_fields = {}
+
+def get_class_fields(cim_class:type) -> tuple[list[str], list[str], list[str]]:
+    # Returns the string, association, and list fields of a CIM class
+    fields = _class_fields.get(cim_class)
+    if fields is None:
+        str_fields = []
+        association_fields = []
+        list_fields = []
+        type_hints = typing.get_type_hints(cim_class)
+        for field in dataclasses.fields(cim_class):
+            attribute_type = type_hints[field.name]
+            origin = typing.get_origin(attribute_type)
+            if origin is list:
+                list_fields.append(field.name)
+                continue
+            if origin is typing.Union: # Optional[...]
+                attribute_type = [arg for arg in typing.get_args(attribute_type) if arg is not type(None)][0]
+            if attribute_type is str:
+                if field.name != 'mRID':
+                    str_fields.append(field.name)
+            elif dataclasses.is_dataclass(attribute_type):
+                association_fields.append(field.name)
+            # Numbers, booleans, and enumerations are copied as they are
+        fields = (str_fields, association_fields, list_fields)
+        _class_fields[cim_class] = fields
+    return fields
+
+class ObjectTemplate():
+    """
+    Compiled copy plan for a set of CIM objects. Each clone has new mRIDs, and
+    associations between the objects are remapped to the new copies. Associations
+    to objects outside the set are kept, or replaced using the shared argument of clone.
+    Copies are added to the lists of outside objects that hold the original, such as
+    BaseVoltage.ConductingEquipment.
+    """
+
+    def __init__(self, objects:list[object]):
+        self.objects = list(objects)
+        index = {id(obj): position for position, obj in enumerate(self.objects)}
+        # Lists of each outside object by id(item), found once for each object
+        reverse_lists = {}
+        self.plans = []
+        for obj in self.objects:
+            str_fields, association_fields, list_fields = get_class_fields(obj.__class__)
+            values = obj.__dict__
+            strings = [(attribute, values[attribute]) for attribute in str_fields if values[attribute] is not None]
+            # Associations are (attribute, position of the object in the template or None, object,
+            # lists of the outside object that hold obj)
+            associations = []
+            for attribute in association_fields:
+                value = values[attribute]
+                if value is None:
+                    continue
+                position = index.get(id(value))
+                if position is not None:
+                    associations.append((attribute, position, value, ()))
+                    continue
+                if id(value) not in reverse_lists:
+                    reverse_lists[id(value)] = _get_reverse_lists(value)
+                associations.append((attribute, None, value, tuple(reverse_lists[id(value)].get(id(obj), ()))))
+            lists = []
+            empty_lists = []
+            for attribute in list_fields:
+                if values[attribute]:
+                    lists.append((attribute, [(index.get(id(item)), item) for item in values[attribute]]))
+                else:
+                    empty_lists.append(attribute)
+            self.plans.append((obj.__class__, values, strings, associations, lists, empty_lists))
+
+    def clone(self, rename:callable=None, shared:dict[int, object]=None,
+              rename_fields:list[str]=None) -> list[object]:
+        # Returns the copies in the same order as the template objects. Strings such as names
+        # are passed through rename, or only the strings in rename_fields if given. shared maps
+        # id(object) of objects outside the template to the object to use instead.
+        names = []
+        copies = []
+        for cim_class, template_values, strings, associations, lists, empty_lists in self.plans:
+            values = template_values.copy()
+            if rename is not None:
+                for attribute, text in strings:
+                    if rename_fields is None or attribute in rename_fields:
+                        values[attribute] = rename(text)
+            for attribute in empty_lists:
+                values[attribute] = []
+            new_obj = cim_class.__new__(cim_class)
+            new_obj.__dict__ = values
+            names.append(values.get('name'))
+            copies.append(new_obj)
+
+        for new_obj, mRID, (_, _, _, associations, lists, _) in zip(copies, new_mrids(names), self.plans):
+            values = new_obj.__dict__
+            values['mRID'] = mRID
+            for attribute, position, value, reverse_attributes in associations:
+                if position is not None:
+                    values[attribute] = copies[position]
+                    continue
+                if shared:
+                    value = shared.get(id(value), value)
+                    values[attribute] = value
+                for reverse_attribute in reverse_attributes:
+                    getattr(value, reverse_attribute).append(new_obj)
+            for attribute, items in lists:
+                if shared:
+                    values[attribute] = [copies[position] if position is not None else shared.get(id(item), item)
+                                         for position, item in items]
+                else:
+                    values[attribute] = [copies[position] if position is not None else item
+                                         for position, item in items]
+        return copies
+
+    def mapping(self, copies:list[object]) -> dict[int, object]:
+        # Dictionary of id(template object) to its copy
+        return {id(obj): new_obj for obj, new_obj in zip(self.objects, copies)}
+
+def _get_reverse_lists(obj:object) -> dict[int, list[str]]:
+    # Dictionary of id(item) to the list fields of obj that hold the item
+    reverse_lists = {}
+    for attribute in get_class_fields(obj.__class__)[2]:
+        for item in getattr(obj, attribute):
+            reverse_lists.setdefault(id(item), []).append(attribute)
+    return reverse_lists
+
+def clone_objects(objects:list[object], rename:callable=None, shared:dict[int, object]=None) -> dict[int, object]:
+    # Copies a set of CIM objects once. Returns a dictionary of id(original) to copy.
+    template = ObjectTemplate(objects)
+    return template.mapping(template.clone(rename, shared))
+
+def remap_attributes(attributes:dict[str, object], mapping:dict[int, object]) -> dict[str, object]:
+    # Remaps object attributes, such as builder state, to the copies made by ObjectTemplate
+    remapped = {}
+    for attribute, value in attributes.items():
+        if value.__class__ == list:
+            remapped[attribute] = [mapping.get(id(item), item) for item in value]
+        elif value.__class__ == dict:
+            remapped[attribute] = {key: mapping.get(id(item), item) for key, item in value.items()}
+        else:
+            remapped[attribute] = mapping.get(id(value), value)
+    return remapped
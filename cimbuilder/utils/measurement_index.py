@@ -0,0 +1,86 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+import logging
+from itertools import islice
+
+from cimgraph import GraphModel
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
+
+from cimbuilder.utils.cim_profile import get_cim_profile
+
+_log = logging.getLogger(__name__)
+
+class MeasurementIndex():
+    """
+    Lookup table of the Measurements of a network keyed by PowerSystemResource mRID,
+    Terminal mRID, and measurementType. Like NodeIndex, it follows network.graph lazily
+    and only indexes measurements that were added since the last lookup. The index is
+    rebuilt if measurements were removed or replaced.
+    """
+
+    def __init__(self, network:GraphModel):
+        self.network = network
+        self.cim = get_cim_profile(network.connection)
+        self.measurements = {}
+        self.graphs = {}
+        self.ids = {}
+        self.last = {}
+
+    def rebuild(self) -> None:
+        self.measurements = {}
+        self.graphs = {}
+        self.ids = {}
+        self.last = {}
+        self.refresh()
+
+    def refresh(self) -> None:
+        graph = self.network.graph
+        if any(graph.get(cim_class) is not objects for cim_class, objects in self.graphs.items()):
+            # A measurement dictionary was removed or replaced, start over
+            self.rebuild()
+            return
+        for cim_class, objects in list(graph.items()):
+            if not issubclass(cim_class, self.cim.Measurement):
+                continue
+            ids = self.ids.setdefault(cim_class, set())
+            if not objects:
+                if ids: # All measurements of the class were removed
+                    self.rebuild()
+                    return
+                continue
+            if next(reversed(objects)) == self.last.get(cim_class) and len(objects) == len(ids):
+                continue
+            # Appended measurements are at the end and are preceded by one that is already indexed
+            new_measurements = len(objects) - len(ids)
+            if new_measurements > 0:
+                tail = list(islice(reversed(objects.values()), new_measurements + 1))
+                if (all(id(meas) not in ids for meas in tail[:new_measurements])
+                        and (len(tail) == new_measurements or id(tail[new_measurements]) in ids)):
+                    for meas in reversed(tail[:new_measurements]):
+                        ids.add(id(meas))
+                        self.add(meas)
+                    self.graphs[cim_class] = objects
+                    self.last[cim_class] = next(reversed(objects))
+                    continue
+            # Measurements were removed or replaced
+            self.rebuild()
+            return
+
+    def key(self, equipment:object, terminal:cim.Terminal, measurementType:str) -> tuple[str, str, str]:
+        return (equipment.mRID if equipment is not None else None,
+                terminal.mRID if terminal is not None else None, measurementType)
+
+    def add(self, meas:cim.Measurement) -> None:
+        self.measurements.setdefault(self.key(meas.PowerSystemResource, meas.Terminal, meas.measurementType), meas)
+
+    def get(self, equipment:object, terminal:cim.Terminal, measurementType:str) -> cim.Measurement:
+        self.refresh()
+        return self.measurements.get(self.key(equipment, terminal, measurementType))
+
+def get_measurement_index(network:GraphModel) -> MeasurementIndex:
+    measurement_index = getattr(network, '_measurement_index', None)
+    if measurement_index is None:
+        measurement_index = MeasurementIndex(network)
+        network._measurement_index = measurement_index
+    return measurement_index
@@ -0,0 +1,100 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+import logging
+
+from cimgraph import GraphModel
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
+
+from cimbuilder.utils.base_voltage_registry import get_base_voltage_registry
+from cimbuilder.utils.cim_profile import get_cim_profile
+from cimbuilder.utils.clone import _get_reverse_lists
+
+_log = logging.getLogger(__name__)
+
+class GraphMerger():
+    """
+    Merges graph dictionaries built separately, for example in worker processes,
+    into one network. BaseVoltage objects are deduplicated by nominal voltage,
+    mRID collisions raise a ValueError, and name collisions are logged and
+    collected in name_collisions.
+    """
+
+    def __init__(self, network:GraphModel):
+        self.network = network
+        self.cim = get_cim_profile(network.connection)
+        # Classes whose names must be unique across merged graphs
+        self.named_classes = (self.cim.ConnectivityNode, self.cim.ConductingEquipment, self.cim.EquipmentContainer)
+        self.base_voltages = get_base_voltage_registry(network)
+        self.mrids = {}
+        self.names = {}
+        self.name_collisions = []
+        for objects in network.graph.values():
+            for obj in objects.values():
+                self.index(obj)
+
+    def index(self, obj:object) -> None:
+        self.mrids[obj.mRID] = obj
+        if isinstance(obj, self.named_classes) and obj.name is not None:
+            self.names.setdefault((obj.__class__, obj.name), obj.mRID)
+
+    def merge(self, graph:dict[type, dict[str, object]]) -> int:
+        # Check the whole graph before changing the network
+        replaced = {}
+        for cim_class, objects in graph.items():
+            for mRID, obj in objects.items():
+                if cim_class == self.cim.BaseVoltage and obj.nominalVoltage is not None:
+                    existing = self.base_voltages.get(obj.nominalVoltage)
+                    if existing is not None and float(existing.nominalVoltage) == float(obj.nominalVoltage):
+                        replaced[id(obj)] = existing
+                        continue
+                existing = self.mrids.get(mRID)
+                if existing is not None and existing is not obj:
+                    raise ValueError(f'mRID collision for {mRID}: {cim_class.__name__} {obj.name} and '
+                                     f'{existing.__class__.__name__} {existing.name}')
+
+        counter = 0
+        merged = []
+        for cim_class, objects in graph.items():
+            class_graph = self.network.graph.setdefault(cim_class, {})
+            for mRID, obj in objects.items():
+                if id(obj) in replaced or mRID in class_graph:
+                    continue
+                if isinstance(obj, self.named_classes) and obj.name is not None:
+                    key = (cim_class, obj.name)
+                    if key in self.names and self.names[key] != mRID:
+                        message = f'{cim_class.__name__} name {obj.name} is used by {self.names[key]} and {mRID}'
+                        _log.warning(message)
+                        self.name_collisions.append(message)
+                class_graph[mRID] = obj
+                self.index(obj)
+                merged.append(obj)
+                counter = counter + 1
+        # Point equipment at the BaseVoltage already in the network
+        if replaced:
+            replace_base_voltages(merged, replaced)
+        return counter
+
+def replace_base_voltages(objects:list[object], replaced:dict[int, cim.BaseVoltage]) -> None:
+    # Point objects at the BaseVoltage that replaces theirs, given by id(old BaseVoltage).
+    # Objects are moved from the lists of the old BaseVoltage that held them, such as
+    # ConductingEquipment, to the same lists of the new one.
+    moved = {}
+    for obj in objects:
+        base_voltage = getattr(obj, 'BaseVoltage', None)
+        if id(base_voltage) in replaced:
+            moved.setdefault(id(base_voltage), (base_voltage, []))[1].append(obj)
+    for base_voltage, moved_objects in moved.values():
+        new_base_voltage = replaced[id(base_voltage)]
+        reverse_lists = _get_reverse_lists(base_voltage)
+        for obj in moved_objects:
+            for attribute in reverse_lists.get(id(obj), ()):
+                getattr(new_base_voltage, attribute).append(obj)
+            obj.BaseVoltage = new_base_voltage
+        moved_ids = {id(obj) for obj in moved_objects}
+        for attribute in {attribute for attributes in reverse_lists.values() for attribute in attributes}:
+            items = getattr(base_voltage, attribute)
+            items[:] = [item for item in items if id(item) not in moved_ids]
+
+def merge_graphs(network:GraphModel, graph:dict[type, dict[str, object]]) -> int:
+    return GraphMerger(network).merge(graph)
@@ -0,0 +1,137 @@
+from __future__ import annotations
+import logging
+import os
+import uuid
+from contextlib import contextmanager
+
+_log = logging.getLogger(__name__)
+
+# Default namespace for deterministic mRIDs
+CIMBUILDER_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, 'https://github.com/PNNL-CIM-Tools/CIM-Builder')
+
+class MRIDGenerator():
+    # Default generator, creates a random UUID for every new object
+    def new_mrid(self, name:str=None) -> str:
+        return str(uuid.uuid4())
+
+    def new_mrids(self, names:list[str]) -> list[str]:
+        # Subclasses that only override new_mrid are called once for each name
+        if self.__class__.new_mrid is not MRIDGenerator.new_mrid:
+            return [self.new_mrid(name) for name in names]
+        # Format random version 4 UUIDs from one block of random bytes
+        data = os.urandom(16*len(names)).hex()
+        mrids = []
+        for index in range(0, 32*len(names), 32):
+            text = data[index:index+32]
+            mrids.append(f'{text[:8]}-{text[8:12]}-4{text[13:16]}-{_VARIANT[text[16]]}{text[17:20]}-{text[20:]}')
+        return mrids
+
+    def reset(self) -> None:
+        pass
+
+    def scope(self) -> MRIDGenerator:
+        # Generator to use for one build, see mrid_scope
+        return self
+
+# First hex digit of the UUID variant field (10xx in binary)
+_VARIANT = {digit: '89ab'[int(digit, 16) & 3] for digit in '0123456789abcdef'}
+
+class NameMRIDGenerator(MRIDGenerator):
+    # Creates a name-based UUID (version 5) under the given namespace.
+    # Repeated names are numbered in order of creation, so identical build
+    # inputs always produce identical mRIDs.
+    def __init__(self, namespace:uuid.UUID|str=CIMBUILDER_NAMESPACE):
+        if namespace.__class__ == str:
+            namespace = uuid.uuid5(CIMBUILDER_NAMESPACE, namespace)
+        self.namespace = namespace
+        self.counts = {}
+
+    def new_mrid(self, name:str=None) -> str:
+        if name is None:
+            name = ''
+        count = self.counts.get(name, 0)
+        self.counts[name] = count + 1
+        if count:
+            name = f'{name}#{count}'
+        return str(uuid.uuid5(self.namespace, name))
+
+    def reset(self) -> None:
+        self.counts = {}
+
+    def scope(self) -> NameMRIDGenerator:
+        # Each build numbers repeated names from the start, so building the same
+        # substation again in the same process gives the same mRIDs
+        return NameMRIDGenerator(self.namespace)
+
+class CounterMRIDGenerator(MRIDGenerator):
+    # Creates sequential mRIDs by replacing the last 12 hex digits of the
+    # namespace UUID with a counter. This is the fastest deterministic mode,
+    # but mRIDs depend on the order in which objects are created.
+    def __init__(self, namespace:uuid.UUID|str=CIMBUILDER_NAMESPACE, start:int=0):
+        if namespace.__class__ == str:
+            namespace = uuid.uuid5(CIMBUILDER_NAMESPACE, namespace)
+        self.namespace = namespace
+        self.prefix = str(namespace)[:24]
+        self.start = start
+        self.counter = start
+
+    def new_mrid(self, name:str=None) -> str:
+        counter = self.counter
+        self.counter = counter + 1
+        return f'{self.prefix}{counter:012x}'
+
+    def reset(self) -> None:
+        self.counter = self.start
+
+_generator = MRIDGenerator()
+
+# Sets of mRIDs that are being recorded, see record_mrids
+_recorders = []
+
+def get_mrid_generator() -> MRIDGenerator:
+    return _generator
+
+def set_mrid_generator(generator:MRIDGenerator) -> MRIDGenerator:
+    # Returns the previous generator so that it can be restored
+    global _generator
+    previous = _generator
+    _generator = generator
+    return previous
+
+@contextmanager
+def mrid_generator(generator:MRIDGenerator):
+    previous = set_mrid_generator(generator)
+    try:
+        yield generator
+    finally:
+        set_mrid_generator(previous)
+
+@contextmanager
+def mrid_scope():
+    # Use the current generator for one build. Name-based generators start with new
+    # counts, which are discarded at the end of the build. Random and counter
+    # generators are shared with the enclosing scope, so their mRIDs stay unique.
+    with mrid_generator(_generator.scope()) as generator:
+        yield generator
+
+@contextmanager
+def record_mrids():
+    # Collects the mRIDs created with new_mrid and new_mrids inside the with block
+    recorded = set()
+    _recorders.append(recorded)
+    try:
+        yield recorded
+    finally:
+        _recorders.remove(recorded)
+
+def new_mrid(name:str=None) -> str:
+    mRID = _generator.new_mrid(name)
+    for recorded in _recorders:
+        recorded.add(mRID)
+    return mRID
+
+def new_mrids(names:list[str]) -> list[str]:
+    mrids = _generator.new_mrids(names)
+    for recorded in _recorders:
+        recorded.update(mrids)
+    return mrids
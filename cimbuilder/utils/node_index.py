@@ -0,0 +1,110 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+import logging
+from itertools import islice
+
+from cimgraph import GraphModel
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
+
+from cimbuilder.utils.cim_profile import get_cim_profile
+
+_log = logging.getLogger(__name__)
+
+class NodeIndex():
+    """
+    Name and aliasName lookup table for the ConnectivityNodes of a network.
+    The index follows network.graph lazily, so nodes added with add_to_graph
+    are picked up on the next lookup without rescanning the whole graph.
+    Nodes that are renamed, or replaced by a node with another name under the
+    same mRID, should be passed to rename or discard.
+    """
+
+    def __init__(self, network:GraphModel):
+        self.network = network
+        self.cim = get_cim_profile(network.connection)
+        self.nodes = None
+        self.names = {}
+        self.aliases = {}
+        self.ids = set()
+        self.last = None
+
+    def rebuild(self) -> None:
+        self.nodes = self.network.graph.get(self.cim.ConnectivityNode)
+        self.names = {}
+        self.aliases = {}
+        self.ids = set()
+        if self.nodes:
+            for node in self.nodes.values():
+                self.add(node)
+        self.last = next(reversed(self.nodes)) if self.nodes else None
+
+    def refresh(self) -> None:
+        nodes = self.network.graph.get(self.cim.ConnectivityNode)
+        if nodes is not self.nodes: # The node dictionary was created or replaced
+            self.rebuild()
+            return
+        if not nodes or next(reversed(nodes)) == self.last and len(nodes) == len(self.ids):
+            return
+        # graph dicts are insertion ordered, so appended nodes are at the end and are
+        # preceded by a node that is already indexed
+        new_nodes = len(nodes) - len(self.ids)
+        if new_nodes > 0:
+            tail = list(islice(reversed(nodes.values()), new_nodes + 1))
+            if (all(id(node) not in self.ids for node in tail[:new_nodes])
+                    and (len(tail) == new_nodes or id(tail[new_nodes]) in self.ids)):
+                for node in reversed(tail[:new_nodes]):
+                    self.add(node)
+                self.last = next(reversed(nodes))
+                return
+        # Nodes were removed or replaced without discard
+        self.rebuild()
+
+    def add(self, node:cim.ConnectivityNode) -> None:
+        self.ids.add(id(node))
+        if node.name is not None:
+            self.names.setdefault(node.name, []).append(node)
+        if node.aliasName is not None and node.aliasName != node.name:
+            self.aliases.setdefault(node.aliasName, []).append(node)
+
+    def discard(self, node:cim.ConnectivityNode, name:str=None, alias_name:str=None) -> None:
+        # Remove a node from the index under its current names, or the old names if given
+        self.ids.discard(id(node))
+        for table, key in ((self.names, name or node.name), (self.aliases, alias_name or node.aliasName)):
+            matches = table.get(key)
+            if matches:
+                matches[:] = [match for match in matches if match is not node]
+                if not matches:
+                    del table[key]
+
+    def rename(self, node:cim.ConnectivityNode, old_name:str=None, old_alias_name:str=None) -> None:
+        # Index a node under its new name and aliasName after they were changed
+        self.discard(node, old_name, old_alias_name)
+        self.add(node)
+
+    def find(self, name:str) -> list[cim.ConnectivityNode]:
+        self.refresh()
+        matches = self.names.get(name, []) + self.aliases.get(name, [])
+        nodes = self.nodes or {}
+        if any(nodes.get(node.mRID) is not node for node in matches):
+            # Nodes were removed or replaced under the same mRID without discard
+            self.rebuild()
+            matches = self.names.get(name, []) + self.aliases.get(name, [])
+        # Skip nodes that were renamed since they were indexed
+        return [node for node in matches if node.name == name or node.aliasName == name]
+
+    def get(self, name:str) -> cim.ConnectivityNode:
+        matches = self.find(name)
+        if not matches:
+            _log.error(f'Could not find a ConnectivityNode with name {name}')
+            return None
+        if len(matches) > 1:
+            _log.warning(f'Found {len(matches)} ConnectivityNodes with name {name}. Using {matches[0].mRID}')
+        return matches[0]
+
+def get_node_index(network:GraphModel) -> NodeIndex:
+    node_index = getattr(network, '_node_index', None)
+    if node_index is None:
+        node_index = NodeIndex(network)
+        network._node_index = node_index
+    return node_index
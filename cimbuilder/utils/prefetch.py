@@ -0,0 +1,55 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+import asyncio
+import logging
+import threading
+from concurrent.futures import Executor
+
+from cimgraph import GraphModel
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
+
+from cimbuilder.utils.base_voltage_registry import get_base_voltage_registry
+from cimbuilder.utils.sourcebus import get_sourcebus
+from cimbuilder.utils.utils import get_base_voltage
+
+_log = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+
+async def _run_query(network:GraphModel, function:callable, *args, executor:Executor=None,
+                     semaphore:asyncio.Semaphore=None) -> object:
+    # Run a blocking database query in a worker thread
+    if semaphore is None:
+        return await asyncio.get_running_loop().run_in_executor(executor, _locked_query, network, function, *args)
+    async with semaphore:
+        return await asyncio.get_running_loop().run_in_executor(executor, _locked_query, network, function, *args)
+
+def _locked_query(network:GraphModel, function:callable, *args) -> object:
+    # Only one thread at a time expands the graph of a network
+    with get_query_lock(network):
+        return function(*args)
+
+def get_query_lock(network:GraphModel) -> threading.Lock:
+    with _lock:
+        lock = getattr(network, '_query_lock', None)
+        if lock is None:
+            lock = threading.Lock()
+            network._query_lock = lock
+    return lock
+
+async def get_sourcebus_async(feeder_network:GraphModel, feeder:cim.Feeder, sourcebus:cim.ConnectivityNode=None,
+                              executor:Executor=None, semaphore:asyncio.Semaphore=None) -> cim.ConnectivityNode:
+    # Same as get_sourcebus, but the EnergySource, Terminal, and ConnectivityNode queries run
+    # in a worker thread. The source bus is cached, so new_feeder does not query it again.
+    return await _run_query(feeder_network, get_sourcebus, feeder_network, feeder, sourcebus,
+                            executor=executor, semaphore=semaphore)
+
+async def get_base_voltage_async(network:GraphModel, base_voltage:int|cim.BaseVoltage, executor:Executor=None,
+                                 semaphore:asyncio.Semaphore=None) -> cim.BaseVoltage:
+    # Same as get_base_voltage, but the attributes of BaseVoltages are fetched in a worker
+    # thread. A new BaseVoltage is created in the calling thread.
+    if base_voltage.__class__ == float or base_voltage.__class__ == int:
+        await _run_query(network, get_base_voltage_registry(network).refresh,
+                         executor=executor, semaphore=semaphore)
+    return get_base_voltage(network, base_voltage)
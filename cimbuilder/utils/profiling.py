@@ -0,0 +1,209 @@
+from __future__ import annotations
+import functools
+import importlib
+import inspect
+import json
+import logging
+import pkgutil
+import sys
+import threading
+import time
+
+from cimgraph import GraphModel
+
+_log = logging.getLogger(__name__)
+
+# Packages that are instrumented, along with the cimgraph methods that query or fill a graph
+PACKAGES = ['cimbuilder.object_builder', 'cimbuilder.utils', 'cimbuilder.substation_builder']
+GRAPH_METHODS = ['add_to_graph', 'get_all_edges']
+
+# Methods of classes that are instrumented besides the public ones
+CLASS_METHODS = ['__init__', '__post_init__']
+
+class Profiler():
+    """
+    Records the number of calls, time, and objects created by each function of
+    object_builder, utils, and substation_builder, in total and for each substation.
+    Functions are only replaced by timed wrappers while the profiler is enabled, so
+    there is no overhead otherwise. Objects created are counted from the graph of the
+    network a function works on and include objects created by the functions it calls.
+    Worker processes of build_substations are not profiled.
+    """
+
+    _active = None
+
+    def __init__(self):
+        self.functions = {}
+        self.substations = {}
+        self.folded = {}
+        self.patched = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def __enter__(self) -> Profiler:
+        self.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.disable()
+
+    def enable(self) -> None:
+        if Profiler._active is self:
+            return
+        if Profiler._active is not None:
+            raise RuntimeError('Another Profiler is already enabled')
+        Profiler._active = self
+
+        modules = []
+        for package in PACKAGES:
+            modules.append(importlib.import_module(package))
+            for module_info in pkgutil.walk_packages(modules[-1].__path__, f'{package}.'):
+                modules.append(importlib.import_module(module_info.name))
+        modules = [module for module in modules if module.__name__ != __name__]
+        module_names = {module.__name__ for module in modules}
+
+        # Wrap each function once and replace it everywhere it was imported
+        wrappers = {}
+        for module in modules:
+            for name, obj in list(vars(module).items()):
+                if inspect.isfunction(obj) and obj.__module__ in module_names and _can_wrap(obj):
+                    if id(obj) not in wrappers:
+                        wrappers[id(obj)] = self.wrap(obj, obj.__qualname__)
+                    self.patch(module, name, wrappers[id(obj)])
+                elif inspect.isclass(obj) and obj.__module__ == module.__name__:
+                    self.patch_class(obj, obj.__qualname__)
+        for cim_class in [GraphModel] + GraphModel.__subclasses__():
+            for name in GRAPH_METHODS:
+                if name in vars(cim_class):
+                    self.patch(cim_class, name, self.wrap(vars(cim_class)[name], f'{cim_class.__name__}.{name}'))
+
+    def disable(self) -> None:
+        if Profiler._active is not self:
+            return
+        for owner, name, original in reversed(self.patched):
+            setattr(owner, name, original)
+        self.patched = []
+        Profiler._active = None
+
+    def patch(self, owner:object, name:str, wrapper:callable) -> None:
+        self.patched.append((owner, name, vars(owner)[name]))
+        setattr(owner, name, wrapper)
+
+    def patch_class(self, cim_class:type, class_name:str) -> None:
+        names = [name for name in vars(cim_class) if not name.startswith('_')]
+        # Dataclasses are timed from __post_init__ instead of the generated __init__
+        names += [name for name in CLASS_METHODS if name in vars(cim_class)]
+        if '__post_init__' in names and '__init__' in names:
+            names.remove('__init__')
+        for name in names:
+            method = vars(cim_class)[name]
+            if inspect.isfunction(method) and _can_wrap(method):
+                self.patch(cim_class, name, self.wrap(method, f'{class_name}.{name}'))
+
+    def wrap(self, function:callable, name:str) -> callable:
+        profiler = self
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            return profiler.call(name, function, args, kwargs)
+        return wrapper
+
+    def call(self, name:str, function:callable, args:tuple, kwargs:dict) -> object:
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = []
+            self.local.stack = stack
+        network = _get_network(args)
+        objects = _count_objects(network)
+        substation = _get_substation(args, kwargs)
+        if substation is None and stack:
+            substation = stack[-1][1]
+        frame = [name, substation, 0.0]
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            path = ';'.join(item[0] for item in stack)
+            stack.pop()
+            if stack:
+                stack[-1][2] += elapsed
+            if network is None: # Builders create their network while running
+                network = _get_network(args)
+            objects = _count_objects(network) - objects
+            self.record(name, substation, path, elapsed, elapsed - frame[2], objects)
+
+    def record(self, name:str, substation:str, path:str, elapsed:float, self_time:float, objects:int) -> None:
+        with self.lock:
+            for stats in (self.functions, self.substations.setdefault(substation, {})):
+                values = stats.get(name)
+                if values is None:
+                    values = [0, 0.0, 0.0, 0]
+                    stats[name] = values
+                values[0] += 1
+                values[1] += elapsed
+                values[2] += self_time
+                values[3] += objects
+            self.folded[path] = self.folded.get(path, 0.0) + self_time
+
+    def reset(self) -> None:
+        with self.lock:
+            self.functions = {}
+            self.substations = {}
+            self.folded = {}
+
+    def to_dict(self) -> dict:
+        # Times are in seconds, total_time includes the functions that were called
+        def function_stats(stats:dict) -> dict:
+            return {name: {'calls': calls, 'total_time': total_time, 'self_time': self_time, 'objects': objects}
+                    for name, (calls, total_time, self_time, objects) in
+                    sorted(stats.items(), key=lambda item: -item[1][2])}
+        return {'functions': function_stats(self.functions),
+                'substations': {str(substation): function_stats(stats)
+                                for substation, stats in self.substations.items() if substation is not None}}
+
+    def write_json(self, filename:str) -> None:
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def write_folded(self, filename:str) -> None:
+        # Folded stacks with self time in microseconds, as read by flamegraph.pl and speedscope
+        with open(filename, 'w', encoding='utf-8') as f:
+            for path, self_time in sorted(self.folded.items()):
+                f.write(f'{path} {int(self_time*1e6)}\n')
+
+    def report(self, top:int=20, stream=sys.stdout) -> None:
+        print(f'{"function":<60}{"calls":>10}{"total s":>10}{"self s":>10}{"objects":>10}', file=stream)
+        for name, stats in list(self.to_dict()['functions'].items())[:top]:
+            print(f'{name[:59]:<60}{stats["calls"]:>10}{stats["total_time"]:>10.3f}'
+                  f'{stats["self_time"]:>10.3f}{stats["objects"]:>10}', file=stream)
+
+def _can_wrap(function:callable) -> bool:
+    # Generators and coroutines would only be timed until they are created
+    return not (inspect.isgeneratorfunction(function) or inspect.iscoroutinefunction(function)
+                or inspect.isasyncgenfunction(function))
+
+def _get_network(args:tuple) -> GraphModel:
+    if not args:
+        return None
+    if isinstance(args[0], GraphModel):
+        return args[0]
+    network = getattr(args[0], 'network', None)
+    if isinstance(network, GraphModel):
+        return network
+    return None
+
+def _count_objects(network:GraphModel) -> int:
+    if network is None:
+        return 0
+    return sum(len(objects) for objects in list(network.graph.values()))
+
+def _get_substation(args:tuple, kwargs:dict) -> str:
+    # Substation builders are identified by their name, other functions by a substation argument
+    if args and hasattr(args[0].__class__, 'new_feeder'):
+        return getattr(args[0], 'name', None)
+    substation = kwargs.get('substation')
+    if substation is not None:
+        return getattr(substation, 'name', None)
+    return None
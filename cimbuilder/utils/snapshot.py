@@ -0,0 +1,375 @@
+from __future__ import annotations
+import enum
+import importlib
+import json
+import logging
+import mmap
+import struct
+import sys
+from array import array
+
+from cimgraph import GraphModel
+from cimgraph.models import DistributedArea
+from cimgraph.databases import ConnectionInterface
+
+from cimbuilder.utils.cim_profile import get_cim_profile
+
+_log = logging.getLogger(__name__)
+
+# File layout: MAGIC, version and header length as little-endian uint32, JSON header,
+# padding to 8 bytes, then the data section. The header describes each column of the
+# data section by offset and size, so columns can be read in place from a memory map.
+MAGIC = b'CIMBSNAP'
+SNAPSHOT_VERSION = 1
+
+# Index used for None in reference, string, and enum columns
+_NONE = -1
+
+class _SnapshotWriter():
+    """
+    Collects the columns of a snapshot. Objects are numbered class by class in graph
+    order, followed by objects outside the network that are linked from it.
+    """
+
+    def __init__(self):
+        self.data = bytearray()
+        self.strings = {}
+        self.index = {}
+        self.externals = []
+
+    def add_column(self, values:array) -> dict:
+        # Columns start at 8-byte offsets so that they can be cast in place
+        self.data.extend(b'\0' * (-len(self.data) % 8))
+        offset = len(self.data)
+        self.data.extend(values.tobytes())
+        return {'typecode': values.typecode, 'offset': offset, 'size': len(self.data) - offset}
+
+    def string(self, text:str) -> int:
+        position = self.strings.get(text)
+        if position is None:
+            if '\0' in text:
+                raise ValueError(f'Strings with null characters cannot be saved in a snapshot: {text!r}')
+            position = len(self.strings)
+            self.strings[text] = position
+        return position
+
+    def ref(self, obj:object) -> int:
+        position = self.index.get(id(obj))
+        if position is None:
+            position = len(self.index)
+            self.index[id(obj)] = position
+            self.externals.append(obj)
+        return position
+
+    def encode(self, values:list) -> dict:
+        # Choose a column type from the types of the values that are not None
+        types = {value.__class__ for value in values if value is not None}
+        if types == {str}:
+            string = self.string
+            return {'kind': 'str', 'values': self.add_column(array('i', [_NONE if value is None else string(value)
+                                                                        for value in values]))}
+        if types == {bool}:
+            return {'kind': 'bool', 'values': self.add_column(array('b', [_NONE if value is None else int(value)
+                                                                         for value in values]))}
+        if types == {int} or types == {float}:
+            kind, typecode = ('int', 'q') if types == {int} else ('float', 'd')
+            column = {'kind': kind, 'values': self.add_column(array(typecode, [0 if value is None else value
+                                                                              for value in values]))}
+            if None in values:
+                column['mask'] = self.add_column(array('b', [value is not None for value in values]))
+            return column
+        if len(types) == 1 and isinstance(next(iter(types)), enum.EnumMeta):
+            string = self.string
+            return {'kind': 'enum', 'enum': next(iter(types)).__name__,
+                    'values': self.add_column(array('i', [_NONE if value is None else string(value.name)
+                                                          for value in values]))}
+        if all(hasattr(value_type, '__dataclass_fields__') for value_type in types):
+            ref = self.ref
+            return {'kind': 'ref', 'values': self.add_column(array('i', [_NONE if value is None else ref(value)
+                                                                        for value in values]))}
+        if types == {list} and all(hasattr(item, '__dataclass_fields__') for value in values if value for item in value):
+            ref = self.ref
+            offsets = array('I', [0])
+            targets = array('i')
+            for value in values:
+                if value:
+                    targets.extend([ref(item) for item in value])
+                offsets.append(len(targets))
+            return {'kind': 'list', 'offsets': self.add_column(offsets), 'values': self.add_column(targets)}
+        # Other values, such as mixed numbers or strings and enums, are kept as JSON text
+        encode_value = self.encode_value
+        text = json.dumps([encode_value(value) for value in values])
+        return {'kind': 'json', 'values': self.add_column(array('i', [self.string(text)]))}
+
+    def encode_value(self, value:object) -> object:
+        # JSON form of a single value. Strings, numbers, and booleans are kept as they are,
+        # while enums, objects, lists, and dictionaries are tagged with a one-key dictionary.
+        if value is None or value.__class__ in (str, int, float, bool):
+            return value
+        if isinstance(value.__class__, enum.EnumMeta):
+            return {'enum': [value.__class__.__name__, value.name]}
+        if hasattr(value, '__dataclass_fields__'):
+            return {'ref': self.ref(value)}
+        if value.__class__ == list:
+            return {'list': [self.encode_value(item) for item in value]}
+        if value.__class__ == dict and all(key.__class__ == str for key in value):
+            return {'dict': {key: self.encode_value(item) for key, item in value.items()}}
+        raise ValueError(f'Values of type {value.__class__.__name__} cannot be saved in a snapshot')
+
+def save_snapshot(filename:str, network:GraphModel, builder:object=None) -> int:
+    # Write all objects of a network to a binary snapshot. If a substation builder is given,
+    # its attributes, such as substation, bus nodes, and base_voltage, are saved with it.
+    # Returns the number of objects.
+    writer = _SnapshotWriter()
+    classes = []
+    for cim_class, class_objects in network.graph.items():
+        for obj in class_objects.values():
+            writer.index.setdefault(id(obj), len(writer.index))
+    for cim_class, class_objects in network.graph.items():
+        objects = list(class_objects.values())
+        attributes = {}
+        for position, obj in enumerate(objects):
+            for attribute, value in obj.__dict__.items():
+                if value is None or attribute == 'mRID' or (value.__class__ == list and not value):
+                    continue
+                column = attributes.get(attribute)
+                if column is None:
+                    column = attributes[attribute] = [None] * len(objects)
+                column[position] = value
+        columns = {}
+        for attribute, values in attributes.items():
+            try:
+                columns[attribute] = writer.encode(values)
+            except ValueError as error:
+                raise ValueError(f'Could not save {cim_class.__name__}.{attribute}: {error}') from None
+        mrids = writer.add_column(array('i', [writer.string(obj.mRID) for obj in objects]))
+        classes.append({'class': cim_class.__name__, 'count': len(objects), 'mRID': mrids, 'columns': columns})
+
+    header = {'cim_profile': network.connection.connection_params.cim_profile, 'byteorder': sys.byteorder,
+              'objects': len(writer.index) - len(writer.externals), 'classes': classes,
+              'container': _encode_state(network.container, writer) if network.container is not None else None}
+    if builder is not None:
+        attributes = {}
+        for attribute, value in builder.__dict__.items():
+            if attribute in ('connection', 'network'):
+                continue
+            try:
+                attributes[attribute] = _encode_state(value, writer)
+            except ValueError as error:
+                raise ValueError(f'Could not save {builder.__class__.__name__}.{attribute}: {error}') from None
+        header['builder'] = {'class': f'{builder.__class__.__module__}.{builder.__class__.__qualname__}',
+                             'attributes': attributes}
+    # Objects outside the network are restored as placeholders with only an mRID
+    header['externals'] = {'class': writer.add_column(array('i', [writer.string(obj.__class__.__name__)
+                                                                  for obj in writer.externals])),
+                           'mRID': writer.add_column(array('i', [writer.string(obj.mRID) for obj in writer.externals]))}
+    # The string table is written last, once all strings are known
+    header['strings'] = writer.add_column(array('B', '\0'.join(writer.strings).encode('utf-8')))
+
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    header_bytes += b' ' * (-(len(MAGIC) + 8 + len(header_bytes)) % 8)
+    with open(filename, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<II', SNAPSHOT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(writer.data)
+    return header['objects']
+
+def _encode_state(value:object, writer:_SnapshotWriter) -> dict:
+    # Builder attributes are saved as object numbers or tagged JSON values
+    if hasattr(value, '__dataclass_fields__'):
+        return {'object': writer.ref(value)}
+    if value.__class__ == list and value and all(hasattr(item, '__dataclass_fields__') for item in value):
+        return {'objects': [writer.ref(item) for item in value]}
+    if value.__class__ == dict and value and all(hasattr(item, '__dataclass_fields__') for item in value.values()):
+        return {'object_map': {key: writer.ref(item) for key, item in value.items()}}
+    if value.__class__.__name__ == 'module':
+        return {'cim_profile': True}
+    return {'value': writer.encode_value(value)}
+
+class _SnapshotReader():
+    # Reads the columns of a snapshot from bytes or a memory map
+    def __init__(self, buffer:bytes|mmap.mmap):
+        view = memoryview(buffer)
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            raise ValueError('Not a CIM-Builder snapshot')
+        version, header_size = struct.unpack_from('<II', view, len(MAGIC))
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f'Snapshot version {version} is not supported, expected {SNAPSHOT_VERSION}')
+        start = len(MAGIC) + 8
+        self.header = json.loads(bytes(view[start:start + header_size]))
+        self.view = view
+        self.data_offset = start + header_size
+        self.swap = self.header['byteorder'] != sys.byteorder
+
+    def column(self, column:dict) -> list:
+        start = self.data_offset + column['offset']
+        data = self.view[start:start + column['size']]
+        try:
+            if self.swap:
+                values = array(column['typecode'], data.tobytes())
+                values.byteswap()
+                return values.tolist()
+            return data.cast(column['typecode']).tolist()
+        finally:
+            data.release()
+
+    def strings(self) -> list[str]:
+        column = self.header['strings']
+        start = self.data_offset + column['offset']
+        return str(self.view[start:start + column['size']], 'utf-8').split('\0')
+
+    def release(self) -> None:
+        self.view.release()
+
+def load_snapshot(filename:str, connection:ConnectionInterface, use_mmap:bool=False) -> GraphModel:
+    # Read a snapshot into a new network. With use_mmap, columns are read in place from a
+    # memory map of the file instead of being copied into memory first.
+    network, _ = _read_objects(filename, connection, use_mmap)
+    return network
+
+def load_builder(filename:str, connection:ConnectionInterface, use_mmap:bool=False) -> object:
+    # Read a snapshot saved with a builder and return the restored builder, so that
+    # new_feeder and new_branch can be called on the reloaded substation
+    network, (header, objects) = _read_objects(filename, connection, use_mmap)
+    state = header.get('builder')
+    if state is None:
+        raise ValueError(f'Snapshot {filename} was saved without a builder')
+    module_name, class_name = state['class'].rsplit('.', 1)
+    builder_class = getattr(importlib.import_module(module_name), class_name)
+    builder = builder_class.__new__(builder_class)
+    attributes = {attribute: _decode_state(value, objects, network) for attribute, value in state['attributes'].items()}
+    attributes.update(connection=connection, network=network)
+    builder.__dict__.update(attributes)
+    return builder
+
+def _decode_state(value:dict, objects:list[object], network:GraphModel) -> object:
+    if 'object' in value:
+        return objects[value['object']]
+    if 'objects' in value:
+        return [objects[position] for position in value['objects']]
+    if 'object_map' in value:
+        return {key: objects[position] for key, position in value['object_map'].items()}
+    if 'cim_profile' in value:
+        return get_cim_profile(network.connection)
+    return _decode_value(value['value'], objects, get_cim_profile(network.connection))
+
+def _decode_value(value:object, objects:list[object], cim:object) -> object:
+    # Inverse of _SnapshotWriter.encode_value
+    if value.__class__ != dict:
+        return value
+    if 'ref' in value:
+        return objects[value['ref']]
+    if 'enum' in value:
+        enum_name, name = value['enum']
+        return getattr(cim, enum_name)[name]
+    if 'list' in value:
+        return [_decode_value(item, objects, cim) for item in value['list']]
+    return {key: _decode_value(item, objects, cim) for key, item in value['dict'].items()}
+
+def _read_objects(filename:str, connection:ConnectionInterface, use_mmap:bool) -> tuple[GraphModel, tuple[dict, list[object]]]:
+    with open(filename, 'rb') as f:
+        if use_mmap:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            buffer = f.read()
+    reader = _SnapshotReader(buffer)
+    try:
+        header = reader.header
+        cim = get_cim_profile(connection)
+        if header['cim_profile'] != connection.connection_params.cim_profile:
+            _log.warning(f'Snapshot {filename} was saved with {header["cim_profile"]}, '
+                         f'loading with {connection.connection_params.cim_profile}')
+        strings = reader.strings()
+        objects = []
+        class_values = []
+        for class_header in header['classes']:
+            cim_class = getattr(cim, class_header['class'])
+            start = len(objects)
+            values = _new_objects(cim_class, [strings[position] for position in reader.column(class_header['mRID'])],
+                                  objects)
+            class_values.append((cim_class, start, values))
+        external_classes = reader.column(header['externals']['class'])
+        external_mrids = reader.column(header['externals']['mRID'])
+        for class_position, mrid_position in zip(external_classes, external_mrids):
+            _new_objects(getattr(cim, strings[class_position]), [strings[mrid_position]], objects)
+
+        for class_header, (cim_class, _, values) in zip(header['classes'], class_values):
+            for attribute, column in class_header['columns'].items():
+                _fill_column(reader, attribute, column, values, objects, strings, cim)
+    finally:
+        reader.release()
+        if use_mmap:
+            buffer.close()
+
+    container = header.get('container')
+    network = DistributedArea(connection=connection, container=objects[container['object']] if container else None,
+                              distributed=False)
+    for cim_class, start, values in class_values:
+        class_objects = network.graph.setdefault(cim_class, {})
+        for obj in objects[start:start + len(values)]:
+            class_objects[obj.mRID] = obj
+    return network, (header, objects)
+
+def _new_objects(cim_class:type, mrids:list[str], objects:list[object]) -> list[dict]:
+    # Create objects with default attributes and return their attribute dictionaries
+    defaults = {}
+    list_fields = []
+    for attribute, field in cim_class.__dataclass_fields__.items():
+        if field.default_factory is list:
+            list_fields.append(attribute)
+        else:
+            defaults[attribute] = None
+    values = []
+    for mRID in mrids:
+        obj_values = defaults.copy()
+        for attribute in list_fields:
+            obj_values[attribute] = []
+        obj_values['mRID'] = mRID
+        obj = cim_class.__new__(cim_class)
+        obj.__dict__ = obj_values
+        objects.append(obj)
+        values.append(obj_values)
+    return values
+
+def _fill_column(reader:_SnapshotReader, attribute:str, column:dict, values:list[dict], objects:list[object],
+                 strings:list[str], cim:object) -> None:
+    kind = column['kind']
+    if kind == 'list':
+        offsets = reader.column(column['offsets'])
+        targets = reader.column(column['values'])
+        for position, obj_values in enumerate(values):
+            start = offsets[position]
+            end = offsets[position + 1]
+            if start != end:
+                obj_values[attribute] = [objects[target] for target in targets[start:end]]
+        return
+    if kind == 'json':
+        column_values = json.loads(strings[reader.column(column['values'])[0]])
+        for obj_values, value in zip(values, column_values):
+            if value is not None:
+                obj_values[attribute] = _decode_value(value, objects, cim)
+        return
+
+    column_values = reader.column(column['values'])
+    if kind == 'ref':
+        lookup = objects
+    elif kind == 'str':
+        lookup = strings
+    elif kind == 'enum':
+        enum_class = getattr(cim, column['enum'])
+        lookup = {position: enum_class[strings[position]] for position in set(column_values) if position != _NONE}
+    elif kind == 'bool':
+        lookup = [False, True]
+    else:
+        if 'mask' in column:
+            for obj_values, value, present in zip(values, column_values, reader.column(column['mask'])):
+                if present:
+                    obj_values[attribute] = value
+        else:
+            for obj_values, value in zip(values, column_values):
+                obj_values[attribute] = value
+        return
+    for obj_values, position in zip(values, column_values):
+        if position != _NONE:
+            obj_values[attribute] = lookup[position]
@@ -0,0 +1,87 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+import logging
+
+from cimgraph import GraphModel
+if TYPE_CHECKING:
+    import cimgraph.data_profile.cimhub_2023 as cim #TODO: cleaner typing import
+
+from cimbuilder.utils.cim_profile import get_cim_profile
+
+_log = logging.getLogger(__name__)
+
+class SourceBusCache():
+    """
+    Finds the source bus of a feeder network by expanding only the Feeder and the
+    EnergySource -> Terminal -> ConnectivityNode chain instead of every Terminal
+    and ConnectivityNode in the feeder. Expanded objects and resolved source buses
+    are cached, so attaching the same feeder network again does not query the database.
+    """
+
+    def __init__(self, network:GraphModel):
+        self.network = network
+        self.cim = get_cim_profile(network.connection)
+        self.expanded = set()
+        self.sourcebuses = {}
+
+    def expand(self, cim_class:type, objects:list[object]) -> None:
+        # Get edges of the given objects only. The query runs against a shallow copy of
+        # the graph so that edges link to the objects that are already in the network.
+        objects = [obj for obj in objects if obj.mRID not in self.expanded]
+        if not objects:
+            return
+        graph = dict(self.network.graph)
+        graph[cim_class] = {obj.mRID: obj for obj in objects}
+        self.network.get_all_edges(cim_class, graph)
+
+        for class_type, class_objects in graph.items():
+            if class_type not in self.network.graph:
+                self.network.graph[class_type] = class_objects
+            elif class_type == cim_class:
+                network_objects = self.network.graph[class_type]
+                for mRID, obj in class_objects.items():
+                    network_objects.setdefault(mRID, obj)
+        self.expanded.update(obj.mRID for obj in objects)
+
+    def expand_feeders(self) -> None:
+        self.expand(self.cim.Feeder, list(self.network.graph.get(self.cim.Feeder, {}).values()))
+
+    def get(self, feeder:cim.Feeder, name:str='sourcebus') -> cim.ConnectivityNode:
+        sourcebus = self.sourcebuses.get(name)
+        if sourcebus is not None and sourcebus.name == name:
+            return sourcebus
+
+        sources = list(self.network.graph.get(self.cim.EnergySource, {}).values())
+        self.expand(self.cim.EnergySource, sources)
+        terminals = [source.Terminals[0] for source in sources if source.Terminals]
+        self.expand(self.cim.Terminal, terminals)
+        nodes = [terminal.ConnectivityNode for terminal in terminals if terminal.ConnectivityNode is not None]
+        self.expand(self.cim.ConnectivityNode, nodes)
+        # Feeders found through the source bus container are expanded with the others
+        self.expand_feeders()
+
+        matches = [node for node in nodes if node.name == name]
+        if not matches:
+            _log.error(f'Could not find {name} for {feeder.name}')
+            return None
+        if len(matches) > 1:
+            _log.warning(f'Found {len(matches)} EnergySources at a node named {name}. Using {matches[0].mRID}')
+        self.sourcebuses[name] = matches[0]
+        return matches[0]
+
+def get_sourcebus_cache(network:GraphModel) -> SourceBusCache:
+    cache = getattr(network, '_sourcebus_cache', None)
+    if cache is None:
+        cache = SourceBusCache(network)
+        network._sourcebus_cache = cache
+    return cache
+
+def get_sourcebus(feeder_network:GraphModel, feeder:cim.Feeder,
+                  sourcebus:cim.ConnectivityNode=None) -> cim.ConnectivityNode:
+    # Get the edges of the feeder and, if sourcebus is not specified, look for the
+    # EnergySource node named sourcebus
+    cache = get_sourcebus_cache(feeder_network)
+    if sourcebus:
+        cache.expand_feeders()
+        return sourcebus
+    return cache.get(feeder)
@@ -0,0 +1,156 @@
+from __future__ import annotations
+import enum
+import logging
+
+from cimgraph import GraphModel
+from cimgraph.databases import ConnectionInterface
+from cimgraph.data_profile.known_problem_classes import ClassesWithManytoMany
+from cimgraph.models.graph_model import json_dump
+
+_log = logging.getLogger(__name__)
+
+class StreamingXMLWriter():
+    """
+    Writes CIM RDF/XML incrementally in the same format as cimgraph.utils.write_xml.
+    Objects are written when write_object or write_network is called, so finished
+    substations and feeders can be released while the rest of the model is built.
+    """
+
+    def __init__(self, filename:str, connection:ConnectionInterface):
+        self.filename = filename
+        self.namespace = connection.namespace
+        self.iec61970_301 = connection.iec61970_301
+        self.cim = connection.cim
+        self.written = set()
+        self.serializers = {}
+        self.file = None
+
+        if int(self.iec61970_301) > 7:
+            self.rdf_header = """rdf:about="urn:uuid:"""
+            self.rdf_resource = """urn:uuid:"""
+        else:
+            self.rdf_header = """rdf:ID=\""""
+            self.rdf_resource = """#"""
+
+    def __enter__(self) -> StreamingXMLWriter:
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def open(self) -> None:
+        self.file = open(self.filename, 'w', encoding='utf-8')
+        self.file.write(f"""<?xml version="1.0" encoding="utf-8"?>
+<!-- un-comment this line to enable validation
+-->
+<rdf:RDF xmlns:cim="{self.namespace}" xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">
+<!--
+-->""")
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.write("""
+</rdf:RDF>""")
+            self.file.close()
+            self.file = None
+
+    def write_network(self, network:GraphModel|dict[type, dict[str, object]], evict:bool=False) -> int:
+        # Write all objects in a network or graph dictionary that were not written yet.
+        # If evict is True, the graph is cleared afterwards to release the objects.
+        graph = network if network.__class__ == dict else network.graph
+        counter = 0
+        for cim_class in list(graph.keys()):
+            for obj in graph[cim_class].values():
+                counter = counter + self.write_object(obj)
+        if evict:
+            graph.clear()
+        return counter
+
+    def write_objects(self, objects:list[object]) -> int:
+        counter = 0
+        for obj in objects:
+            counter = counter + self.write_object(obj)
+        return counter
+
+    def write_object(self, obj:object) -> int:
+        # Each object is written only once, even if it is shared by several networks
+        if obj.mRID in self.written:
+            return 0
+        self.written.add(obj.mRID)
+        self.file.write(self.serialize(obj))
+        return 1
+
+    def write_fragment(self, text:str) -> None:
+        # Write objects that were already serialized, such as cached fragments of a model
+        self.file.write(text)
+
+    def serialize(self, obj:object) -> str:
+        cim_class = obj.__class__
+        serializer = self.serializers.get(cim_class)
+        if serializer is None:
+            serializer = self.get_serializer(cim_class)
+            self.serializers[cim_class] = serializer
+
+        text = [f"""
+<cim:{cim_class.__name__} {self.rdf_header}{obj.mRID}">"""]
+        for tag, attribute, many_to_many, association in serializer:
+            attr_obj = getattr(obj, attribute)
+            if many_to_many:
+                if not attr_obj:
+                    continue
+                attr_obj = attr_obj[0]
+            if association:
+                if attr_obj is not None:
+                    if type(type(attr_obj)) is not enum.EnumMeta:
+                        value = """rdf:resource=\"""" + self.rdf_resource + attr_obj.mRID
+                    else:
+                        value = """rdf:resource=\"""" + self.namespace + str(attr_obj)
+                    text.append(f"""
+  <cim:{tag} {value}"/>""")
+            else:
+                value = json_dump(attr_obj, self.cim)
+                if value:
+                    text.append(f"""
+  <cim:{tag}>{value}</cim:{tag}>""")
+        text.append(f"""
+</cim:{cim_class.__name__}>""")
+        return ''.join(text)
+
+    def get_serializer(self, cim_class:type) -> list[tuple]:
+        return get_serializer(cim_class, self.cim)
+
+# Serializers of each CIM class, shared by the writers and Changeset
+_serializers = {}
+
+def get_serializer(cim_class:type, cim:object) -> list[tuple]:
+    # Returns (tag, attribute, many_to_many, association) for each attribute that is written.
+    # Attribute order and selection follow cimgraph.utils.write_xml
+    serializer = _serializers.get(cim_class)
+    if serializer is not None:
+        return serializer
+    problem_attributes = ClassesWithManytoMany().attributes
+    serializer = []
+    parent_classes = list(cim_class.__mro__)
+    parent_classes.pop(len(parent_classes) - 1)
+    for pclass in parent_classes:
+        for attribute in pclass.__annotations__.keys():
+            if attribute not in cim_class.__dataclass_fields__:
+                _log.warning(f'attribute {attribute} missing from {cim_class.__name__}')
+                continue
+            attribute_type = cim_class.__dataclass_fields__[attribute].type
+            if '\'' in attribute_type: # handling inconsistent ''marks in data profile
+                attribute_class = attribute_type.split('\'')[1]
+            else:
+                attribute_class = attribute_type.split('[')[1].split(']')[0]
+
+            if 'List' not in attribute_type: # don't write one-to-many
+                many_to_many = False
+            elif f'{pclass.__name__}.{attribute}' in problem_attributes or f'{cim_class.__name__}.{attribute}' in problem_attributes:
+                many_to_many = True # write select many-to-many
+            else:
+                continue
+            association = attribute_class in cim.__all__
+            serializer.append((f'{pclass.__name__}.{attribute}', attribute, many_to_many, association))
+    _serializers[cim_class] = serializer
+    return serializer
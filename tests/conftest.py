@@ -0,0 +1,95 @@
+import inspect
+import os
+
+import pytest
+
+from cimgraph.databases import ConnectionParameters, RDFlibConnection
+
+from cimbuilder.substation_builder import (SingleBusSubstation, SectionalizedBusSubstation, RingBusSubstation,
+                                           MainAndTransferSubstation, DoubleBusSingleBreakerSubstation,
+                                           BreakerAndHalfSubstation, SubstationSpec, get_feeder_replicator)
+import cimbuilder.utils as utils
+
+TEST_MODELS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_models')
+IEEE13_FILE = os.path.join(TEST_MODELS, 'IEEE13.xml')
+IEEE13_MRID = '49AD8E07-3BF9-A4E2-CB8F-C3722F837B62'
+
+# Each builder with its parameters, the positions of adjacent branches, and the positions
+# of feeders next to and sharing a bus with the branches
+SUBSTATION_CASES = [
+    (SingleBusSubstation, {}, [1, 2], [3]),
+    (SectionalizedBusSubstation, {'total_sections': 3}, [1, 2], [2, 3]),
+    (RingBusSubstation, {'total_sections': 4}, [1, 2], [2, 3]),
+    (MainAndTransferSubstation, {}, [1, 2], [3]),
+    (DoubleBusSingleBreakerSubstation, {}, [1, 2], [3]),
+    (BreakerAndHalfSubstation, {'total_bus_ties': 2},
+     [dict(branch_number=1, tie_number=0), dict(branch_number=2, tie_number=0)],
+     [dict(branch_number=3, tie_number=1)]),
+]
+
+
+@pytest.fixture(scope='session')
+def connection():
+    # Creating a connection loads the CIM profile, so all tests share one
+    params = ConnectionParameters(filename=None, cim_profile='cimhub_2023', iec61970_301=8)
+    return RDFlibConnection(params)
+
+
+@pytest.fixture(params=SUBSTATION_CASES, ids=[case[0].__name__ for case in SUBSTATION_CASES])
+def substation_case(request):
+    return request.param
+
+
+def position_kwargs(builder_class:type, position:int|dict) -> dict:
+    # Keyword arguments of new_branch and new_feeder for a position of a substation case
+    if position.__class__ == dict:
+        return position
+    return {list(inspect.signature(builder_class.new_feeder).parameters)[1]: position}
+
+
+def case_spec(case:tuple, name:str='sub', base_voltage:float=115000) -> SubstationSpec:
+    # SubstationSpec of a substation case with IEEE 13 replicas on its feeders
+    builder_class, params, branches, feeders = case
+    feeder_specs = []
+    for position in feeders:
+        kwargs = position_kwargs(builder_class, position)
+        feeder_specs.append(dict(kwargs, filename=IEEE13_FILE, mrid=IEEE13_MRID,
+                                 replica=f'{name}_feeder_{"_".join(map(str, kwargs.values()))}'))
+    return SubstationSpec(topology=builder_class.__name__, name=name, base_voltage=base_voltage, parameters=params,
+                          branches=[position_kwargs(builder_class, position) for position in branches],
+                          feeders=feeder_specs)
+
+
+def new_line(network:object, name:str, base_voltage:object=None) -> tuple[object, object]:
+    # A line with one terminal to connect to a substation branch
+    cim = utils.get_cim_profile(network.connection)
+    line = cim.ACLineSegment(name=name, mRID=utils.new_mrid(name), BaseVoltage=base_voltage)
+    terminal = cim.Terminal(name=f'{name}_t1', mRID=utils.new_mrid(f'{name}_t1'), ConductingEquipment=line)
+    line.Terminals.append(terminal)
+    network.add_to_graph(line)
+    network.add_to_graph(terminal)
+    if base_voltage is not None:
+        base_voltage.ConductingEquipment.append(line)
+    return line, terminal
+
+
+def build_case(case:tuple, connection:object, name:str='sub', network:object=None) -> object:
+    # Build a substation case with lines on its branches and IEEE 13 copies on its feeders
+    builder_class, params, branches, feeders = case
+    builder = builder_class(connection=connection, network=network, name=name, **params)
+    return extend_case(case, builder, name)
+
+
+def extend_case(case:tuple, builder:object, name:str='sub') -> object:
+    # Add the branches and feeders of a substation case to a builder
+    builder_class, params, branches, feeders = case
+    for position in branches:
+        kwargs = position_kwargs(builder_class, position)
+        line, terminal = new_line(builder.network, f'{name}_line_{"_".join(map(str, kwargs.values()))}',
+                                  builder.base_voltage)
+        builder.new_branch(branch_equipment=line, branch_terminal=terminal, **kwargs)
+    replicator = get_feeder_replicator(IEEE13_FILE, IEEE13_MRID)
+    for position in feeders:
+        kwargs = position_kwargs(builder_class, position)
+        replicator.attach(builder, f'{name}_feeder_{"_".join(map(str, kwargs.values()))}', **kwargs)
+    return builder
@@ -0,0 +1,100 @@
+import pytest
+
+from cimbuilder.analysis import validate_network
+from cimbuilder.substation_builder import SingleBusSubstation
+from cimbuilder.substation_builder.aggregate_feeder import new_aggregate_feeder, new_aggregate_feeders
+import cimbuilder.utils as utils
+
+FEEDERS = {'feeder_name': ['agg1', 'agg2', 'agg3'],
+           'breaker_name': ['agg1_cb', '', float('nan')],
+           'node': ['sub_main_bus', None, float('nan')],
+           'base_voltage': [12470, '', 13200],
+           'total_load_kw': [100, '', float('nan')],
+           'total_load_kvar': [50, 0, 0],
+           'total_btm_pv_kw': [10, 20, ''],
+           'total_ftm_wind_kw': [0, 5, 0]}
+
+
+def get_objects(network, class_name):
+    cim = utils.get_cim_profile(network.connection)
+    return {obj.name: obj for obj in network.graph.get(getattr(cim, class_name), {}).values()}
+
+
+def test_columns_with_missing_cells(connection):
+    builder = SingleBusSubstation(connection=connection, name='sub')
+    feeders = new_aggregate_feeders(builder.network, FEEDERS, substation='sub', node=builder.main_bus,
+                                    base_voltage=builder.base_voltage)
+    assert [feeder.name for feeder in feeders] == FEEDERS['feeder_name']
+    assert all(feeder.NormalEnergizingSubstation is builder.substation for feeder in feeders)
+
+    # Empty and NaN cells use the arguments and column defaults
+    breakers = get_objects(builder.network, 'Breaker')
+    assert {'agg1_cb', 'agg2_breaker', 'agg3_breaker'} <= set(breakers)
+    for breaker in ('agg1_cb', 'agg2_breaker', 'agg3_breaker'):
+        assert breakers[breaker].Terminals[0].ConnectivityNode is builder.main_bus
+        assert any(terminal is breakers[breaker].Terminals[0] for terminal in builder.main_bus.Terminals)
+    assert breakers['agg1_cb'].BaseVoltage.nominalVoltage == 12470
+    assert breakers['agg2_breaker'].BaseVoltage is builder.base_voltage
+    assert breakers['agg3_breaker'].BaseVoltage.nominalVoltage == 13200
+
+    loads = get_objects(builder.network, 'EnergyConsumer')
+    assert (loads['agg1_aggr_load'].p, loads['agg1_aggr_load'].q) == (100000, 50000)
+    assert loads['agg2_aggr_load'].p == loads['agg3_aggr_load'].p == 0
+    inverters = get_objects(builder.network, 'PowerElectronicsConnection')
+    assert inverters['agg2_aggr_btm_pv'].p == 20000
+    assert inverters['agg2_aggr_ftm_pv'].p == 5000
+    assert set(get_objects(builder.network, 'PowerElectronicsWindUnit')) == {'agg2_aggr_ftm_wind'}
+    assert validate_network(builder.network).ok
+
+
+def test_csv_matches_columns(connection, tmp_path):
+    filename = tmp_path / 'feeders.csv'
+    rows = [','.join(FEEDERS)]
+    for row in range(len(FEEDERS['feeder_name'])):
+        values = [FEEDERS[column][row] for column in FEEDERS]
+        rows.append(','.join('' if value is None or value != value else str(value) for value in values))
+    filename.write_text('\n'.join(rows) + '\n')
+
+    networks = []
+    for feeders in (FEEDERS, str(filename)):
+        builder = SingleBusSubstation(connection=connection, name='sub')
+        new_aggregate_feeders(builder.network, feeders, substation=builder.substation, node=builder.main_bus,
+                              base_voltage=builder.base_voltage)
+        networks.append(builder.network)
+    for class_name in ('Breaker', 'EnergyConsumer', 'PowerElectronicsConnection', 'Analog', 'Discrete'):
+        objects = [get_objects(network, class_name) for network in networks]
+        assert set(objects[0]) == set(objects[1])
+        for name, obj in objects[0].items():
+            assert getattr(obj, 'p', None) == getattr(objects[1][name], 'p', None)
+
+
+def test_single_feeder_matches_table(connection):
+    networks = []
+    for single in (True, False):
+        builder = SingleBusSubstation(connection=connection, name='sub')
+        if single:
+            new_aggregate_feeder(builder.network, 'agg1', 'agg1_cb', builder.substation, 'sub_main_bus',
+                                 builder.base_voltage, total_load_kw=100, total_btm_pv_kw=10)
+        else:
+            new_aggregate_feeders(builder.network, {'feeder_name': ['agg1'], 'breaker_name': ['agg1_cb'],
+                                                    'total_load_kw': [100], 'total_btm_pv_kw': [10]},
+                                  substation=builder.substation, node='sub_main_bus', base_voltage=builder.base_voltage)
+        networks.append({cim_class: len(objects) for cim_class, objects in builder.network.graph.items()})
+    assert networks[0] == networks[1]
+
+
+def test_unknown_node_is_rejected(connection):
+    builder = SingleBusSubstation(connection=connection, name='sub')
+    before = {cim_class: len(objects) for cim_class, objects in builder.network.graph.items()}
+    with pytest.raises(ValueError, match='missing_bus'):
+        new_aggregate_feeders(builder.network, {'feeder_name': ['agg1', 'agg2'], 'node': ['sub_main_bus', 'missing_bus']},
+                              substation=builder.substation, base_voltage=builder.base_voltage)
+    # No feeder is built when a node is missing
+    assert {cim_class: len(objects) for cim_class, objects in builder.network.graph.items()} == before
+
+
+def test_column_length_is_checked(connection):
+    builder = SingleBusSubstation(connection=connection, name='sub')
+    with pytest.raises(ValueError, match='total_load_kw'):
+        new_aggregate_feeders(builder.network, {'feeder_name': ['agg1', 'agg2'], 'total_load_kw': [1]},
+                              substation=builder.substation, node=builder.main_bus)
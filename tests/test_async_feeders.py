@@ -0,0 +1,67 @@
+import os
+import threading
+import time
+
+from cimgraph.databases import ConnectionParameters, RDFlibConnection
+from cimgraph.models import FeederModel
+
+from cimbuilder.substation_builder import SingleBusSubstation, new_feeders
+import cimbuilder.utils as utils
+
+IEEE13_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_models', 'IEEE13.xml')
+IEEE13_MRID = '49AD8E07-3BF9-A4E2-CB8F-C3722F837B62'
+LATENCY = 0.1
+
+
+class SlowConnection(RDFlibConnection):
+    # Adds a fixed latency to every query and records how many queries run at the same time
+    lock = threading.Lock()
+    active = 0
+    max_active = 0
+
+    def query(self, function:callable, *args) -> object:
+        with SlowConnection.lock:
+            SlowConnection.active += 1
+            SlowConnection.max_active = max(SlowConnection.max_active, SlowConnection.active)
+        try:
+            time.sleep(LATENCY)
+            return function(*args)
+        finally:
+            with SlowConnection.lock:
+                SlowConnection.active -= 1
+
+    def get_all_edges(self, graph, cim_class):
+        return self.query(super().get_all_edges, graph, cim_class)
+
+    def get_all_attributes(self, graph, cim_class):
+        return self.query(super().get_all_attributes, graph, cim_class)
+
+
+def get_feeders(total:int) -> list[dict]:
+    feeders = []
+    for series_number in range(1, total + 1):
+        params = ConnectionParameters(filename=IEEE13_FILE, cim_profile='cimhub_2023', iec61970_301=8)
+        connection = SlowConnection(params)
+        feeder = utils.get_cim_profile(connection).Feeder(mRID=IEEE13_MRID)
+        feeder_network = FeederModel(connection=connection, container=feeder, distributed=False)
+        feeders.append({'feeder_network': feeder_network, 'feeder': feeder, 'series_number': series_number})
+    return feeders
+
+
+def test_new_feeders_overlaps_queries():
+    params = ConnectionParameters(filename=None, cim_profile='cimhub_2023', iec61970_301=8)
+    connection = RDFlibConnection(params)
+
+    serial = SingleBusSubstation(connection=connection, name='serial')
+    for feeder in get_feeders(3):
+        serial.new_feeder(**feeder)
+
+    feeders = get_feeders(3)
+    SlowConnection.max_active = 0
+    builder = SingleBusSubstation(connection=connection, name='concurrent')
+    sourcebuses = new_feeders(builder, feeders, concurrency=3)
+
+    assert SlowConnection.max_active > 1
+    assert [sourcebus.name for sourcebus in sourcebuses] == ['sourcebus']*3
+    assert (sorted((cim_class.__name__, len(objects)) for cim_class, objects in builder.network.graph.items()) ==
+            sorted((cim_class.__name__, len(objects)) for cim_class, objects in serial.network.graph.items()))
@@ -0,0 +1,79 @@
+import pytest
+
+from cimgraph.models import DistributedArea
+
+import cimbuilder.utils as utils
+
+
+@pytest.fixture
+def network(connection):
+    return DistributedArea(connection=connection, container=None, distributed=False)
+
+
+def new_base_voltage(network, name, nominal_voltage, mRID=None):
+    cim = utils.get_cim_profile(network.connection)
+    base_voltage = cim.BaseVoltage(name=name, mRID=mRID or utils.new_mrid(name), nominalVoltage=nominal_voltage)
+    network.add_to_graph(base_voltage)
+    return base_voltage
+
+
+def test_get_base_voltage_creates_once(network):
+    cim = utils.get_cim_profile(network.connection)
+    base_voltage = utils.get_base_voltage(network, 115000)
+    assert base_voltage.nominalVoltage == 115000
+    assert utils.get_base_voltage(network, 115000) is base_voltage
+    assert utils.get_base_voltage(network, 115) is base_voltage
+    assert utils.get_base_voltage(network, base_voltage) is base_voltage
+    assert list(network.graph[cim.BaseVoltage].values()) == [base_voltage]
+
+
+def test_lookup_in_volts_and_kilovolts(network):
+    low = new_base_voltage(network, 'low', 480)
+    high = new_base_voltage(network, 'high', 230)
+    volts = new_base_voltage(network, 'volts', 230000)
+    registry = utils.get_base_voltage_registry(network)
+    assert registry.get(0.48) is low
+    assert registry.get(480) is low
+    assert registry.get(230) is high
+    assert registry.get(230000) is volts
+    assert registry.get(69) is None
+
+
+def test_appended_base_voltages_are_indexed(network):
+    registry = utils.get_base_voltage_registry(network)
+    first = new_base_voltage(network, 'first', 115000)
+    assert registry.get(115000) is first
+    second = new_base_voltage(network, 'second', 69000)
+    assert registry.get(69000) is second
+    assert registry.get(115000) is first
+
+
+def test_replace_one_base_voltage(network):
+    cim = utils.get_cim_profile(network.connection)
+    registry = utils.get_base_voltage_registry(network)
+    high = new_base_voltage(network, 'high', 115000)
+    removed = new_base_voltage(network, 'removed', 69000)
+    assert registry.get(69000) is removed
+
+    # The number of BaseVoltages is the same after one is removed and another added
+    del network.graph[cim.BaseVoltage][removed.mRID]
+    added = new_base_voltage(network, 'added', 13200)
+    assert registry.get(69000) is None
+    assert registry.get(13200) is added
+    assert registry.get(115000) is high
+
+    created = utils.get_base_voltage(network, 69000)
+    assert created is not removed
+    assert registry.get(69000) is created
+
+
+def test_replace_base_voltage_with_same_mrid(network):
+    cim = utils.get_cim_profile(network.connection)
+    registry = utils.get_base_voltage_registry(network)
+    old = new_base_voltage(network, 'old', 69000, mRID='bv')
+    assert registry.get(69000) is old
+    new = cim.BaseVoltage(name='new', mRID='bv', nominalVoltage=69000)
+    network.graph[cim.BaseVoltage]['bv'] = new
+    assert registry.get(69000) is new
+    assert utils.get_base_voltage(network, 69000) is new
+    assert len(network.graph[cim.BaseVoltage]) == 1
@@ -0,0 +1,269 @@
+"""
+Benchmarks for the substation builders, aggregate feeders, and network lookups.
+
+Runs offline against an in-memory RDFlibConnection and tests/test_models/IEEE13.xml.
+Each benchmark reports the best time of several repeats, the rate in objects or calls
+per second, and the peak memory of one extra run traced with tracemalloc.
+
+Usage:
+    python tests/test_benchmarks/run_benchmarks.py --output benchmarks.json
+    python tests/test_benchmarks/run_benchmarks.py --baseline old.json --sizes 1 100
+"""
+import argparse
+import datetime
+import gc
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from importlib.metadata import version
+
+from cimgraph.databases import ConnectionParameters, RDFlibConnection
+from cimgraph.models import FeederModel
+import cimgraph.data_profile.cimhub_2023 as cim
+
+TESTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+
+from cimbuilder.substation_builder import (SingleBusSubstation, SectionalizedBusSubstation, RingBusSubstation,
+                                           MainAndTransferSubstation, DoubleBusSingleBreakerSubstation,
+                                           BreakerAndHalfSubstation)
+from cimbuilder.substation_builder.aggregate_feeder import new_aggregate_feeder, new_aggregate_feeders
+import cimbuilder.utils as utils
+
+CIM_PROFILE = 'cimhub_2023'
+IEEE13_FILE = os.path.join(TESTS_DIR, 'test_models', 'IEEE13.xml')
+IEEE13_MRID = '49AD8E07-3BF9-A4E2-CB8F-C3722F837B62'
+
+# Keyword arguments used to attach a feeder to each substation topology
+BUILDERS = {
+    SingleBusSubstation: {'series_number': 1},
+    SectionalizedBusSubstation: {'section_number': 1},
+    RingBusSubstation: {'bus_number': 1},
+    MainAndTransferSubstation: {'series_number': 1},
+    DoubleBusSingleBreakerSubstation: {'series_number': 1},
+    BreakerAndHalfSubstation: {'branch_number': 1, 'tie_number': 1}
+}
+
+TOTAL_LOOKUPS = 1000
+
+# Pause cyclic garbage collection during the timed runs, set by --pause-gc
+PAUSE_GC = False
+
+
+def count_objects(network) -> int:
+    return sum(len(objects) for objects in network.graph.values())
+
+
+def run_benchmark(name:str, setup, benchmark, repeat:int, unit:str='objects') -> dict:
+    # setup() returns the arguments of benchmark(), which returns the number of objects or calls
+    times = []
+    for _ in range(repeat):
+        args = setup()
+        gc.collect()
+        if PAUSE_GC:
+            gc.disable()
+        try:
+            start = time.perf_counter()
+            total = benchmark(*args)
+            times.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+        del args
+
+    args = setup()
+    gc.collect()
+    tracemalloc.start()
+    benchmark(*args)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del args
+
+    seconds = min(times)
+    result = {'name': name, 'unit': unit, 'total': total, 'repeat': repeat, 'seconds': seconds,
+              'mean_seconds': sum(times)/len(times), 'rate': total/seconds if seconds else None,
+              'peak_memory_bytes': peak_memory}
+    print(f"{name:<55} {total:>9} {unit:<8} {seconds*1000:>10.2f} ms {result['rate'] or 0:>12.0f}/s "
+          f"{peak_memory/2**20:>8.2f} MiB", flush=True)
+    return result
+
+
+def benchmark_substations(connection:RDFlibConnection, feeder_connection:RDFlibConnection, repeat:int) -> list[dict]:
+    results = []
+    for builder_class, feeder_args in BUILDERS.items():
+        def build(builder_class=builder_class):
+            builder = builder_class(connection=connection, name=builder_class.__name__)
+            return count_objects(builder.network)
+        results.append(run_benchmark(f'substation/{builder_class.__name__}', tuple, build, repeat))
+
+        # The IEEE13 model is loaded in setup so only the feeder attachment is timed with the builder
+        def setup_feeder():
+            feeder = cim.Feeder(mRID=IEEE13_MRID)
+            feeder_network = FeederModel(connection=feeder_connection, container=feeder, distributed=False)
+            return feeder, feeder_network
+
+        def build_with_feeder(feeder, feeder_network, builder_class=builder_class, feeder_args=feeder_args):
+            builder = builder_class(connection=connection, name=builder_class.__name__)
+            builder.new_feeder(feeder_network=feeder_network, feeder=feeder, **feeder_args)
+            return count_objects(builder.network)
+        results.append(run_benchmark(f'substation_feeder/{builder_class.__name__}', setup_feeder,
+                                     build_with_feeder, repeat))
+    return results
+
+
+def new_substation(connection:RDFlibConnection, name:str) -> RingBusSubstation:
+    return RingBusSubstation(connection=connection, name=name, base_voltage=115000, total_sections=4)
+
+
+def feeder_table(size:int, prefix:str='feeder') -> dict[str, list]:
+    return {'feeder_name': [f'{prefix}_{n}' for n in range(size)],
+            'total_load_kw': [1000.0]*size, 'total_load_kvar': [200.0]*size,
+            'total_btm_pv_kw': [150.0]*size, 'total_ftm_pv_kw': [500.0]*size,
+            'total_btm_wind_kw': [0.0]*size, 'total_ftm_wind_kw': [250.0]*size}
+
+
+def benchmark_aggregate_feeders(connection:RDFlibConnection, sizes:list[int], repeat:int) -> list[dict]:
+    results = []
+    for size in sizes:
+        def setup():
+            builder = new_substation(connection, 'agg_sub')
+            return builder, feeder_table(size)
+
+        def build_single(builder, table):
+            network = builder.network
+            total = count_objects(network)
+            for row in range(size):
+                new_aggregate_feeder(network, table['feeder_name'][row], f"{table['feeder_name'][row]}_breaker",
+                                     builder.substation, 'agg_sub_bus_1', 12470,
+                                     total_load_kw=table['total_load_kw'][row], total_load_kvar=table['total_load_kvar'][row],
+                                     total_btm_pv_kw=table['total_btm_pv_kw'][row], total_ftm_pv_kw=table['total_ftm_pv_kw'][row],
+                                     total_ftm_wind_kw=table['total_ftm_wind_kw'][row])
+            return count_objects(network) - total
+
+        def build_columns(builder, table):
+            network = builder.network
+            total = count_objects(network)
+            new_aggregate_feeders(network, table, substation=builder.substation, node='agg_sub_bus_1',
+                                  base_voltage=12470)
+            return count_objects(network) - total
+
+        results.append(run_benchmark(f'new_aggregate_feeder/{size}', setup, build_single, repeat))
+        results.append(run_benchmark(f'new_aggregate_feeders/{size}', setup, build_columns, repeat))
+    return results
+
+
+def benchmark_lookups(connection:RDFlibConnection, sizes:list[int], repeat:int) -> list[dict]:
+    # Lookup cost as the network grows. Each size is a substation with that many aggregate feeders.
+    results = []
+    for size in sizes:
+        builder = new_substation(connection, 'lookup_sub')
+        new_aggregate_feeders(builder.network, feeder_table(size), substation=builder.substation,
+                              node='lookup_sub_bus_1', base_voltage=12470)
+        network = builder.network
+        step = max(1, size // TOTAL_LOOKUPS)
+        node_names = [f'feeder_{n}_1' for n in range(0, size, step)]
+        node_names = (node_names * (TOTAL_LOOKUPS // len(node_names) + 1))[:TOTAL_LOOKUPS]
+        objects = count_objects(network)
+
+        def setup_terminals():
+            return [cim.Terminal(name=f'lookup_t{n}', mRID=utils.new_mrid()) for n in range(TOTAL_LOOKUPS)],
+
+        def connect_terminals(terminals):
+            for terminal, node_name in zip(terminals, node_names):
+                utils.terminal_to_node(network, terminal, node_name)
+            return TOTAL_LOOKUPS
+
+        def find_base_voltages():
+            for n in range(TOTAL_LOOKUPS):
+                utils.get_base_voltage(network, 12470 if n % 2 else 115000)
+            return TOTAL_LOOKUPS
+
+        result = run_benchmark(f'terminal_to_node/{size}', setup_terminals, connect_terminals, repeat, 'calls')
+        result['network_objects'] = objects
+        results.append(result)
+        result = run_benchmark(f'get_base_voltage/{size}', tuple, find_base_voltages, repeat, 'calls')
+        result['network_objects'] = objects
+        results.append(result)
+
+        # Remove the benchmark terminals from the network nodes
+        for node in network.graph[cim.ConnectivityNode].values():
+            node.Terminals = [terminal for terminal in node.Terminals if not terminal.name.startswith('lookup_t')]
+    return results
+
+
+def get_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=TESTS_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results:list[dict], baseline_file:str) -> None:
+    with open(baseline_file, encoding='utf-8') as f:
+        baseline = {result['name']: result for result in json.load(f)['results']}
+    print(f'\nComparison with {baseline_file}')
+    for result in results:
+        old = baseline.get(result['name'])
+        if old is None or not old['seconds']:
+            continue
+        change = (result['seconds'] - old['seconds'])/old['seconds']*100
+        memory = (result['peak_memory_bytes'] - old['peak_memory_bytes'])/max(old['peak_memory_bytes'], 1)*100
+        print(f"{result['name']:<55} time {change:>+8.1f}%   memory {memory:>+8.1f}%")
+
+
+def main(argv:list[str]=None) -> None:
+    parser = argparse.ArgumentParser(description='Run CIM-Builder benchmarks')
+    parser.add_argument('--output', default=os.path.join(TESTS_DIR, 'test_output', 'benchmarks.json'),
+                        help='JSON file for the results')
+    parser.add_argument('--repeat', type=int, default=3, help='timed repeats of each benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 100, 10000],
+                        help='numbers of aggregate feeders')
+    parser.add_argument('--only', nargs='+', choices=['substations', 'aggregate_feeders', 'lookups'],
+                        help='run only these groups of benchmarks')
+    parser.add_argument('--baseline', help='previous JSON results to compare with')
+    parser.add_argument('--pause-gc', action='store_true',
+                        help='pause cyclic garbage collection during the timed runs')
+    args = parser.parse_args(argv)
+
+    global PAUSE_GC
+    PAUSE_GC = args.pause_gc
+
+    logging.basicConfig(level=logging.ERROR)
+    groups = args.only or ['substations', 'aggregate_feeders', 'lookups']
+
+    params = ConnectionParameters(filename=None, cim_profile=CIM_PROFILE, iec61970_301=8)
+    connection = RDFlibConnection(params)
+
+    results = []
+    if 'substations' in groups:
+        params = ConnectionParameters(filename=IEEE13_FILE, cim_profile=CIM_PROFILE, iec61970_301=8)
+        feeder_connection = RDFlibConnection(params)
+        results.extend(benchmark_substations(connection, feeder_connection, args.repeat))
+    if 'aggregate_feeders' in groups:
+        results.extend(benchmark_aggregate_feeders(connection, args.sizes, args.repeat))
+    if 'lookups' in groups:
+        results.extend(benchmark_lookups(connection, args.sizes, args.repeat))
+
+    report = {'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+              'revision': get_revision(),
+              'python': platform.python_version(),
+              'platform': platform.platform(),
+              'cim-graph': version('cim-graph'),
+              'cim_profile': CIM_PROFILE,
+              'results': results}
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f'Saved results to {args.output}')
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import rdflib
+
+from cimgraph.models import DistributedArea
+
+from cimbuilder.analysis import validate_network
+from cimbuilder.substation_builder import new_branches
+import cimbuilder.utils as utils
+
+from conftest import SUBSTATION_CASES, new_line, position_kwargs
+
+
+def write(network, connection, filename):
+    with utils.StreamingXMLWriter(str(filename), connection) as writer:
+        writer.write_network(network)
+    return set(rdflib.Graph().parse(str(filename), format='xml'))
+
+
+def build(connection, cases, bulk, positions=lambda kwargs: kwargs):
+    # Build each case with lines on its branches, connected one at a time or all at once
+    network = DistributedArea(connection=connection, container=None, distributed=False)
+    branches = []
+    for number, (builder_class, params, branch_positions, _) in enumerate(cases, start=1):
+        builder = builder_class(connection=connection, network=network, name=f'sub{number}', **params)
+        for position in branch_positions:
+            kwargs = position_kwargs(builder_class, position)
+            line, terminal = new_line(network, f'sub{number}_line_{"_".join(map(str, kwargs.values()))}',
+                                      builder.base_voltage)
+            if bulk:
+                branches.append((terminal, builder, positions(kwargs)))
+            else:
+                builder.new_branch(branch_equipment=line, branch_terminal=terminal, **kwargs)
+    if bulk:
+        assert new_branches(branches) == len(branches)
+    return network
+
+
+def test_matches_new_branch(connection, substation_case, tmp_path):
+    networks = []
+    for bulk in (False, True):
+        with utils.mrid_generator(utils.NameMRIDGenerator('branches')):
+            networks.append(build(connection, [substation_case], bulk))
+    expected, result = (write(network, connection, tmp_path / f'bulk_{number}.xml')
+                        for number, network in enumerate(networks))
+    assert result == expected
+    assert validate_network(networks[1]).ok
+
+
+def test_substations_in_one_call(connection, tmp_path):
+    # Positions given as tuples and numbers as well as keyword arguments
+    networks = []
+    for bulk in (False, True):
+        with utils.mrid_generator(utils.NameMRIDGenerator('branches')):
+            networks.append(build(connection, SUBSTATION_CASES, bulk,
+                                  lambda kwargs: tuple(kwargs.values()) if len(kwargs) > 1 else next(iter(kwargs.values()))))
+    expected, result = (write(network, connection, tmp_path / f'bulk_{number}.xml')
+                        for number, network in enumerate(networks))
+    assert result == expected
+    assert validate_network(networks[1]).ok
@@ -0,0 +1,74 @@
+import rdflib
+import pytest
+
+from cimgraph.databases import ConnectionParameters, RDFlibConnection
+from cimgraph.models import DistributedArea
+
+from cimbuilder.substation_builder import RingBusSubstation
+import cimbuilder.utils as utils
+
+
+@pytest.fixture
+def connection():
+    params = ConnectionParameters(filename=None, cim_profile='cimhub_2023', iec61970_301=8)
+    return RDFlibConnection(params)
+
+
+@pytest.fixture
+def network(connection):
+    return DistributedArea(connection=connection, container=None, distributed=False)
+
+
+def test_flush_matches_xml_writer(connection, network, tmp_path):
+    store = rdflib.Graph()
+    changes = utils.Changeset(connection, chunk_size=100, update=store.update)
+    with changes.track(network):
+        RingBusSubstation(connection=connection, network=network, name='ring', total_sections=4)
+    assert len(changes) == sum(len(objects) for objects in network.graph.values())
+
+    inserted = changes.flush()
+    assert inserted == len(store)
+    assert len(changes) == 0
+
+    filename = str(tmp_path / 'ring.xml')
+    with utils.StreamingXMLWriter(filename, connection) as writer:
+        writer.write_network(network)
+    written = rdflib.Graph()
+    written.parse(filename, format='xml')
+    assert set(store) == set(written)
+
+
+def test_track_skips_existing_objects(connection, network):
+    cim = utils.get_cim_profile(connection)
+    existing = cim.ConnectivityNode(mRID='existing_node', name='existing_node')
+    changes = utils.Changeset(connection, update=rdflib.Graph().update)
+    with changes.track(network):
+        builder = RingBusSubstation(connection=connection, network=network, name='ring', total_sections=4)
+        network.add_to_graph(existing)
+    assert 'existing_node' not in changes.objects
+    assert builder.substation.mRID in changes.objects
+
+
+def test_rollback_keeps_existing_triples(connection, network):
+    cim = utils.get_cim_profile(connection)
+    store = rdflib.Graph()
+    existing = cim.ConnectivityNode(mRID='existing_node', name='existing_node')
+    setup = utils.Changeset(connection, update=store.update)
+    setup.add(existing)
+    setup.flush()
+    before = set(store)
+
+    updates = []
+    def update(query):
+        if len(updates) == 2 and query.startswith(setup.prefix + 'INSERT'):
+            raise RuntimeError('update failed')
+        updates.append(query)
+        store.update(query)
+
+    changes = utils.Changeset(connection, chunk_size=50, update=update)
+    with changes.track(network):
+        RingBusSubstation(connection=connection, network=network, name='ring', total_sections=4)
+        network.add_to_graph(existing)
+    with pytest.raises(RuntimeError):
+        changes.flush()
+    assert set(store) == before
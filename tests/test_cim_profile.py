@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from cimgraph.databases import ConnectionParameters, RDFlibConnection
+
+from cimbuilder.analysis import validate_network
+import cimbuilder.utils as utils
+import cimbuilder.utils.cim_profile as cim_profile
+
+from conftest import SUBSTATION_CASES, new_line, position_kwargs
+
+
+@pytest.fixture(scope='module')
+def rc4_connection():
+    params = ConnectionParameters(filename=None, cim_profile='rc4_2021', iec61970_301=8)
+    return RDFlibConnection(params)
+
+
+def test_profile_is_imported_once(connection, monkeypatch):
+    imported = []
+    import_module = cim_profile.importlib.import_module
+    def counted(name):
+        imported.append(name)
+        return import_module(name)
+    monkeypatch.setattr(cim_profile, '_cim_profiles', {})
+    monkeypatch.setattr(cim_profile.importlib, 'import_module', counted)
+
+    cim = utils.get_cim_profile(connection)
+    assert cim is sys.modules['cimgraph.data_profile.cimhub_2023']
+    assert utils.get_cim_profile(connection) is cim
+    assert imported == ['cimgraph.data_profile.cimhub_2023']
+
+
+@pytest.mark.parametrize('case', SUBSTATION_CASES, ids=[case[0].__name__ for case in SUBSTATION_CASES])
+def test_builders_use_connection_profile(rc4_connection, case):
+    builder_class, params, branches, _ = case
+    builder = builder_class(connection=rc4_connection, name='sub', **params)
+    for position in branches:
+        kwargs = position_kwargs(builder_class, position)
+        line, terminal = new_line(builder.network, f'line_{"_".join(map(str, kwargs.values()))}', builder.base_voltage)
+        builder.new_branch(branch_equipment=line, branch_terminal=terminal, **kwargs)
+    cim = utils.get_cim_profile(rc4_connection)
+    assert builder.cim is cim
+    assert all(cim_class.__module__.startswith('cimgraph.data_profile.rc4_2021') for cim_class in builder.network.graph)
+    assert validate_network(builder.network).ok
+
+
+def test_import_does_not_load_profile():
+    # Importing the builders loads no profile until a connection is used
+    script = textwrap.dedent('''
+        import sys
+        import cimbuilder.substation_builder
+        import cimbuilder.object_builder
+        import cimbuilder.analysis
+        print(sorted(name for name in sys.modules if name.split('.')[:3] in
+                     (['cimgraph', 'data_profile', 'cimhub_2023'], ['cimgraph', 'data_profile', 'rc4_2021'])))
+    ''')
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True, cwd=root)
+    assert result.stdout.strip() == '[]'
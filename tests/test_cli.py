@@ -0,0 +1,87 @@
+import json
+import logging
+
+import pytest
+import rdflib
+
+from cimbuilder.cli import main
+
+from conftest import IEEE13_FILE, IEEE13_MRID
+
+SPEC = {'substations': [
+    {'topology': 'SingleBusSubstation', 'name': 'sub1', 'base_voltage': 115000,
+     'branches': [{'series_number': 1}],
+     'feeders': [{'series_number': 2, 'filename': IEEE13_FILE, 'mrid': IEEE13_MRID, 'replica': 'sub1_ieee13'}],
+     'aggregate_feeders': [{'feeder_name': 'sub1_agg', 'node': 'sub1_main_bus', 'total_load_kw': 100}]},
+    {'topology': 'RingBusSubstation', 'name': 'sub2', 'base_voltage': 115000, 'parameters': {'total_sections': 4},
+     'branches': [{'bus_number': 1}, {'bus_number': 2}]},
+]}
+
+
+@pytest.fixture
+def spec_file(tmp_path):
+    filename = tmp_path / 'spec.json'
+    filename.write_text(json.dumps(SPEC))
+    return str(filename)
+
+
+def parse(filename):
+    return set(rdflib.Graph().parse(str(filename), format='xml'))
+
+
+def base_voltages(triples):
+    return [subject for subject, predicate, value in triples
+            if predicate == rdflib.RDF.type and str(value).endswith('#BaseVoltage')]
+
+
+def run(spec_file, output, *options):
+    return main([spec_file, '-o', str(output), '--mrid-namespace', 'cli'] + list(options))
+
+
+def test_serial_and_stream(spec_file, tmp_path):
+    assert run(spec_file, tmp_path / 'serial.xml', '--validate') == 0
+    serial = parse(tmp_path / 'serial.xml')
+    assert len(base_voltages(serial)) == 1
+
+    # Streamed substations share the first BaseVoltage like the merged model
+    assert run(spec_file, tmp_path / 'stream.xml', '--stream', '--validate') == 0
+    stream = parse(tmp_path / 'stream.xml')
+    assert stream == serial
+
+
+def test_processes(spec_file, tmp_path):
+    assert run(spec_file, tmp_path / 'serial.xml') == 0
+    assert run(spec_file, tmp_path / 'parallel.xml', '-j', '2') == 0
+    assert parse(tmp_path / 'parallel.xml') == parse(tmp_path / 'serial.xml')
+
+
+def test_partition(spec_file, tmp_path):
+    assert run(spec_file, tmp_path / 'serial.xml') == 0
+    assert run(spec_file, tmp_path / 'partitions', '--partition') == 0
+    with open(tmp_path / 'partitions' / 'manifest.json', encoding='utf-8') as f:
+        manifest = json.load(f)
+    assert [entry['name'] for entry in manifest['partitions']] == ['sub1', 'sub2']
+    partitions = [parse(tmp_path / 'partitions' / entry['file']) for entry in manifest['partitions']]
+    assert len(base_voltages(partitions[1])) == 1
+    # Besides their own BaseVoltages and the feeder copies, the files hold the objects of the single file
+    serial = parse(tmp_path / 'serial.xml')
+    written = {subject for partition in partitions for subject, predicate, _ in partition if predicate == rdflib.RDF.type}
+    expected = {subject for subject, predicate, _ in serial if predicate == rdflib.RDF.type}
+    assert expected - set(base_voltages(serial)) <= written
+
+
+def test_errors(spec_file, tmp_path, caplog):
+    with caplog.at_level(logging.ERROR):
+        assert run(spec_file, tmp_path / 'partitions', '--partition', '--validate') == 1
+        assert main([spec_file, '-o', str(tmp_path / 'model.xml'), '-j', '2', '--profile',
+                     str(tmp_path / 'profile.json')]) == 1
+    assert 'Validation is not supported' in caplog.text
+    assert '--profile only supports one process' in caplog.text
+
+    invalid = tmp_path / 'invalid.json'
+    invalid.write_text(json.dumps({'substations': [{'topology': 'RingBusSubstation', 'name': 'sub',
+                                                    'parameters': {'sections': 4}}]}))
+    caplog.clear()
+    with caplog.at_level(logging.ERROR):
+        assert main([str(invalid), '-o', str(tmp_path / 'model.xml')]) == 1
+    assert "unknown arguments ['sections']" in caplog.text
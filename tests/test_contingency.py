@@ -0,0 +1,68 @@
+import pytest
+
+from cimgraph.models import DistributedArea
+
+from cimbuilder.analysis import ContingencyAnalysis, TopologyProcessor
+
+from conftest import SUBSTATION_CASES, build_case
+
+
+def brute_force(network, result, normal):
+    # Loads that lose supply in each case, found by opening the switches of the outage
+    topology = TopologyProcessor(network, normal=normal)
+    state = 'normalOpen' if normal else 'open'
+    lost = []
+    for case in range(len(result.outages)):
+        switches = result.get_outage(case)
+        states = [getattr(switch, state) for switch in switches]
+        for switch in switches:
+            topology.set_open(switch)
+        supplied = {topology.find(node_id) for node_id in topology.bus_nodes}
+        lost.append([(node.mRID, id(load)) for node, load in result.loads
+                     if topology.get_island(node) not in supplied])
+        for switch, switch_state in zip(switches, states):
+            topology.set_open(switch, switch_state)
+    return lost
+
+
+@pytest.mark.parametrize('order', [1, 2])
+@pytest.mark.parametrize('normal', [True, False], ids=['normalOpen', 'open'])
+def test_matches_brute_force(connection, substation_case, order, normal):
+    builder = build_case(substation_case, connection)
+    analysis = ContingencyAnalysis(builder.network, order=order, normal=normal)
+    assert len(analysis.results) == 1
+    result = analysis.results[0]
+    assert result.substation is builder.substation
+
+    switches = len(result.switches)
+    assert switches == len(TopologyProcessor(builder.network).switches)
+    expected_cases = 1 + switches + (switches*(switches - 1)//2 if order == 2 else 0)
+    assert len(result.outages) == expected_cases
+
+    expected = brute_force(builder.network, result, normal)
+    for case in range(len(result.outages)):
+        lost = [(node.mRID, id(load)) for node, load in result.get_lost(case)]
+        assert lost == expected[case]
+    assert expected[0] == []
+    assert any(expected[1:])
+    assert result.get_critical() == [case for case in range(1, len(result.outages)) if expected[case]]
+    matrix = result.get_matrix()
+    assert [sum(row) for row in matrix] == [len(lost) for lost in expected]
+
+
+def test_substations_are_analysed_separately(connection, substation_case):
+    network = DistributedArea(connection=connection, container=None, distributed=False)
+    builders = [build_case(substation_case, connection, name=name, network=network) for name in ('sub1', 'sub2')]
+    analysis = ContingencyAnalysis(network, order=1)
+    assert sorted(result.substation.name for result in analysis.results) == ['sub1', 'sub2']
+    for result in analysis.results:
+        substation = next(builder.substation for builder in builders if builder.substation is result.substation)
+        assert all(switch.EquipmentContainer is substation for switch in result.switches)
+        assert brute_force(network, result, True) == [[(node.mRID, id(load)) for node, load in result.get_lost(case)]
+                                                      for case in range(len(result.outages))]
+
+
+def test_order_is_checked(connection):
+    builder = build_case(SUBSTATION_CASES[0], connection)
+    with pytest.raises(ValueError, match='order'):
+        ContingencyAnalysis(builder.network, order=3)
@@ -0,0 +1,50 @@
+import os
+
+import cimgraph.data_profile.cimhub_2023 as cim
+
+from cimbuilder.substation_builder import get_feeder_replicator
+
+IEEE13_ASSETS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_models', 'IEEE13_Assets.xml')
+IEEE13_ASSETS_MRID = '5B816B93-7A5F-B64C-8460-47C17D6E4B0F'
+
+# Shared classes and the lists on them that link back to objects of the feeder
+REVERSE_LISTS = [(cim.BaseVoltage, 'ConductingEquipment'), (cim.LoadResponseCharacteristic, 'EnergyConsumer'),
+                 (cim.WireSpacingInfo, 'ACLineSegments'), (cim.OverheadWireInfo, 'ACLineSegmentPhases'),
+                 (cim.TransformerTankInfo, 'TransformerTanks')]
+
+
+def test_replicate_links_copies_to_shared_objects():
+    replicator = get_feeder_replicator(IEEE13_ASSETS_FILE, IEEE13_ASSETS_MRID)
+    originals = {id(obj): obj for class_objects in replicator.network.graph.values()
+                 for obj in class_objects.values()}
+    shared = {id(obj) for obj in replicator.shared}
+    before = {(cim_class, attribute, mRID): len(getattr(obj, attribute))
+              for cim_class, attribute in REVERSE_LISTS
+              for mRID, obj in replicator.network.graph.get(cim_class, {}).items()}
+    assert sum(before.values()) > 0
+
+    network, feeder, sourcebus = replicator.replicate('copy1')
+    assert feeder.name == f'copy1_{replicator.feeder.name}'
+    assert sourcebus.name == f'copy1_{replicator.sourcebus.name}'
+
+    copies = [obj for class_objects in network.graph.values() for obj in class_objects.values()
+              if id(obj) not in shared]
+    original_mrids = {obj.mRID for obj in originals.values()}
+    assert len(copies) == len(replicator.objects.objects)
+    assert all(id(obj) not in originals for obj in copies)
+    assert all(obj.mRID not in original_mrids for obj in copies)
+    assert all(obj.name.startswith('copy1_') for obj in copies if getattr(obj, 'name', None))
+
+    # Shared objects are the same objects and list the copies as well as the originals
+    for cim_class, attribute in REVERSE_LISTS:
+        for mRID, obj in network.graph.get(cim_class, {}).items():
+            assert obj is replicator.network.graph[cim_class][mRID]
+            items = getattr(obj, attribute)
+            added = [item for item in items if id(item) not in originals]
+            assert len(items) == 2*before[(cim_class, attribute, mRID)]
+            assert all(item.mRID in network.graph[type(item)] for item in added)
+    for copy in copies:
+        base_voltage = getattr(copy, 'BaseVoltage', None)
+        if isinstance(copy, cim.ConductingEquipment) and base_voltage is not None:
+            assert id(base_voltage) in shared
+            assert any(item is copy for item in base_voltage.ConductingEquipment)
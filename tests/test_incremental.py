@@ -0,0 +1,77 @@
+import dataclasses
+import os
+
+import pytest
+import rdflib
+
+from cimbuilder.substation_builder import IncrementalBuild
+
+from conftest import SUBSTATION_CASES, case_spec
+
+
+def get_specs():
+    return [case_spec(case, name=f'sub{number}') for number, case in enumerate(SUBSTATION_CASES[:3], start=1)]
+
+
+def read_fragments(build, specs):
+    fragments = {}
+    for spec in specs:
+        with open(build.fragment_file(spec.name), 'rb') as f:
+            fragments[spec.name] = f.read()
+    return fragments
+
+
+def test_unchanged_fragments_are_identical(connection, tmp_path):
+    specs = get_specs()
+    build = IncrementalBuild(str(tmp_path / 'cache'), connection)
+    summary = build.build(specs, str(tmp_path / 'first.xml'))
+    assert summary['built'] == [spec.name for spec in specs]
+    fragments = read_fragments(build, specs)
+
+    # A new run reuses every fragment
+    build = IncrementalBuild(str(tmp_path / 'cache'), connection)
+    summary = build.build(specs, str(tmp_path / 'second.xml'))
+    assert summary == {'built': [], 'reused': [spec.name for spec in specs], 'removed': []}
+    second, first = ((tmp_path / filename).read_bytes() for filename in ('second.xml', 'first.xml'))
+    assert second == first
+
+    # Rebuilding an unchanged substation gives the same bytes
+    os.remove(build.fragment_file('sub2'))
+    summary = build.build(specs, str(tmp_path / 'third.xml'))
+    assert summary['built'] == ['sub2']
+    assert read_fragments(build, specs) == fragments
+    third = (tmp_path / 'third.xml').read_bytes()
+    assert third == first
+
+    # So does a build in another cache
+    other = IncrementalBuild(str(tmp_path / 'other'), connection)
+    other.build(specs)
+    assert read_fragments(other, specs) == fragments
+
+
+def test_changed_and_removed_substations(connection, tmp_path):
+    specs = get_specs()
+    build = IncrementalBuild(str(tmp_path / 'cache'), connection)
+    build.build(specs)
+    fragments = read_fragments(build, specs)
+
+    specs[0] = dataclasses.replace(specs[0], base_voltage=69000)
+    removed = specs.pop()
+    summary = build.build(specs, str(tmp_path / 'model.xml'))
+    assert summary == {'built': ['sub1'], 'reused': ['sub2'], 'removed': [removed.name]}
+    assert not os.path.exists(build.fragment_file(removed.name))
+    assert read_fragments(build, specs)['sub2'] == fragments['sub2']
+    assert read_fragments(build, specs)['sub1'] != fragments['sub1']
+
+    # Each BaseVoltage is written once in the assembled model
+    model = rdflib.Graph().parse(str(tmp_path / 'model.xml'), format='xml')
+    cim = rdflib.Namespace(connection.namespace)
+    voltages = sorted(float(value) for value in model.objects(None, cim['BaseVoltage.nominalVoltage']))
+    assert voltages == [69000, 115000]
+
+
+def test_duplicate_names_are_rejected(connection, tmp_path):
+    spec = get_specs()[0]
+    build = IncrementalBuild(str(tmp_path / 'cache'), connection)
+    with pytest.raises(ValueError, match='unique'):
+        build.build([spec, spec])
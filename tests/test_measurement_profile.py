@@ -0,0 +1,89 @@
+import pytest
+
+from cimbuilder.object_builder import MeasurementProfile, new_discrete
+from cimbuilder.substation_builder import RingBusSubstation
+import cimbuilder.utils as utils
+
+
+def get_profile(cim):
+    return (MeasurementProfile().add_rule(cim.Breaker, cim.Discrete, 'Pos')
+            .add_rule('Switch', 'Analog', 'VA', per_terminal=True))
+
+
+def test_apply_to_network(connection):
+    builder = RingBusSubstation(connection=connection, name='ring', total_sections=4)
+    cim = builder.cim
+    breakers = list(builder.network.graph[cim.Breaker].values())
+    switches = breakers + list(builder.network.graph[cim.Disconnector].values())
+    created = get_profile(cim).apply(builder.network)
+    assert len(created) == len(breakers) + sum(len(switch.Terminals) for switch in switches)
+
+    for breaker in breakers:
+        positions = [meas for meas in breaker.Measurements if meas.measurementType == 'Pos']
+        assert [meas.__class__ for meas in positions] == [cim.Discrete]
+        assert positions[0].name == f'Breaker_{breaker.name}_Pos'
+        assert positions[0].Terminal is breaker.Terminals[0]
+        assert positions[0].mRID in builder.network.graph[cim.Discrete]
+    for switch in switches:
+        analogs = [meas for meas in switch.Measurements if meas.__class__ == cim.Analog]
+        assert [meas.Terminal for meas in analogs] == switch.Terminals
+        assert [meas.name for meas in analogs] == [f'{switch.__class__.__name__}_{switch.name}_VA_{number}'
+                                                   for number in range(1, len(switch.Terminals) + 1)]
+        for meas in analogs:
+            assert any(item is meas for item in meas.Terminal.Measurements)
+
+    # Measurements that exist are not created again
+    assert get_profile(cim).apply(builder.network) == []
+
+
+def test_existing_measurements_are_skipped(connection):
+    builder = RingBusSubstation(connection=connection, name='ring', total_sections=4)
+    cim = builder.cim
+    breaker = next(iter(builder.network.graph[cim.Breaker].values()))
+    existing = new_discrete(builder.network, breaker, 'Pos')
+    created = MeasurementProfile().add_rule(cim.Breaker, cim.Discrete, 'Pos').apply(builder.network)
+    assert len(created) == len(builder.network.graph[cim.Breaker]) - 1
+    assert [meas for meas in breaker.Measurements] == [existing]
+
+    # Only the given equipment is measured
+    disconnector = next(iter(builder.network.graph[cim.Disconnector].values()))
+    profile = get_profile(cim)
+    created = profile.apply(builder.network, [disconnector])
+    assert [meas.PowerSystemResource for meas in created] == [disconnector, disconnector]
+
+
+def test_rule_needs_equipment_class(connection):
+    builder = RingBusSubstation(connection=connection, name='ring', total_sections=4)
+    with pytest.raises(ValueError, match='Substation'):
+        MeasurementProfile().add_rule('Substation').apply(builder.network)
+
+
+def test_index_follows_graph(connection):
+    builder = RingBusSubstation(connection=connection, name='ring', total_sections=4)
+    cim = builder.cim
+    network = builder.network
+    breakers = list(network.graph[cim.Breaker].values())
+    index = utils.get_measurement_index(network)
+    assert utils.get_measurement_index(network) is index
+    assert index.get(breakers[0], breakers[0].Terminals[0], 'Pos') is None
+
+    measurements = [new_discrete(network, breaker, 'Pos') for breaker in breakers]
+    for breaker, meas in zip(breakers, measurements):
+        assert index.get(breaker, breaker.Terminals[0], 'Pos') is meas
+
+    # A measurement removed and another added keeps the count of the class
+    discretes = network.graph[cim.Discrete]
+    del discretes[measurements[0].mRID]
+    replacement = cim.Discrete(name='replacement', mRID=utils.new_mrid('replacement'), measurementType='Pos',
+                               PowerSystemResource=breakers[0], Terminal=breakers[0].Terminals[1])
+    network.add_to_graph(replacement)
+    assert index.get(breakers[0], breakers[0].Terminals[0], 'Pos') is None
+    assert index.get(breakers[0], breakers[0].Terminals[1], 'Pos') is replacement
+    assert index.get(breakers[1], breakers[1].Terminals[0], 'Pos') is measurements[1]
+
+    # Replaced and emptied dictionaries
+    network.graph[cim.Discrete] = {replacement.mRID: replacement}
+    assert index.get(breakers[1], breakers[1].Terminals[0], 'Pos') is None
+    assert index.get(breakers[0], breakers[0].Terminals[1], 'Pos') is replacement
+    network.graph[cim.Discrete].clear()
+    assert index.get(breakers[0], breakers[0].Terminals[1], 'Pos') is None
@@ -0,0 +1,84 @@
+import pytest
+
+from cimgraph.models import DistributedArea
+
+from cimbuilder.analysis import validate_network
+from cimbuilder.substation_builder import SubstationSpec, build_substations
+import cimbuilder.utils as utils
+
+from conftest import SUBSTATION_CASES, build_case
+
+
+def new_network(connection):
+    return DistributedArea(connection=connection, container=None, distributed=False)
+
+
+def count_objects(network):
+    return sum(len(objects) for objects in network.graph.values())
+
+
+def test_build_substations_shares_base_voltage(connection):
+    specs = [SubstationSpec('RingBusSubstation', 'ring', parameters={'total_sections': 4},
+                            branches=[{'bus_number': 1}]),
+             SubstationSpec('BreakerAndHalfSubstation', 'bah', parameters={'total_bus_ties': 2},
+                            branches=[{'branch_number': 1, 'tie_number': 0}]),
+             SubstationSpec('SingleBusSubstation', 'low', base_voltage=69000)]
+    network = build_substations(specs, connection, processes=1, mrid_namespace='merge')
+    cim = utils.get_cim_profile(connection)
+    base_voltages = {bv.nominalVoltage: bv for bv in network.graph[cim.BaseVoltage].values()}
+    assert sorted(base_voltages) == [69000, 115000]
+    for objects in network.graph.values():
+        for obj in objects.values():
+            if getattr(obj, 'BaseVoltage', None) is not None:
+                assert obj.BaseVoltage is base_voltages[obj.BaseVoltage.nominalVoltage]
+    assert validate_network(network).ok
+
+
+def test_merge_moves_base_voltage_links(connection):
+    cim = utils.get_cim_profile(connection)
+    network = new_network(connection)
+    first = build_case(SUBSTATION_CASES[2], connection, name='first', network=network)
+    other = new_network(connection)
+    second = build_case(SUBSTATION_CASES[5], connection, name='second', network=other)
+    dropped = second.base_voltage
+    lines = [line for line in other.graph[cim.ACLineSegment].values()]
+    assert all(line in dropped.ConductingEquipment for line in lines)
+
+    merger = utils.GraphMerger(network)
+    merged = merger.merge(other.graph)
+    assert merged == count_objects(other) - 1
+    assert list(network.graph[cim.BaseVoltage].values()) == [first.base_voltage]
+    for line in lines:
+        assert line.BaseVoltage is first.base_voltage
+        assert sum(item is line for item in first.base_voltage.ConductingEquipment) == 1
+        assert all(item is not line for item in dropped.ConductingEquipment)
+    for objects in network.graph.values():
+        for obj in objects.values():
+            assert getattr(obj, 'BaseVoltage', None) is not dropped
+    assert merger.name_collisions == []
+    assert validate_network(network).ok
+
+
+def test_mrid_collision_raises(connection):
+    cim = utils.get_cim_profile(connection)
+    network = new_network(connection)
+    build_case(SUBSTATION_CASES[0], connection, name='first', network=network)
+    before = count_objects(network)
+    other = new_network(connection)
+    build_case(SUBSTATION_CASES[0], connection, name='second', network=other)
+    duplicate = cim.ConnectivityNode(name='duplicate', mRID=next(iter(network.graph[cim.ConnectivityNode])))
+    other.add_to_graph(duplicate)
+
+    with pytest.raises(ValueError, match='mRID collision'):
+        utils.merge_graphs(network, other.graph)
+    assert count_objects(network) == before
+
+
+def test_name_collisions_are_collected(connection):
+    network = new_network(connection)
+    build_case(SUBSTATION_CASES[0], connection, name='same', network=network)
+    other = new_network(connection)
+    build_case(SUBSTATION_CASES[0], connection, name='same', network=other)
+    merger = utils.GraphMerger(network)
+    merger.merge(other.graph)
+    assert any(message.startswith('Substation name same is used by') for message in merger.name_collisions)
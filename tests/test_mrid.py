@@ -0,0 +1,91 @@
+import uuid
+
+import cimbuilder.utils as utils
+from cimbuilder.utils.mrid import CIMBUILDER_NAMESPACE
+
+from conftest import build_case, case_spec
+
+
+def write_xml(network, connection, filename):
+    with utils.StreamingXMLWriter(str(filename), connection) as writer:
+        writer.write_network(network)
+    with open(filename, 'rb') as f:
+        return f.read()
+
+
+def get_mrids(network):
+    return {cim_class.__name__: list(objects) for cim_class, objects in network.graph.items()}
+
+
+def test_same_build_gives_same_mrids_and_xml(connection, substation_case, tmp_path):
+    builds = []
+    with utils.mrid_generator(utils.NameMRIDGenerator('deterministic')):
+        for build in range(2):
+            with utils.mrid_scope():
+                builder = build_case(substation_case, connection)
+            builds.append((get_mrids(builder.network), write_xml(builder.network, connection, tmp_path / f'{build}.xml')))
+    assert builds[0][0] == builds[1][0]
+    assert builds[0][1] == builds[1][1]
+
+
+def test_spec_with_namespace_gives_same_xml(connection, substation_case, tmp_path):
+    spec = case_spec(substation_case)
+    first = spec.build(connection, mrid_namespace='model')
+    second = spec.build(connection, mrid_namespace='model')
+    other = spec.build(connection, mrid_namespace='other model')
+    assert get_mrids(first.network) == get_mrids(second.network)
+    assert write_xml(first.network, connection, tmp_path / 'first.xml') == write_xml(second.network, connection, tmp_path / 'second.xml')
+    assert not set(first.network.graph[first.cim.Substation]) & set(other.network.graph[other.cim.Substation])
+
+
+def test_random_mrids_are_unique(connection, substation_case):
+    first = build_case(substation_case, connection)
+    second = build_case(substation_case, connection)
+    mrids = [mRID for builder in (first, second) for objects in builder.network.graph.values() for mRID in objects]
+    assert len(set(mrids)) == len(mrids)
+    for mRID in utils.new_mrids(['a', 'b', 'c']):
+        assert uuid.UUID(mRID).version == 4
+
+
+def test_repeated_names_are_numbered():
+    generator = utils.NameMRIDGenerator('names')
+    namespace = uuid.uuid5(CIMBUILDER_NAMESPACE, 'names')
+    assert [generator.new_mrid('bus') for _ in range(3)] == [str(uuid.uuid5(namespace, name))
+                                                           for name in ('bus', 'bus#1', 'bus#2')]
+    assert generator.new_mrid() == str(uuid.uuid5(namespace, ''))
+    assert generator.new_mrids(['bus', 'other']) == [str(uuid.uuid5(namespace, 'bus#3')),
+                                                     str(uuid.uuid5(namespace, 'other'))]
+    generator.reset()
+    assert generator.new_mrid('bus') == str(uuid.uuid5(namespace, 'bus'))
+
+
+def test_mrid_scope_numbers_names_from_the_start():
+    with utils.mrid_generator(utils.NameMRIDGenerator('scope')) as generator:
+        outer = utils.new_mrid('bus')
+        with utils.mrid_scope() as scoped:
+            assert scoped is not generator
+            assert utils.new_mrid('bus') == outer
+        assert utils.get_mrid_generator() is generator
+        assert utils.new_mrid('bus') != outer
+
+
+def test_counter_mrids_are_shared_by_scopes():
+    with utils.mrid_generator(utils.CounterMRIDGenerator('counter', start=10)) as generator:
+        first = utils.new_mrid('bus')
+        with utils.mrid_scope() as scoped:
+            assert scoped is generator
+            second = utils.new_mrid('bus')
+        assert utils.new_mrids(['a', 'b']) == [first[:24] + f'{12:012x}', first[:24] + f'{13:012x}']
+    assert first.endswith(f'{10:012x}') and second.endswith(f'{11:012x}')
+    generator.reset()
+    assert generator.new_mrid() == first
+
+
+def test_record_mrids():
+    with utils.record_mrids() as outer:
+        first = utils.new_mrid('a')
+        with utils.record_mrids() as inner:
+            others = utils.new_mrids(['b', 'c'])
+    utils.new_mrid('d')
+    assert outer == {first, *others}
+    assert inner == set(others)
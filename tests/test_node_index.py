@@ -0,0 +1,138 @@
+import logging
+import random
+
+import pytest
+
+from cimgraph.models import DistributedArea
+
+import cimbuilder.utils as utils
+
+
+@pytest.fixture
+def network(connection):
+    return DistributedArea(connection=connection, container=None, distributed=False)
+
+
+def new_node(network, name, alias_name=None, mRID=None):
+    cim = utils.get_cim_profile(network.connection)
+    node = cim.ConnectivityNode(name=name, aliasName=alias_name, mRID=mRID or utils.new_mrid(name))
+    network.add_to_graph(node)
+    return node
+
+
+def test_find_by_name_and_alias(network):
+    node = new_node(network, 'bus1', alias_name='main')
+    index = utils.get_node_index(network)
+    assert index.get('bus1') is node
+    assert index.get('main') is node
+    assert utils.get_node_index(network) is index
+
+
+def test_added_nodes_are_indexed(network):
+    index = utils.get_node_index(network)
+    first = new_node(network, 'bus1')
+    assert index.get('bus1') is first
+    added = [new_node(network, f'bus{number}') for number in range(2, 6)]
+    assert [index.get(f'bus{number}') for number in range(2, 6)] == added
+    assert index.get('bus1') is first
+
+
+def test_removed_nodes_are_not_found(network, caplog):
+    cim = utils.get_cim_profile(network.connection)
+    index = utils.get_node_index(network)
+    first = new_node(network, 'bus1')
+    last = new_node(network, 'bus2')
+    assert index.get('bus2') is last
+    del network.graph[cim.ConnectivityNode][last.mRID]
+    with caplog.at_level(logging.ERROR):
+        assert index.get('bus2') is None
+    assert 'Could not find a ConnectivityNode with name bus2' in caplog.text
+    del network.graph[cim.ConnectivityNode][first.mRID]
+    assert index.get('bus1') is None
+
+
+def test_replaced_nodes(network):
+    cim = utils.get_cim_profile(network.connection)
+    index = utils.get_node_index(network)
+    new_node(network, 'bus1')
+    removed = new_node(network, 'bus2')
+    assert index.get('bus2') is removed
+
+    # Same number of nodes after one is removed and another added
+    del network.graph[cim.ConnectivityNode][removed.mRID]
+    added = new_node(network, 'bus3')
+    assert index.get('bus2') is None
+    assert index.get('bus3') is added
+
+    # Replaced under the same mRID
+    same = cim.ConnectivityNode(name='bus3', mRID=added.mRID)
+    network.graph[cim.ConnectivityNode][added.mRID] = same
+    assert index.get('bus3') is same
+
+    # Dictionary of nodes replaced
+    network.graph[cim.ConnectivityNode] = {}
+    other = new_node(network, 'bus1')
+    assert index.get('bus1') is other
+
+
+def test_renamed_nodes(network):
+    index = utils.get_node_index(network)
+    node = new_node(network, 'old')
+    assert index.get('old') is node
+    node.name = 'new'
+    assert index.find('old') == []
+    index.rename(node, old_name='old')
+    assert index.get('new') is node
+
+
+def test_duplicate_names(network, caplog):
+    index = utils.get_node_index(network)
+    first = new_node(network, 'bus')
+    second = new_node(network, 'bus')
+    third = new_node(network, 'other', alias_name='bus')
+    assert index.find('bus') == [first, second, third]
+    with caplog.at_level(logging.WARNING):
+        assert index.get('bus') is first
+    assert f'Found 3 ConnectivityNodes with name bus. Using {first.mRID}' in caplog.text
+
+
+def test_terminal_to_node_by_name(network, caplog):
+    cim = utils.get_cim_profile(network.connection)
+    node = new_node(network, 'bus')
+    terminal = cim.Terminal(name='t1', mRID='t1')
+    utils.terminal_to_node(network, terminal, 'bus')
+    assert terminal.ConnectivityNode is node
+    assert node.Terminals == [terminal]
+
+    missing = cim.Terminal(name='t2', mRID='t2')
+    with caplog.at_level(logging.ERROR):
+        utils.terminal_to_node(network, missing, 'missing')
+    assert missing.ConnectivityNode is None
+    assert 'Terminal t2 was not connected to a ConnectivityNode' in caplog.text
+
+
+def test_random_changes_match_scan(network):
+    cim = utils.get_cim_profile(network.connection)
+    index = utils.get_node_index(network)
+    rng = random.Random(1)
+    names = [f'bus{number}' for number in range(8)]
+    for step in range(500):
+        nodes = network.graph.get(cim.ConnectivityNode, {})
+        action = rng.random()
+        if action < 0.5 or not nodes:
+            new_node(network, rng.choice(names), mRID=f'node{step}')
+        elif action < 0.7:
+            del nodes[rng.choice(list(nodes))]
+        elif action < 0.85:
+            # Replacing a node under the same mRID with another name is only seen through discard
+            mRID = rng.choice(list(nodes))
+            index.discard(nodes[mRID])
+            nodes[mRID] = cim.ConnectivityNode(name=rng.choice(names), mRID=mRID)
+        else:
+            node = nodes[rng.choice(list(nodes))]
+            old_name = node.name
+            node.name = rng.choice(names)
+            index.rename(node, old_name=old_name)
+        name = rng.choice(names)
+        expected = [node for node in network.graph[cim.ConnectivityNode].values() if node.name == name]
+        assert sorted(node.mRID for node in index.find(name)) == sorted(node.mRID for node in expected)
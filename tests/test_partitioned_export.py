@@ -0,0 +1,70 @@
+import json
+import os
+
+import pytest
+import rdflib
+
+from cimbuilder.substation_builder import RingBusSubstation, SingleBusSubstation, export_partitions, write_partitions
+import cimbuilder.utils as utils
+
+from conftest import SUBSTATION_CASES, case_spec, new_line
+
+
+def test_cross_partition_reference(connection, tmp_path):
+    sub1 = RingBusSubstation(connection=connection, name='sub1', total_sections=4)
+    sub2 = SingleBusSubstation(connection=connection, name='sub2')
+    # A line in the partition of sub2 connects a branch of each substation
+    line, terminal1 = new_line(sub2.network, 'line', sub2.base_voltage)
+    sub2.new_branch(1, line, terminal1)
+    terminal2 = sub2.cim.Terminal(name='line_t2', mRID=utils.new_mrid('line_t2'), ConductingEquipment=line)
+    line.Terminals.append(terminal2)
+    sub2.network.add_to_graph(terminal2)
+    sub1.new_branch(1, line, terminal2)
+    # A reference to an object that is not in any partition
+    line.Location = sub2.cim.Location(name='location', mRID=utils.new_mrid('location'))
+
+    data = write_partitions({'sub1': [sub1.network], 'sub2': [sub2.network]}, str(tmp_path), connection)
+    with open(tmp_path / 'manifest.json', encoding='utf-8') as f:
+        assert json.load(f) == data
+    partitions = {entry['name']: entry for entry in data['partitions']}
+    assert [partitions[name]['file'] for name in ('sub1', 'sub2')] == ['sub1.xml', 'sub2.xml']
+
+    node = terminal2.ConnectivityNode
+    references = {(reference['object'], reference['attribute']): reference for reference in partitions['sub2']['references']}
+    reference = references[(terminal2.mRID, 'ConnectivityNode')]
+    assert reference['target'] == node.mRID
+    assert reference['target_class'] == 'ConnectivityNode'
+    assert reference['target_partition'] == 'sub1'
+    assert node.mRID in partitions['sub1']['boundary_nodes']
+    assert references[(line.mRID, 'Location')]['target_partition'] is None
+    assert [substation['name'] for substation in partitions['sub1']['substations']] == ['sub1']
+
+    # Each object is written to one file
+    subjects = []
+    for entry in data['partitions']:
+        model = rdflib.Graph().parse(str(tmp_path / entry['file']), format='xml')
+        subjects.append({subject for subject, predicate, _ in model if predicate == rdflib.RDF.type})
+        assert len(subjects[-1]) == entry['objects']
+    assert not subjects[0] & subjects[1]
+
+
+def test_export_matches_specs(connection, tmp_path):
+    specs = [case_spec(case, name=f'sub{number}') for number, case in enumerate(SUBSTATION_CASES[:2], start=1)]
+    data = export_partitions(specs, connection, str(tmp_path), processes=1, mrid_namespace='export')
+    assert [entry['name'] for entry in data['partitions']] == ['sub1', 'sub2']
+    for spec, entry in zip(specs, data['partitions']):
+        assert os.path.exists(tmp_path / entry['file'])
+        assert entry['substations'][0]['name'] == spec.name
+        assert len(entry['feeders']) == len(spec.feeders)
+        # Feeder replicas are written with their substation, so no partition links to another
+        assert all(reference['target_partition'] is None for reference in entry['references'])
+
+
+def test_filename_collision(connection, tmp_path):
+    sub = SingleBusSubstation(connection=connection, name='sub')
+    with pytest.raises(ValueError, match='Sub A'):
+        write_partitions({'Sub A': [sub.network], 'sub_a': [sub.network]}, str(tmp_path), connection)
+    specs = [case_spec(SUBSTATION_CASES[0], name=name) for name in ('sub/1', 'sub:1')]
+    with pytest.raises(ValueError, match='sub_1.xml'):
+        export_partitions(specs, connection, str(tmp_path), processes=1)
+    assert not os.path.exists(tmp_path / 'manifest.json')
@@ -0,0 +1,114 @@
+import importlib
+import inspect
+import json
+import pkgutil
+
+import pytest
+
+from cimgraph import GraphModel
+
+from cimbuilder.substation_builder import SingleBusSubstation, RingBusSubstation
+import cimbuilder.utils as utils
+from cimbuilder.utils.profiling import PACKAGES
+
+from conftest import new_line
+
+
+def get_owners():
+    # Modules and classes whose attributes the profiler may replace
+    owners = [GraphModel] + GraphModel.__subclasses__()
+    for package in PACKAGES:
+        module = importlib.import_module(package)
+        owners.append(module)
+        for module_info in pkgutil.walk_packages(module.__path__, f'{package}.'):
+            owners.append(importlib.import_module(module_info.name))
+    owners += [obj for owner in list(owners) if inspect.ismodule(owner)
+               for obj in vars(owner).values() if inspect.isclass(obj)]
+    return owners
+
+
+def snapshot():
+    return {id(owner): (owner, dict(vars(owner))) for owner in get_owners()}
+
+
+def changed(before):
+    return [(owner, name) for owner, attributes in before.values()
+            for name, value in attributes.items() if vars(owner).get(name) is not value]
+
+
+def build(connection):
+    builder = SingleBusSubstation(connection=connection, name='sub')
+    builder.new_branch(1, *new_line(builder.network, 'line', builder.base_voltage))
+    RingBusSubstation(connection=connection, network=builder.network, name='ring', total_sections=4)
+    return builder
+
+
+def test_enable_patches_and_disable_restores(connection):
+    before = snapshot()
+    profiler = utils.Profiler()
+    profiler.enable()
+    try:
+        patched = changed(before)
+        assert (GraphModel, 'add_to_graph') in patched
+        assert (SingleBusSubstation, 'new_branch') in patched
+        assert any(name == 'new_breaker' for _, name in patched)
+        # Generators are not wrapped
+        assert all(not inspect.isgeneratorfunction(before[id(owner)][1][name]) for owner, name in patched)
+    finally:
+        profiler.disable()
+    assert changed(before) == []
+    assert profiler.patched == []
+
+
+def test_restores_after_error(connection):
+    before = snapshot()
+    with pytest.raises(RuntimeError, match='already enabled'):
+        with utils.Profiler():
+            assert changed(before)
+            utils.Profiler().enable()
+    assert changed(before) == []
+
+    # Disabling twice or a profiler that was never enabled does nothing
+    profiler = utils.Profiler()
+    profiler.disable()
+    with profiler:
+        pass
+    profiler.disable()
+    assert changed(before) == []
+
+
+def test_records_calls(connection, tmp_path):
+    with utils.mrid_generator(utils.NameMRIDGenerator('profile')):
+        expected = build(connection).network
+    with utils.Profiler() as profiler:
+        with utils.mrid_generator(utils.NameMRIDGenerator('profile')):
+            network = build(connection).network
+
+    # Profiled builds give the same model
+    files = []
+    for graph in (expected, network):
+        files.append(tmp_path / f'model{len(files)}.xml')
+        with utils.StreamingXMLWriter(str(files[-1]), connection) as writer:
+            writer.write_network(graph)
+    built, profiled = (filename.read_bytes() for filename in files)
+    assert profiled == built
+
+    stats = profiler.to_dict()
+    total_objects = sum(len(objects) for objects in network.graph.values())
+    constructors = ['SingleBusSubstation.__post_init__', 'RingBusSubstation.__post_init__']
+    assert [stats['functions'][name]['calls'] for name in constructors] == [1, 1]
+    assert stats['functions']['SingleBusSubstation.new_branch']['calls'] == 1
+    assert stats['functions']['GraphModel.add_to_graph']['calls'] > 0
+    assert set(stats['substations']) == {'sub', 'ring'}
+    assert 'RingBusSubstation.__post_init__' not in stats['substations']['sub']
+    # Objects are counted from the graph, and constructors create the substations in it
+    assert (sum(stats['functions'][name]['objects'] for name in constructors)
+            + stats['functions']['SingleBusSubstation.new_branch']['objects']) == total_objects - 2
+
+    profiler.write_json(str(tmp_path / 'profile.json'))
+    with open(tmp_path / 'profile.json', encoding='utf-8') as f:
+        assert json.load(f) == stats
+    profiler.write_folded(str(tmp_path / 'profile.folded'))
+    lines = (tmp_path / 'profile.folded').read_text().splitlines()
+    assert any(line.startswith('SingleBusSubstation.__post_init__;') for line in lines)
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
@@ -0,0 +1,72 @@
+import pytest
+
+from cimgraph.databases import ConnectionParameters, RDFlibConnection
+
+from cimbuilder.substation_builder import RingBusSubstation
+import cimbuilder.utils as utils
+
+
+@pytest.fixture
+def connection():
+    params = ConnectionParameters(filename=None, cim_profile='cimhub_2023', iec61970_301=8)
+    return RDFlibConnection(params)
+
+
+def new_line(builder, name):
+    cim = builder.cim
+    line = cim.ACLineSegment(name=name, mRID=utils.new_mrid(name), BaseVoltage=builder.base_voltage)
+    terminal = cim.Terminal(name=f'{name}_t1', mRID=utils.new_mrid(f'{name}_t1'), ConductingEquipment=line)
+    line.Terminals.append(terminal)
+    builder.network.add_to_graph(line)
+    builder.network.add_to_graph(terminal)
+    return line, terminal
+
+
+def write_xml(network, connection, filename):
+    with utils.StreamingXMLWriter(str(filename), connection) as writer:
+        writer.write_network(network)
+    with open(filename, 'rb') as f:
+        return f.read()
+
+
+def test_load_builder_round_trip(connection, tmp_path):
+    with utils.mrid_generator(utils.NameMRIDGenerator('snapshot')):
+        builder = RingBusSubstation(connection=connection, name='ring', total_sections=4)
+        builder.new_branch(1, *new_line(builder, 'line1'))
+        utils.save_snapshot(str(tmp_path / 'ring.snap'), builder.network, builder=builder)
+        loaded = utils.load_builder(str(tmp_path / 'ring.snap'), connection, use_mmap=True)
+    assert (write_xml(loaded.network, connection, tmp_path / 'loaded.xml') ==
+            write_xml(builder.network, connection, tmp_path / 'built.xml'))
+
+    # The reloaded builder is extended like the original
+    for extended in (builder, loaded):
+        with utils.mrid_generator(utils.NameMRIDGenerator('extend')):
+            extended.new_branch(2, *new_line(extended, 'line2'))
+    assert (write_xml(loaded.network, connection, tmp_path / 'loaded.xml') ==
+            write_xml(builder.network, connection, tmp_path / 'built.xml'))
+
+
+def test_mixed_values_round_trip(connection, tmp_path):
+    builder = RingBusSubstation(connection=connection, name='ring', total_sections=4)
+    cim = builder.cim
+    disconnectors = list(builder.network.graph[cim.Disconnector].values())
+    disconnectors[0].description = 'text'
+    disconnectors[1].description = cim.PhaseCode.ABC
+    disconnectors[2].description = [cim.PhaseCode.A, 'B', 1.5, builder.substation]
+    utils.save_snapshot(str(tmp_path / 'ring.snap'), builder.network)
+    network = utils.load_snapshot(str(tmp_path / 'ring.snap'), connection)
+
+    loaded = [network.graph[cim.Disconnector][obj.mRID] for obj in disconnectors]
+    assert loaded[0].description == 'text'
+    assert loaded[1].description is cim.PhaseCode.ABC
+    assert loaded[2].description[:3] == [cim.PhaseCode.A, 'B', 1.5]
+    assert loaded[2].description[3] is network.graph[cim.Substation][builder.substation.mRID]
+    assert loaded[3].description is None
+
+
+def test_unsupported_value_names_attribute(connection, tmp_path):
+    builder = RingBusSubstation(connection=connection, name='ring', total_sections=4)
+    disconnector = next(iter(builder.network.graph[builder.cim.Disconnector].values()))
+    disconnector.description = {1, 2}
+    with pytest.raises(ValueError, match='Disconnector.description'):
+        utils.save_snapshot(str(tmp_path / 'ring.snap'), builder.network)
@@ -0,0 +1,74 @@
+import pytest
+
+from cimgraph.databases import ConnectionParameters, RDFlibConnection
+from cimgraph.models import FeederModel
+
+from cimbuilder.substation_builder import SingleBusSubstation
+from cimbuilder.substation_builder.feeder_replicator import expand_network
+import cimbuilder.utils as utils
+
+from conftest import IEEE13_FILE, IEEE13_MRID
+
+
+@pytest.fixture(scope='module')
+def feeder_connection():
+    params = ConnectionParameters(filename=IEEE13_FILE, cim_profile='cimhub_2023', iec61970_301=8)
+    return RDFlibConnection(params)
+
+
+def load_feeder(connection):
+    feeder = utils.get_cim_profile(connection).Feeder(mRID=IEEE13_MRID)
+    return FeederModel(connection=connection, container=feeder, distributed=False), feeder
+
+
+def test_matches_full_expansion(feeder_connection):
+    network, feeder = load_feeder(feeder_connection)
+    sourcebus = utils.get_sourcebus(network, feeder)
+    cim = utils.get_cim_profile(feeder_connection)
+
+    # Expanding every class finds the same node
+    expanded, _ = load_feeder(feeder_connection)
+    expand_network(expanded)
+    nodes = [terminal.ConnectivityNode for source in expanded.graph[cim.EnergySource].values()
+             for terminal in source.Terminals if terminal.ConnectivityNode.name == 'sourcebus']
+    assert [node.mRID for node in nodes] == [sourcebus.mRID]
+    assert sourcebus is network.graph[cim.ConnectivityNode][sourcebus.mRID]
+
+    # Only the source chain and the feeder were queried
+    cache = utils.get_sourcebus_cache(network)
+    terminals = network.graph[cim.Terminal]
+    assert sourcebus.mRID in cache.expanded
+    assert feeder.mRID in cache.expanded
+    assert len(cache.expanded & set(terminals)) < len(terminals)
+
+
+def test_cached_lookup_makes_no_queries(feeder_connection, monkeypatch):
+    network, feeder = load_feeder(feeder_connection)
+    sourcebus = utils.get_sourcebus(network, feeder)
+
+    def get_all_edges(*args, **kwargs):
+        raise AssertionError('unexpected query')
+    monkeypatch.setattr(network, 'get_all_edges', get_all_edges)
+    assert utils.get_sourcebus(network, feeder) is sourcebus
+    assert utils.get_sourcebus(network, feeder, sourcebus) is sourcebus
+
+
+def test_renamed_sourcebus_is_found_again(feeder_connection):
+    network, feeder = load_feeder(feeder_connection)
+    cache = utils.get_sourcebus_cache(network)
+    sourcebus = cache.get(feeder)
+    sourcebus.name = 'renamed'
+    assert cache.get(feeder) is None
+    assert cache.get(feeder, 'renamed') is sourcebus
+
+
+def test_attach_feeder_network(connection, feeder_connection):
+    network, feeder = load_feeder(feeder_connection)
+    builder = SingleBusSubstation(connection=connection, name='sub')
+    builder.new_feeder(1, network, feeder)
+    sourcebus = utils.get_sourcebus(network, feeder)
+    assert sourcebus.mRID in builder.network.graph[builder.cim.ConnectivityNode]
+    assert sourcebus.AdditionalEquipmentContainer is builder.substation
+    devices = [terminal.ConductingEquipment for terminal in sourcebus.Terminals
+               if isinstance(terminal.ConductingEquipment, builder.cim.Disconnector)]
+    assert [device.EquipmentContainer for device in devices] == [builder.substation]
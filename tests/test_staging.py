@@ -0,0 +1,79 @@
+import pytest
+import rdflib
+
+from cimgraph.models import DistributedArea
+
+from cimbuilder.substation_builder import StagingModel
+import cimbuilder.utils as utils
+
+from conftest import SUBSTATION_CASES
+
+
+def write(network, connection, filename):
+    with utils.StreamingXMLWriter(str(filename), connection) as writer:
+        writer.write_network(network)
+    return parse(filename)
+
+
+def parse(filename):
+    return set(rdflib.Graph().parse(str(filename), format='xml'))
+
+
+def stage_cases(connection):
+    staging = StagingModel(connection)
+    for builder_class, params, _, _ in SUBSTATION_CASES:
+        staging.stage_substations(builder_class, [f'{builder_class.__name__}_1', f'{builder_class.__name__}_2'],
+                                  **params)
+    return staging
+
+
+def build_cases(connection):
+    network = DistributedArea(connection=connection, container=None, distributed=False)
+    for builder_class, params, _, _ in SUBSTATION_CASES:
+        for number in (1, 2):
+            builder_class(connection=connection, network=network, name=f'{builder_class.__name__}_{number}', **params)
+    return network
+
+
+def test_materialize_matches_build(connection, tmp_path):
+    with utils.mrid_generator(utils.NameMRIDGenerator('staging')):
+        staging = stage_cases(connection)
+    with utils.mrid_generator(utils.NameMRIDGenerator('staging')):
+        network = build_cases(connection)
+    built = write(network, connection, tmp_path / 'built.xml')
+
+    # Writing creates the same objects as materializing, which match the direct builds
+    written = staging.write_xml(str(tmp_path / 'staged.xml'))
+    staged = parse(tmp_path / 'staged.xml')
+    assert written == len({subject for subject, predicate, _ in staged if predicate == rdflib.RDF.type})
+    assert staged == built
+    materialized = write(staging.materialize(), connection, tmp_path / 'materialized.xml')
+    assert materialized == built
+
+
+def test_materialize_one_substation(connection):
+    staging = stage_cases(connection)
+    network = staging.materialize(['RingBusSubstation_2'])
+    substations = network.graph[staging.cim.Substation]
+    assert [substation.name for substation in substations.values()] == ['RingBusSubstation_2']
+    nodes = network.graph[staging.cim.ConnectivityNode].values()
+    assert all(node.ConnectivityNodeContainer is next(iter(substations.values())) for node in nodes)
+
+    builder = staging.get_builder('RingBusSubstation_2')
+    assert builder.substation is next(iter(substations.values()))
+    assert builder.name == 'RingBusSubstation_2'
+
+
+def test_get_substation(connection):
+    staging = StagingModel(connection)
+    first = staging.new_substation('sub')
+    staging.new_node('sub_bus')
+    other = staging.new_substation('other')
+    staging.new_node('other_bus')
+    staging.new_substation('sub')
+    assert staging.get_substation('sub') == first
+    assert staging.get_substation('other') == other
+    assert staging.get_node('other', 'other_bus') == 1
+    assert staging.get_node('sub', 'other_bus') is None
+    with pytest.raises(ValueError, match='missing'):
+        staging.get_substation('missing')
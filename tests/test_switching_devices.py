@@ -0,0 +1,90 @@
+import logging
+
+import rdflib
+
+from cimgraph.models import DistributedArea
+
+import cimbuilder.object_builder as object_builder
+import cimbuilder.utils as utils
+
+DEVICES = [dict(class_type='Breaker', name='b1', node1=0, node2=1),
+           dict(class_type='Disconnector', name='d1', node1='n1', node2='n2', open=True, normalOpen=True),
+           dict(class_type='Breaker', name='b2', node1='n2', node2=3, base_voltage=115000),
+           dict(class_type='Disconnector', name='d2', node1=3, node2='missing', base_voltage=115000)]
+
+
+def build(connection, bulk):
+    cim = utils.get_cim_profile(connection)
+    with utils.mrid_generator(utils.NameMRIDGenerator('switching')):
+        network = DistributedArea(connection=connection, container=None, distributed=False)
+        substation = cim.Substation(name='sub', mRID=utils.new_mrid('sub'))
+        network.add_to_graph(substation)
+        nodes = [cim.ConnectivityNode(name=f'n{number}', mRID=utils.new_mrid(f'n{number}'),
+                                      ConnectivityNodeContainer=substation) for number in range(4)]
+        for node in nodes:
+            network.add_to_graph(node)
+
+        devices = []
+        for device in DEVICES:
+            device = dict(device, class_type=getattr(cim, device['class_type']))
+            for key in ('node1', 'node2'):
+                if device[key].__class__ == int:
+                    device[key] = nodes[device[key]]
+            devices.append(device)
+
+        if bulk:
+            switches = object_builder.new_switching_devices(network, substation, devices)
+        else:
+            switches = []
+            for device in devices:
+                new_switch = object_builder.new_breaker if device['class_type'] == cim.Breaker else object_builder.new_disconnector
+                switch = new_switch(network, substation, device['name'], device['node1'], device['node2'],
+                                    open=device.get('open', False), normalOpen=device.get('normalOpen', False))
+                if 'base_voltage' in device:
+                    switch.BaseVoltage = utils.get_base_voltage(network, device['base_voltage'])
+                switches.append(switch)
+    return network, nodes, switches
+
+
+def triples(network, connection, filename):
+    with utils.StreamingXMLWriter(str(filename), connection) as writer:
+        writer.write_network(network)
+    graph = rdflib.Graph()
+    graph.parse(str(filename), format='xml')
+    return set(graph)
+
+
+def test_matches_single_device_builders(connection, tmp_path, caplog):
+    with caplog.at_level(logging.ERROR):
+        network, nodes, switches = build(connection, bulk=False)
+        bulk_network, bulk_nodes, bulk_switches = build(connection, bulk=True)
+    assert caplog.text.count('Terminal d2_t2 was not connected to a ConnectivityNode') == 2
+
+    assert [(switch.__class__, switch.mRID) for switch in bulk_switches] == [(switch.__class__, switch.mRID) for switch in switches]
+    assert ({cim_class: list(objects) for cim_class, objects in bulk_network.graph.items()} ==
+            {cim_class: list(objects) for cim_class, objects in network.graph.items()})
+    for node, bulk_node in zip(nodes, bulk_nodes):
+        assert [terminal.mRID for terminal in bulk_node.Terminals] == [terminal.mRID for terminal in node.Terminals]
+    for switch, bulk_switch in zip(switches, bulk_switches):
+        assert ([(terminal.sequenceNumber, terminal.ConnectivityNode and terminal.ConnectivityNode.mRID)
+                 for terminal in bulk_switch.Terminals] ==
+                [(terminal.sequenceNumber, terminal.ConnectivityNode and terminal.ConnectivityNode.mRID)
+                 for terminal in switch.Terminals])
+        assert all(terminal.ConductingEquipment is bulk_switch for terminal in bulk_switch.Terminals)
+    assert triples(bulk_network, connection, tmp_path / 'bulk.xml') == triples(network, connection, tmp_path / 'loop.xml')
+
+
+def test_existing_mrids_are_not_replaced(connection):
+    cim = utils.get_cim_profile(connection)
+    network = DistributedArea(connection=connection, container=None, distributed=False)
+    substation = cim.Substation(name='sub', mRID='sub')
+    node1 = cim.ConnectivityNode(name='n1', mRID='n1')
+    node2 = cim.ConnectivityNode(name='n2', mRID='n2')
+    mRID = utils.NameMRIDGenerator('existing').new_mrid('new')
+    existing = cim.Breaker(name='existing', mRID=mRID)
+    network.add_to_graph(existing)
+    with utils.mrid_generator(utils.NameMRIDGenerator('existing')):
+        switches = object_builder.new_switching_devices(network, substation, [dict(name='new', node1=node1, node2=node2)])
+    assert switches[0].mRID == mRID
+    assert network.graph[cim.Breaker][mRID] is existing
+    assert len(network.graph[cim.Terminal]) == 2
@@ -0,0 +1,77 @@
+from collections import Counter
+
+import rdflib
+
+from cimgraph.models import DistributedArea
+
+from cimbuilder.analysis import validate_network
+from cimbuilder.substation_builder import new_substation, new_substations, get_feeder_replicator
+import cimbuilder.utils as utils
+
+from conftest import build_case, extend_case, case_spec
+
+
+def describe(network):
+    # Object counts by class, names, and the nodes of each terminal by name
+    counts = Counter({cim_class.__name__: len(objects) for cim_class, objects in network.graph.items()})
+    names = sorted(getattr(obj, 'name', None) or '' for objects in network.graph.values() for obj in objects.values())
+    cim = utils.get_cim_profile(network.connection)
+    topology = sorted((terminal.name, terminal.ConductingEquipment.name,
+                       terminal.ConnectivityNode.name if terminal.ConnectivityNode is not None else None)
+                      for terminal in network.graph.get(cim.Terminal, {}).values())
+    return counts, names, topology
+
+
+def extend_spec(spec, builder):
+    # Add the branches and feeder replicas of a spec to a builder like spec.build
+    for branch in spec.branches:
+        builder.new_branch(branch_equipment=None, branch_terminal=None, **branch)
+    for feeder_spec in spec.feeders:
+        feeder_spec = dict(feeder_spec)
+        replicator = get_feeder_replicator(feeder_spec.pop('filename'), feeder_spec.pop('mrid'))
+        replicator.attach(builder, feeder_spec.pop('replica'), **feeder_spec)
+
+
+def test_clone_matches_spec_build(connection, substation_case):
+    builder_class, params, _, _ = substation_case
+    spec = case_spec(substation_case)
+    built = spec.build(connection)
+    cloned = new_substation(builder_class, connection, 'sub', **params)
+    assert cloned.__class__ == builder_class
+    extend_spec(spec, cloned)
+    expected = describe(built.network)
+    result = describe(cloned.network)
+    assert result == expected
+    assert validate_network(cloned.network).ok
+
+
+def test_clone_matches_build_xml(connection, substation_case, tmp_path):
+    # The same name-based generator gives the same mRIDs to cloned and built objects,
+    # although the objects are written in another order
+    builder_class, params, _, _ = substation_case
+    files = []
+    for clone in (False, True):
+        with utils.mrid_generator(utils.NameMRIDGenerator('template')):
+            if clone:
+                builder = new_substation(builder_class, connection, 'sub', **params)
+                extend_case(substation_case, builder)
+            else:
+                builder = build_case(substation_case, connection)
+        files.append(tmp_path / f'clone_{clone}.xml')
+        with utils.StreamingXMLWriter(str(files[-1]), connection) as writer:
+            writer.write_network(builder.network)
+    built, cloned = (set(rdflib.Graph().parse(str(filename), format='xml')) for filename in files)
+    assert cloned == built
+
+
+def test_clones_share_network(connection, substation_case):
+    builder_class, params, _, _ = substation_case
+    builders = new_substations(builder_class, connection, ['sub1', 'sub2'], **params)
+    assert builders[0].network is not builders[1].network
+    network = DistributedArea(connection=connection, container=None, distributed=False)
+    builders = new_substations(builder_class, connection, ['sub1', 'sub2'], network=network, **params)
+    for builder in builders:
+        extend_case(substation_case, builder, builder.name)
+    assert validate_network(network).ok
+    substations = network.graph[builders[0].cim.Substation]
+    assert {substation.name for substation in substations.values()} == {'sub1', 'sub2'}
@@ -0,0 +1,111 @@
+import random
+
+import pytest
+
+from cimbuilder.analysis import TopologyProcessor
+import cimbuilder.utils as utils
+
+from conftest import SUBSTATION_CASES, build_case
+
+
+def components(network, state='open'):
+    # Islands of node mRIDs joined by closed switches, found by a plain search
+    cim = utils.get_cim_profile(network.connection)
+    neighbours = {mRID: set() for mRID in network.graph.get(cim.ConnectivityNode, {})}
+    for class_objects in network.graph.values():
+        for obj in class_objects.values():
+            if not isinstance(obj, cim.Switch):
+                continue
+            is_open = getattr(obj, state)
+            if is_open is None and state == 'open':
+                is_open = obj.normalOpen
+            nodes = [terminal.ConnectivityNode.mRID for terminal in obj.Terminals if terminal.ConnectivityNode is not None]
+            if is_open or len(nodes) < 2:
+                continue
+            for node in nodes[1:]:
+                neighbours[nodes[0]].add(node)
+                neighbours[node].add(nodes[0])
+    islands = set()
+    reached = set()
+    for start in neighbours:
+        if start in reached:
+            continue
+        island = {start}
+        stack = [start]
+        while stack:
+            for other in neighbours[stack.pop()]:
+                if other not in island:
+                    island.add(other)
+                    stack.append(other)
+        reached |= island
+        islands.add(frozenset(island))
+    return islands
+
+
+def partition(topology):
+    return {frozenset(node.mRID for node in island) for island in topology.islands()}
+
+
+@pytest.mark.parametrize('normal', [False, True], ids=['open', 'normalOpen'])
+def test_set_open_matches_refresh(connection, substation_case, normal):
+    builder = build_case(substation_case, connection)
+    topology = TopologyProcessor(builder.network, normal=normal)
+    state = 'normalOpen' if normal else 'open'
+    assert partition(topology) == components(builder.network, state)
+
+    rng = random.Random(14)
+    for step in range(200):
+        switch = rng.choice(topology.switches)
+        topology.set_open(switch, rng.random() < 0.5)
+        assert getattr(switch, state) in (True, False)
+        # Incremental islands match a full search and a new processor
+        islands = partition(topology)
+        assert islands == components(builder.network, state)
+        assert islands == partition(TopologyProcessor(builder.network, normal=normal))
+
+    islands = partition(topology)
+    topology.refresh()
+    assert partition(topology) == islands
+
+
+def test_open_feeder_breaker(connection):
+    builder = build_case(SUBSTATION_CASES[0], connection)
+    topology = TopologyProcessor(builder.network)
+    breaker = next(breaker for breaker in builder.network.graph[builder.cim.Breaker].values()
+                   if breaker.name == 'sub_3_b1')
+    sourcebus = next(node for node in builder.network.graph[builder.cim.ConnectivityNode].values()
+                     if node.name == 'sub_feeder_3_sourcebus')
+    topology.set_open(breaker)
+    assert breaker.open is True
+    assert [node.mRID for node in topology.check_sourcebuses()] == [sourcebus.mRID]
+    assert not topology.connected(sourcebus, builder.main_bus)
+    topology.set_open(breaker, False)
+    assert topology.check_sourcebuses() == []
+    assert topology.connected(sourcebus, builder.main_bus)
+
+    with pytest.raises(ValueError, match='outside'):
+        topology.set_open(builder.cim.Breaker(name='outside', mRID='outside'))
+
+
+def test_check_sourcebuses(connection, substation_case):
+    builder = build_case(substation_case, connection)
+    topology = TopologyProcessor(builder.network)
+    assert topology.check_sourcebuses() == []
+    sourcebuses = {topology.nodes[node_id].mRID for node_id in topology.sourcebuses}
+    bus_nodes = {topology.nodes[node_id].mRID for node_id in topology.bus_nodes}
+    assert sourcebuses and bus_nodes
+
+    # Open each switch in turn and compare with the source buses that a search cannot
+    # connect to a bus bar section
+    disconnected = set()
+    for switch in topology.switches:
+        topology.set_open(switch)
+        expected = {mRID for island in components(builder.network) for mRID in island
+                    if mRID in sourcebuses and not island & bus_nodes}
+        unreached = {node.mRID for node in topology.check_sourcebuses()}
+        assert unreached == expected
+        disconnected |= unreached
+        topology.set_open(switch, False)
+    # Every source bus is cut off by some switch, such as its feeder breaker
+    assert disconnected == sourcebuses
+    assert topology.check_sourcebuses() == []
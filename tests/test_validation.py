@@ -0,0 +1,46 @@
+from cimgraph.models import DistributedArea
+
+from cimbuilder.analysis import validate_network
+import cimbuilder.utils as utils
+
+from conftest import build_case
+
+
+def test_builders_have_no_defects(connection, substation_case):
+    builder = build_case(substation_case, connection)
+    report = validate_network(builder.network)
+    assert report.counts() == dict.fromkeys(report.counts(), 0)
+    assert report.ok
+
+
+def test_substations_in_one_network_have_no_defects(connection, substation_case):
+    network = DistributedArea(connection=connection, container=None, distributed=False)
+    build_case(substation_case, connection, name='sub1', network=network)
+    build_case(substation_case, connection, name='sub2', network=network)
+    assert validate_network(network).ok
+
+
+def test_reports_defects(connection):
+    cim = utils.get_cim_profile(connection)
+    network = DistributedArea(connection=connection, container=None, distributed=False)
+    substation = cim.Substation(name='sub', mRID='sub')
+    node1 = cim.ConnectivityNode(name='node', mRID='node1', ConnectivityNodeContainer=substation)
+    node2 = cim.ConnectivityNode(name='node', mRID='node2', ConnectivityNodeContainer=substation)
+    breaker = cim.Breaker(name='breaker', mRID='breaker')
+    outside = cim.ConnectivityNode(name='outside', mRID='outside')
+    terminal1 = cim.Terminal(name='t1', mRID='t1', ConductingEquipment=breaker, ConnectivityNode=node1)
+    terminal2 = cim.Terminal(name='t2', mRID='t2', ConductingEquipment=breaker, ConnectivityNode=outside)
+    terminal3 = cim.Terminal(name='t3', mRID='t1', ConductingEquipment=breaker)
+    breaker.Terminals += [terminal1, terminal2]
+    for obj in (substation, node1, node2, breaker, terminal1, terminal2):
+        network.add_to_graph(obj)
+    network.graph[cim.Terminal]['t3'] = terminal3
+
+    report = validate_network(network)
+    assert not report.ok
+    assert [(obj1.mRID, obj2.mRID) for obj1, obj2 in report.duplicate_names] == [('node1', 'node2')]
+    assert [(obj1.name, obj2.name) for obj1, obj2 in report.duplicate_mrids] == [('t1', 't3')]
+    assert [(terminal.name, attribute) for terminal, attribute in report.dangling_terminals] == [('t3', 'ConnectivityNode')]
+    assert [(obj.name, attribute) for obj, attribute, _ in report.one_sided] == [('t1', 'ConnectivityNode'), ('t3', 'ConductingEquipment')]
+    assert [(obj.name, other.name) for obj, _, other in report.missing_references] == [('t2', 'outside')]
+    assert report.missing_base_voltage == [breaker]
@@ -0,0 +1,77 @@
+import rdflib
+
+from cimgraph.models import DistributedArea
+from cimgraph.utils import write_xml
+
+from cimbuilder.substation_builder import RingBusSubstation, SingleBusSubstation
+from cimbuilder.substation_builder.aggregate_feeder import new_aggregate_feeders
+import cimbuilder.utils as utils
+
+FEEDERS = {'feeder_name': ['agg1', 'agg2'], 'total_load_kw': [100, 200], 'total_btm_wind_kw': [0, 5]}
+
+
+def parse(filename):
+    graph = rdflib.Graph()
+    graph.parse(str(filename), format='xml')
+    return set(graph)
+
+
+def test_matches_write_xml(connection, tmp_path):
+    builder = RingBusSubstation(connection=connection, name='ring', total_sections=4)
+    write_xml(builder.network, str(tmp_path / 'cimgraph.xml'))
+    with utils.StreamingXMLWriter(str(tmp_path / 'streamed.xml'), connection) as writer:
+        written = writer.write_network(builder.network)
+    assert written == sum(len(objects) for objects in builder.network.graph.values())
+    assert parse(tmp_path / 'streamed.xml') == parse(tmp_path / 'cimgraph.xml')
+
+
+def test_objects_are_written_once(connection, tmp_path):
+    network = DistributedArea(connection=connection, container=None, distributed=False)
+    with utils.StreamingXMLWriter(str(tmp_path / 'streamed.xml'), connection) as writer:
+        RingBusSubstation(connection=connection, network=network, name='ring1', total_sections=4)
+        first = writer.write_network(network)
+        assert writer.write_network(network, evict=True) == 0
+        assert network.graph == {}
+        RingBusSubstation(connection=connection, network=network, name='ring2', total_sections=4)
+        second = writer.write_network(network)
+    subjects = {subject for subject, predicate, _ in parse(tmp_path / 'streamed.xml') if predicate == rdflib.RDF.type}
+    assert len(subjects) == first + second
+
+
+def test_streamed_aggregate_feeders(connection, tmp_path):
+    # Build the same feeders in the graph and with a writer
+    built = []
+    for streamed in (False, True):
+        with utils.mrid_generator(utils.NameMRIDGenerator('aggregate')):
+            builder = SingleBusSubstation(connection=connection, name='sub')
+            before = {cim_class: len(objects) for cim_class, objects in builder.network.graph.items()}
+            terminals = list(builder.main_bus.Terminals)
+            filename = str(tmp_path / f'streamed_{streamed}.xml')
+            with utils.StreamingXMLWriter(filename, connection) as writer:
+                feeders = new_aggregate_feeders(builder.network, FEEDERS, substation=builder.substation,
+                                                node=builder.main_bus, base_voltage=builder.base_voltage,
+                                                writer=writer if streamed else None)
+                writer.write_network(builder.network)
+        built.append(parse(filename))
+
+    # Streamed feeders are not kept in the graph or linked from the substation bus
+    assert feeders == []
+    assert {cim_class: len(objects) for cim_class, objects in builder.network.graph.items()} == before
+    assert len(builder.main_bus.Terminals) == len(terminals)
+    assert all(a is b for a, b in zip(builder.main_bus.Terminals, terminals))
+
+    # Only the object side of the bus terminal association is written, so both files match
+    assert built[1] == built[0]
+
+
+def test_streamed_aggregate_feeders_in_changeset(connection, tmp_path):
+    builder = SingleBusSubstation(connection=connection, name='sub')
+    store = rdflib.Graph()
+    changes = utils.Changeset(connection, update=store.update)
+    filename = str(tmp_path / 'streamed.xml')
+    with utils.StreamingXMLWriter(filename, connection) as writer:
+        new_aggregate_feeders(builder.network, FEEDERS, substation=builder.substation, node=builder.main_bus,
+                              base_voltage=builder.base_voltage, writer=writer, changeset=changes)
+    assert len(changes) == len(writer.written)
+    changes.flush()
+    assert set(store) == parse(filename)